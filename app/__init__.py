@@ -6,16 +6,21 @@ from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 
 from core.configuration.configuration import get_app_version
+from core.managers.asset_manager import AssetManager
+from core.managers.cache_manager import CacheManager
 from core.managers.config_manager import ConfigManager
+from core.managers.database_manager import DatabaseManager, RoutingSession
 from core.managers.error_handler_manager import ErrorHandlerManager
+from core.managers.instrumentation_manager import InstrumentationManager
 from core.managers.logging_manager import LoggingManager
 from core.managers.module_manager import ModuleManager
+from core.managers.session_manager import SessionManager
 
 # Load environment variables
 load_dotenv()
 
 # Create the instances
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 
 
@@ -34,6 +39,10 @@ def create_app(config_name="development"):
     module_manager = ModuleManager(app)
     module_manager.register_modules()
 
+    # Minify, fingerprint and precompress the scripts of the modules
+    asset_manager = AssetManager(app)
+    asset_manager.setup_assets()
+
     # Register login manager
     from flask_login import LoginManager
 
@@ -43,14 +52,30 @@ def create_app(config_name="development"):
 
     @login_manager.user_loader
     def load_user(user_id):
-        from app.modules.auth.models import User
+        from app.modules.auth.services import AuthenticationService
 
-        return User.query.get(int(user_id))
+        return AuthenticationService().load_user(int(user_id))
 
     # Set up logging
     logging_manager = LoggingManager(app)
     logging_manager.setup_logging()
 
+    # Set up request instrumentation (query counts, timings and /metrics)
+    instrumentation_manager = InstrumentationManager(app)
+    instrumentation_manager.setup_instrumentation()
+
+    # Set up connection timeouts and pool metrics of the database engines
+    database_manager = DatabaseManager(app)
+    database_manager.setup_database()
+
+    # Set up the cache backend and the anonymous page cache
+    cache_manager = CacheManager(app)
+    cache_manager.setup_cache()
+
+    # Keep sessions on the server when a Flask-Session backend is configured
+    session_manager = SessionManager(app)
+    session_manager.setup_sessions()
+
     # Initialize error handler manager
     error_handler_manager = ErrorHandlerManager(app)
     error_handler_manager.register_error_handlers()
@@ -68,4 +93,10 @@ def create_app(config_name="development"):
     return app
 
 
-app = create_app()
+def __getattr__(name):
+    # The WSGI application is built on first access (`gunicorn app:app`, `flask run`), so importing the package
+    # for `db` or `create_app` does not build a second application
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
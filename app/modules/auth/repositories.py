@@ -1,6 +1,13 @@
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
 from app.modules.auth.models import User
+from app.modules.profile.models import UserProfile
 from core.repositories.BaseRepository import BaseRepository
 
+# Secrets kept out of the identity cache: the few paths that need them (login, 2FA) load them on access
+IDENTITY_EXCLUDED_COLUMNS = {User: frozenset({"password", "totp_secret"})}
+
 
 class UserRepository(BaseRepository):
     def __init__(self):
@@ -19,3 +26,48 @@ class UserRepository(BaseRepository):
 
     def get_by_email(self, email: str):
         return self.model.query.filter_by(email=email).first()
+
+    def get_with_profile(self, user_id: int):
+        return self.model.query.options(joinedload(User.profile)).filter(User.id == user_id).first()
+
+    def dump_identity(self, user: User) -> dict:
+        """
+        Column values of the user and their profile, as kept by the identity cache, without the password hash
+        and the TOTP secret.
+        """
+        return {
+            "user": column_values(user),
+            "profile": column_values(user.profile) if user.profile else None,
+        }
+
+    def restore_identity(self, identity: dict):
+        """
+        Attaches a cached user and their profile to the session without querying them; the columns left out
+        of the cache are loaded when first accessed. Returns None when the cached columns no longer match the
+        models.
+        """
+        user = self.restore_instance(User, identity["user"])
+        profile = self.restore_instance(UserProfile, identity["profile"]) if identity["profile"] else None
+        if user is None or (identity["profile"] and profile is None):
+            return None
+
+        set_committed_value(user, "profile", profile)
+        if profile is not None:
+            set_committed_value(profile, "user", user)
+        return user
+
+    def restore_instance(self, model, values: dict):
+        if set(values) != cached_columns(model):
+            return None
+        instance = model(**values)
+        make_transient_to_detached(instance)
+        return self.session.merge(instance, load=False)
+
+
+def cached_columns(model) -> set:
+    excluded = IDENTITY_EXCLUDED_COLUMNS.get(model, frozenset())
+    return {attribute.key for attribute in model.__mapper__.column_attrs} - excluded
+
+
+def column_values(instance) -> dict:
+    return {key: getattr(instance, key) for key in cached_columns(type(instance))}
@@ -1,5 +1,6 @@
 import os
 
+from flask import current_app
 from flask_login import current_user, login_user
 
 from app.modules.auth.models import User
@@ -69,6 +70,15 @@ class AuthenticationService(BaseService):
 
         return None, form.errors
 
+    def load_user(self, user_id: int) -> User | None:
+        """User of a session together with their profile, from the identity cache when it is enabled."""
+        identity_cache = current_app.extensions.get("identity_cache")
+        if identity_cache is None:
+            return self.repository.get_with_profile(user_id)
+        return identity_cache.load(
+            user_id, self.repository.get_with_profile, self.repository.dump_identity, self.repository.restore_identity
+        )
+
     def get_authenticated_user(self) -> User | None:
         if current_user.is_authenticated:
             return current_user
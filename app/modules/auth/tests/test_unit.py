@@ -1,15 +1,29 @@
 import pytest
 import pyotp
-from flask import url_for
+from flask import g, url_for
 
 from app.modules.auth.repositories import UserRepository
 from app.modules.auth.services import AuthenticationService
 from app.modules.profile.repositories import UserProfileRepository
 from app.modules.auth.models import ROLES, DEFAULT_ROLE
-from flask_login import login_user
+from flask_login import login_user, logout_user
 from app.modules.auth.routes import change_user_role
 from app.modules.profile.models import UserProfile
 from app.modules.auth.routes import two_factor_confirm, two_factor_setup
+from app import db
+from app.modules.auth.models import User
+from app.modules.conftest import capture_statements, login, logout
+
+
+@pytest.fixture
+def identity_cache(test_client):
+    app = test_client.application
+    cache = app.extensions["identity_cache"]
+    app.config["IDENTITY_CACHE_ENABLED"] = True
+    cache.backend.clear()
+    yield cache
+    app.config["IDENTITY_CACHE_ENABLED"] = False
+    cache.backend.clear()
 
 
 @pytest.fixture(scope="module")
@@ -264,4 +278,95 @@ def test_2fa_verify_flow_with_valid_and_invalid_token(test_client, clean_databas
     # valid token logs in and redirects to public.index
     token = pyotp.TOTP(secret).now()
     resp = test_client.post("/2fa/verify", data=dict(token=token), follow_redirects=True)
-    assert resp.request.path == url_for("public.index")
\ No newline at end of file
+    assert resp.request.path == url_for("public.index")
+
+
+def forget_loaded_user():
+    """
+    Requests share the test application context: drop the user Flask-Login keeps in `g` and empty the
+    session, so the next request loads its user again and nothing comes from the identity map.
+    """
+    g.pop("_login_user", None)
+    db.session.expunge_all()
+
+
+def test_identity_cache_loads_logged_in_users_without_queries(test_client, clean_database, identity_cache):
+    repo = UserRepository()
+    user = repo.create(email="cached@example.com", password="cached1234")
+    repo.session.add(UserProfile(user_id=user.id, name="Cached", surname="Identity"))
+    repo.session.commit()
+
+    # Users logged in directly by earlier tests stay in the shared application context
+    with test_client.application.test_request_context():
+        logout_user()
+
+    login(test_client, "cached@example.com", "cached1234")
+    try:
+        forget_loaded_user()
+        test_client.get("/profile/summary")
+
+        forget_loaded_user()
+        with capture_statements() as statements:
+            response = test_client.get("/profile/summary")
+
+        assert response.status_code == 200
+        assert b"Identity" in response.data
+        assert not any("FROM user" in statement for statement in statements)
+    finally:
+        logout(test_client)
+
+
+def test_identity_cache_leaves_secrets_out_and_loads_them_on_access(test_client, clean_database, identity_cache):
+    repo = UserRepository()
+    user = repo.create(email="secret@example.com", password="secret1234")
+    user.totp_secret = pyotp.random_base32()
+    repo.session.commit()
+    user_id, password_hash, totp_secret = user.id, user.password, user.totp_secret
+
+    identity = repo.dump_identity(repo.get_with_profile(user_id))
+    assert "password" not in identity["user"]
+    assert "totp_secret" not in identity["user"]
+
+    db.session.expunge_all()
+    restored = repo.restore_identity(identity)
+    assert restored.email == "secret@example.com"
+    with capture_statements() as statements:
+        assert restored.check_password("secret1234")
+        assert restored.password == password_hash
+        assert restored.totp_secret == totp_secret
+    assert any("FROM user" in statement for statement in statements)
+
+
+def test_identity_cache_is_invalidated_by_role_and_profile_changes(test_client, clean_database, identity_cache):
+    repo = UserRepository()
+    user = repo.create(email="promoted@example.com", password="promoted1234")
+    repo.session.add(UserProfile(user_id=user.id, name="Promoted", surname="User"))
+    repo.session.commit()
+    user_id = user.id
+
+    with test_client.application.test_request_context():
+        logout_user()
+
+    login(test_client, "promoted@example.com", "promoted1234")
+    try:
+        # A standard user is sent away from the admin pages
+        forget_loaded_user()
+        assert test_client.get("/admin/users").status_code == 302
+
+        version = identity_cache.version(user_id)
+        db.session.get(User, user_id).role = "admin"
+        db.session.commit()
+        assert identity_cache.version(user_id) != version
+
+        forget_loaded_user()
+        assert test_client.get("/admin/users").status_code == 200
+
+        version = identity_cache.version(user_id)
+        db.session.get(User, user_id).profile.surname = "Renamed"
+        db.session.commit()
+        assert identity_cache.version(user_id) != version
+
+        forget_loaded_user()
+        assert b"Renamed" in test_client.get("/profile/summary").data
+    finally:
+        logout(test_client)
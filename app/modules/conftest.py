@@ -1,4 +1,7 @@
+from contextlib import contextmanager
+
 import pytest
+from sqlalchemy import event
 
 from app import create_app, db
 from app.modules.auth.models import User
@@ -80,3 +83,27 @@ def logout(test_client):
         response: Response to GET request to log out.
     """
     return test_client.get("/logout", follow_redirects=True)
+
+
+@contextmanager
+def capture_statements(engine=None):
+    """
+    Collects the SQL statements run inside the block, e.g. to check that a page makes no query per item.
+
+    Args:
+        engine: Engine to listen to (the app's primary engine by default).
+
+    Yields:
+        list: The statements, filled in as they run.
+    """
+    engine = engine or db.engine
+    statements = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
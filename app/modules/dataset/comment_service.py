@@ -1,12 +1,28 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from flask_login import current_user
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
 
 from app import db
 from app.modules.dataset.models import DatasetComment, DataSet
 from app.modules.auth.models import User
 
+COMMENTS_PAGE_SIZE = 20
+
+
+def encode_cursor(comment: DatasetComment) -> str:
+    return f"{comment.created_at.isoformat()}_{comment.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, comment_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(comment_id)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
 
 class CommentService:
     def create(self, dataset: DataSet, user: User, content: str) -> DatasetComment:
@@ -28,6 +44,36 @@ class CommentService:
             query = query.filter_by(is_visible=True)
         return query.order_by(DatasetComment.created_at.asc()).all()
 
+    def list_page(
+        self,
+        dataset_id: int,
+        after: Optional[str] = None,
+        limit: int = COMMENTS_PAGE_SIZE,
+        include_hidden: bool = False,
+    ) -> Tuple[List[DatasetComment], Optional[str]]:
+        """
+        A page of the comments of a dataset, oldest first, with their authors and profiles loaded.
+        `after` is the cursor returned with the previous page. Returns the comments and the cursor of the
+        next page, or None when there are no more comments.
+        """
+        query = DatasetComment.query.filter(DatasetComment.dataset_id == dataset_id).options(
+            joinedload(DatasetComment.user).joinedload(User.profile)
+        )
+        if not include_hidden:
+            query = query.filter(DatasetComment.is_visible.is_(True))
+        if after:
+            created_at, comment_id = decode_cursor(after)
+            query = query.filter(
+                or_(
+                    DatasetComment.created_at > created_at,
+                    and_(DatasetComment.created_at == created_at, DatasetComment.id > comment_id),
+                )
+            )
+
+        comments = query.order_by(DatasetComment.created_at, DatasetComment.id).limit(limit + 1).all()
+        next_cursor = encode_cursor(comments[limit - 1]) if len(comments) > limit else None
+        return comments[:limit], next_cursor
+
     def get(self, comment_id: int) -> Optional[DatasetComment]:
         return DatasetComment.query.get(comment_id)
 
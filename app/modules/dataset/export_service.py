@@ -0,0 +1,201 @@
+import csv
+import io
+import os
+from contextlib import contextmanager
+
+from sqlalchemy import select
+
+from app import db
+from app.modules.dataset.models import Author, DataSet, DSMetaData
+from app.modules.featuremodel.models import FeatureModel
+from app.modules.hubfile.models import Hubfile
+from core.managers.database_manager import REPLICA_BIND, STATEMENT_TIMEOUT_DIALECTS
+from core.serialisers.serializer import encode_json
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Rows fetched from each cursor at a time, and records sent to the client in each chunk
+EXPORT_BATCH_SIZE = 1000
+
+# Seconds the database waits for a slow client to take the next rows before dropping the connection
+EXPORT_NET_WRITE_TIMEOUT = 600
+
+CSV_COLUMNS = (
+    "dataset_id",
+    "title",
+    "description",
+    "publication_type",
+    "publication_doi",
+    "dataset_doi",
+    "tags",
+    "created_at",
+    "url",
+    "authors",
+    "files_count",
+    "total_size_in_bytes",
+    "files",
+)
+
+
+@contextmanager
+def streaming_connection(engine, batch_size):
+    """
+    Connection reading its results through a server-side cursor, `batch_size` rows at a time. On MariaDB the
+    statement timeout is lifted, since the query runs for as long as the client takes to read the export, so
+    the connection is discarded afterwards instead of going back to the pool with those settings.
+    """
+    connection = engine.connect().execution_options(stream_results=True, yield_per=batch_size)
+    tuned = engine.dialect.name in STATEMENT_TIMEOUT_DIALECTS
+    try:
+        if tuned:
+            connection.exec_driver_sql(
+                f"SET SESSION max_statement_time = 0, net_write_timeout = {EXPORT_NET_WRITE_TIMEOUT}"
+            )
+        yield connection
+    finally:
+        if tuned:
+            connection.invalidate()
+        connection.close()
+
+
+class CatalogueExportService:
+    """
+    Streams the whole catalogue, every published dataset (with a DOI) with its authors and files, as NDJSON or
+    CSV.
+
+    Datasets, authors and files are read by three queries sorted by dataset id, each on its own server-side
+    cursor, and merged as they arrive: memory stays constant whatever the size of the catalogue, and the
+    first records are sent as soon as the first rows are read.
+    """
+
+    def __init__(self, engine=None, batch_size=EXPORT_BATCH_SIZE):
+        # Exports read from the replica when there is one, so they don't load the primary
+        self.engine = engine or db.engines.get(REPLICA_BIND, db.engine)
+        self.batch_size = batch_size
+        self.domain = os.getenv("DOMAIN", "localhost")
+
+    def _rows(self, statement):
+        with streaming_connection(self.engine, self.batch_size) as connection:
+            yield from connection.execute(statement)
+
+    def dataset_rows(self):
+        return self._rows(
+            select(
+                DataSet.id,
+                DataSet.created_at,
+                DSMetaData.title,
+                DSMetaData.description,
+                DSMetaData.publication_type,
+                DSMetaData.publication_doi,
+                DSMetaData.dataset_doi,
+                DSMetaData.tags,
+            )
+            .join(DSMetaData, DataSet.ds_meta_data_id == DSMetaData.id)
+            # Datasets without a DOI are only visible to their owners
+            .where(DSMetaData.dataset_doi.isnot(None))
+            .order_by(DataSet.id)
+        )
+
+    def author_rows(self):
+        return self._rows(
+            select(DataSet.id.label("dataset_id"), Author.name, Author.affiliation, Author.orcid)
+            .join(Author, Author.ds_meta_data_id == DataSet.ds_meta_data_id)
+            .order_by(DataSet.id, Author.id)
+        )
+
+    def file_rows(self):
+        return self._rows(
+            select(
+                FeatureModel.data_set_id.label("dataset_id"), Hubfile.id, Hubfile.name, Hubfile.checksum, Hubfile.size
+            )
+            .join(FeatureModel, Hubfile.feature_model_id == FeatureModel.id)
+            .order_by(FeatureModel.data_set_id, Hubfile.id)
+        )
+
+    @staticmethod
+    def _take(rows, dataset_id, pending):
+        """Rows of `dataset_id` from a stream sorted by dataset id. `pending` holds the row read ahead."""
+        taken = []
+        row = pending[0] if pending else next(rows, None)
+        while row is not None and row.dataset_id <= dataset_id:
+            if row.dataset_id == dataset_id:
+                taken.append(row)
+            row = next(rows, None)
+        pending[:] = [row] if row is not None else []
+        return taken
+
+    def records(self):
+        """Dicts with the fields of DataSet.to_dict that don't need a request, one per dataset, by id."""
+        datasets, authors, files = self.dataset_rows(), self.author_rows(), self.file_rows()
+        pending_authors, pending_files = [], []
+        try:
+            for dataset in datasets:
+                dataset_files = self._take(files, dataset.id, pending_files)
+                yield {
+                    "dataset_id": dataset.id,
+                    "title": dataset.title,
+                    "description": dataset.description,
+                    "publication_type": dataset.publication_type.value if dataset.publication_type else None,
+                    "publication_doi": dataset.publication_doi,
+                    "dataset_doi": dataset.dataset_doi,
+                    "tags": dataset.tags.split(",") if dataset.tags else [],
+                    "created_at": dataset.created_at.isoformat() if dataset.created_at else None,
+                    "url": f"http://{self.domain}/doi/{dataset.dataset_doi}" if dataset.dataset_doi else None,
+                    "authors": [
+                        {"name": author.name, "affiliation": author.affiliation, "orcid": author.orcid}
+                        for author in self._take(authors, dataset.id, pending_authors)
+                    ],
+                    "files": [
+                        {"file_id": file.id, "name": file.name, "checksum": file.checksum, "size": file.size}
+                        for file in dataset_files
+                    ],
+                    "files_count": len(dataset_files),
+                    "total_size_in_bytes": sum(file.size for file in dataset_files),
+                }
+        finally:
+            # Releases the cursors when the client goes away in the middle of the export
+            for rows in (datasets, authors, files):
+                rows.close()
+
+    def _batches(self):
+        batch = []
+        for record in self.records():
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def ndjson(self):
+        """Generator of NDJSON chunks of bytes, one line per dataset."""
+        for batch in self._batches():
+            yield b"".join(encode_json(record) + b"\n" for record in batch)
+
+    @staticmethod
+    def csv_row(record):
+        flattened = dict(
+            record,
+            tags=",".join(record["tags"]),
+            authors="; ".join(author["name"] for author in record["authors"]),
+            files="; ".join(file["name"] for file in record["files"]),
+        )
+        return [flattened[column] for column in CSV_COLUMNS]
+
+    def csv(self):
+        """Generator of CSV chunks, one row per dataset with the names of its authors and files."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for batch in self._batches():
+            writer.writerows(self.csv_row(record) for record in batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def export(self, export_format):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{export_format}': use {' or '.join(EXPORT_FORMATS)}")
+        return self.ndjson() if export_format == "ndjson" else self.csv()
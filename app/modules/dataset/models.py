@@ -57,7 +57,7 @@ class DSMetaData(db.Model):
     description = db.Column(db.Text, nullable=False)
     publication_type = db.Column(SQLAlchemyEnum(PublicationType), nullable=False)
     publication_doi = db.Column(db.String(120))
-    dataset_doi = db.Column(db.String(120))
+    dataset_doi = db.Column(db.String(120), index=True)
     tags = db.Column(db.String(120))
     ds_metrics_id = db.Column(db.Integer, db.ForeignKey("ds_metrics.id"))
     ds_metrics = db.relationship("DSMetrics", uselist=False, backref="ds_meta_data", cascade="all, delete")
@@ -168,8 +168,8 @@ class DSViewRecord(db.Model):
 
 class DOIMapping(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    dataset_doi_old = db.Column(db.String(120))
-    dataset_doi_new = db.Column(db.String(120))
+    dataset_doi_old = db.Column(db.String(120), index=True)
+    dataset_doi_new = db.Column(db.String(120), index=True)
 
 
 class DatasetComment(db.Model):
@@ -185,6 +185,7 @@ class DatasetComment(db.Model):
     """
 
     __tablename__ = "dataset_comment"
+    __table_args__ = (db.Index("ix_dataset_comment_dataset_visible_created", "dataset_id", "is_visible", "created_at"),)
 
     id = db.Column(db.Integer, primary_key=True)
     dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), nullable=False)
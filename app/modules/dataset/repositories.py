@@ -6,6 +6,7 @@ from flask_login import current_user
 from sqlalchemy import desc, func
 
 from app.modules.dataset.models import Author, DataSet, DOIMapping, DSDownloadRecord, DSMetaData, DSViewRecord
+from core.decorators.decorators import read_only
 from core.repositories.BaseRepository import BaseRepository
 
 from datetime import datetime, timedelta
@@ -23,6 +24,7 @@ class DSDownloadRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(DSDownloadRecord)
 
+    @read_only
     def total_dataset_downloads(self) -> int:
         max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
@@ -35,11 +37,18 @@ class DSMetaDataRepository(BaseRepository):
     def filter_by_doi(self, doi: str) -> Optional[DSMetaData]:
         return self.model.query.filter_by(dataset_doi=doi).first()
 
+    def dataset_id_by_doi(self, doi: str) -> Optional[int]:
+        # Read from the primary: a DOI assigned a moment ago may not have reached the replicas yet
+        return (
+            self.session.query(DataSet.id).join(DSMetaData).filter(DSMetaData.dataset_doi == doi).limit(1).scalar()
+        )
+
 
 class DSViewRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(DSViewRecord)
 
+    @read_only
     def total_dataset_views(self) -> int:
         max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
@@ -87,12 +96,15 @@ class DataSetRepository(BaseRepository):
             .first()
         )
 
+    @read_only
     def count_synchronized_datasets(self):
         return self.model.query.join(DSMetaData).filter(DSMetaData.dataset_doi.isnot(None)).count()
 
+    @read_only
     def count_unsynchronized_datasets(self):
         return self.model.query.join(DSMetaData).filter(DSMetaData.dataset_doi.is_(None)).count()
 
+    @read_only
     def latest_synchronized(self):
         return (
             self.model.query.join(DSMetaData)
@@ -102,6 +114,15 @@ class DataSetRepository(BaseRepository):
             .all()
         )
 
+    @read_only
+    def paginate_by_user(self, user_id: int, page: int, per_page: int):
+        return (
+            self.model.query.filter(DataSet.user_id == user_id)
+            .order_by(self.model.created_at.desc())
+            .paginate(page=page, per_page=per_page, error_out=False)
+        )
+
+    @read_only
     def get_most_downloaded_last_month(self, limit=5):
         
         # Calculate date one month ago
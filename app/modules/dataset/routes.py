@@ -8,6 +8,7 @@ from datetime import datetime, timezone
 from zipfile import ZipFile
 
 from flask import (
+    Response,
     abort,
     jsonify,
     make_response,
@@ -19,20 +20,26 @@ from flask import (
 )
 from flask_login import current_user, login_required
 
+from app.modules.auth.routes import admin_required
 from app.modules.dataset import dataset_bp
 from app.modules.dataset.forms import DataSetForm
 from app.modules.dataset.models import DSDownloadRecord
-from app.modules.dataset.comment_service import CommentService, is_admin
+from app.modules.dataset.export_service import EXPORT_FORMATS, CatalogueExportService
+from app.modules.dataset.comment_service import COMMENTS_PAGE_SIZE, CommentService, is_admin
 from app.modules.dataset.services import (
     AuthorService,
     DataSetService,
-    DOIMappingService,
+    DOIResolverService,
     DSDownloadRecordService,
-    DSMetaDataService,
     DSViewRecordService,
 )
 from app.modules.zenodo.services import ZenodoService
-from app.modules.recommendations.service import get_recommended_datasets
+from app.modules.recommendations.service import (
+    author_overlap_engine,
+    get_dataset_recommendations,
+    index_published_dataset,
+)
+from core.managers.cache_manager import serve_page
 
 
 logger = logging.getLogger(__name__)
@@ -40,9 +47,8 @@ logger = logging.getLogger(__name__)
 
 dataset_service = DataSetService()
 author_service = AuthorService()
-dsmetadata_service = DSMetaDataService()
 zenodo_service = ZenodoService()
-doi_mapping_service = DOIMappingService()
+doi_resolver_service = DOIResolverService()
 ds_view_record_service = DSViewRecordService()
 comment_service = CommentService()
 
@@ -67,6 +73,9 @@ def create_dataset():
             logger.exception(f"Exception while create dataset data in local {exc}")
             return jsonify({"Exception while create dataset data in local: ": str(exc)}), 400
 
+        # Failures are logged and don't stop the upload
+        index_published_dataset(dataset)
+
         # send dataset as deposition to fakenodo (Zenodo enabled)
         # The application must not call the real Zenodo API; ZenodoService is configured to use fakenodo.
         use_zenodo = True
@@ -289,33 +298,72 @@ def download_dataset(dataset_id):
             download_date=datetime.now(timezone.utc),
             download_cookie=user_cookie,
         )
+        try:
+            author_overlap_engine.record_download(dataset_id)
+        except Exception:
+            # Non-fatal: the recommendations are recomputed by `rosemary recommendations:rebuild`
+            logger.exception("Failed to record the download for recommendations")
 
     return resp
 
 
+@dataset_bp.route("/dataset/export/<int:dataset_id>", methods=["GET"])
+def export_dataset(dataset_id):
+    dataset = dataset_service.get_or_404(dataset_id)
+
+    return Response(
+        dataset_service.export_bundle(dataset),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=dataset_{dataset_id}_bundle.zip"},
+    )
+
+
+@dataset_bp.route("/api/v1/datasets/export", methods=["GET"])
+@admin_required
+def export_catalogue():
+    """
+    Every dataset with its authors and files, streamed as NDJSON (default) or CSV (?format=csv). Admins only:
+    each export holds three connections of the pool for as long as the client takes to download it.
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"message": f"Unknown format: use {' or '.join(EXPORT_FORMATS)}"}), 400
+
+    return Response(
+        CatalogueExportService().export(export_format),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename=catalogue.{export_format}",
+            # Lets nginx pass the chunks on as they are produced
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @dataset_bp.route("/doi/<path:doi>/", methods=["GET"])
 def subdomain_index(doi):
-    new_doi = doi_mapping_service.get_new_doi(doi)
-    if new_doi:
-        return redirect(url_for("dataset.subdomain_index", doi=new_doi), code=302)
-
-    ds_meta_data = dsmetadata_service.filter_by_doi(doi)
-    if not ds_meta_data:
+    resolution = doi_resolver_service.get_dataset(doi)
+    if resolution is None:
         abort(404)
 
-    dataset = ds_meta_data.data_set
+    kind, target = resolution
+    if kind == "redirect":
+        return redirect(url_for("dataset.subdomain_index", doi=target), code=302)
 
-    # ✅ Obtener datasets recomendados
-    recommended_datasets = get_recommended_datasets(dataset)
+    dataset = target
 
     # Guardar cookie de visualización
     user_cookie = ds_view_record_service.create_cookie(dataset=dataset)
-    resp = make_response(
-        render_template(
+
+    # Views must be recorded on every visit, so clients revalidate the cached page with its ETag
+    resp = serve_page(
+        lambda: render_template(
             "dataset/view_dataset.html",
             dataset=dataset,
-            recommended=recommended_datasets,  # 👈 Se pasa a la plantilla
-        )
+            # Only computed when the recommendations fragment is not cached
+            recommended=lambda: get_dataset_recommendations(dataset),
+        ),
+        cache_control="no-cache",
     )
     resp.set_cookie("view_cookie", user_cookie)
 
@@ -323,6 +371,53 @@ def subdomain_index(doi):
 
 
 
+def comment_author(comment):
+    # Name and surname if available, otherwise the email
+    profile = comment.user.profile if comment.user else None
+    if profile and (profile.name or profile.surname):
+        return f"{profile.name or ''} {profile.surname or ''}"
+    if comment.user and comment.user.email:
+        return comment.user.email
+    return "Unknown"
+
+
+@dataset_bp.app_template_global()
+def dataset_comments_page(dataset):
+    """First page of the comments of a dataset and the cursor of the next one, for view_dataset.html."""
+    return comment_service.list_page(dataset.id)
+
+
+@dataset_bp.route("/dataset/<int:dataset_id>/comments", methods=["GET"])
+def list_comments(dataset_id):
+    """Next page of comments for the "Load more comments" button of the dataset page."""
+    dataset = dataset_service.get_or_404(dataset_id)
+
+    try:
+        limit = max(1, min(int(request.args.get("limit", COMMENTS_PAGE_SIZE)), 100))
+        comments, next_cursor = comment_service.list_page(dataset.id, after=request.args.get("after"), limit=limit)
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), 400
+
+    return jsonify(
+        {
+            "items": [
+                {
+                    "id": comment.id,
+                    "author": comment_author(comment),
+                    "content": comment.content,
+                    "created_at": comment.created_at.isoformat(),
+                    "created_at_display": comment.created_at.strftime("%B %d, %Y at %I:%M %p"),
+                    "can_delete": current_user.is_authenticated
+                    and (current_user.id == comment.user_id or is_admin(current_user)),
+                    "delete_url": url_for("dataset.moderate_comment", dataset_id=dataset.id, comment_id=comment.id),
+                }
+                for comment in comments
+            ],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
 @dataset_bp.route("/dataset/<int:dataset_id>/comments", methods=["POST"])
 @login_required
 def create_comment(dataset_id):
@@ -4,8 +4,9 @@ import os
 import shutil
 import uuid
 from typing import Optional
+from zipfile import ZIP_DEFLATED, ZipFile
 
-from flask import request
+from flask import current_app, request
 
 from app.modules.auth.services import AuthenticationService
 from app.modules.dataset.models import DataSet, DSMetaData, DSViewRecord
@@ -18,11 +19,14 @@ from app.modules.dataset.repositories import (
     DSViewRecordRepository,
 )
 from app.modules.featuremodel.repositories import FeatureModelRepository, FMMetaDataRepository
+from app.modules.flamapy.services import TRANSFORMATIONS, TransformationJob, TransformationService
 from app.modules.hubfile.repositories import (
     HubfileDownloadRecordRepository,
     HubfileRepository,
     HubfileViewRecordRepository,
 )
+from core.configuration.configuration import uploads_folder_name
+from core.decorators.decorators import read_only
 from core.services.BaseService import BaseService
 from datetime import datetime, timedelta
 from sqlalchemy import func
@@ -39,6 +43,28 @@ def calculate_checksum_and_size(file_path):
         return hash_md5, file_size
 
 
+class ZipStream:
+    """
+    Write-only file-like object used as the target of a ZipFile, so an archive can be sent to the client
+    chunk by chunk while it is being built instead of being written to disk first.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
 class DataSetService(BaseService):
     def __init__(self):
         super().__init__(DataSetRepository())
@@ -51,6 +77,7 @@ class DataSetService(BaseService):
         self.hubfilerepository = HubfileRepository()
         self.dsviewrecord_repostory = DSViewRecordRepository()
         self.hubfileviewrecord_repository = HubfileViewRecordRepository()
+        self.transformation_service = TransformationService()
 
     def move_feature_models(self, dataset: DataSet):
         current_user = AuthenticationService().get_authenticated_user()
@@ -80,6 +107,10 @@ class DataSetService(BaseService):
     def count_synchronized_datasets(self):
         return self.repository.count_synchronized_datasets()
 
+    def paginate_by_user(self, user_id: int, page: int, per_page: int):
+        return self.repository.paginate_by_user(user_id, page, per_page)
+
+    @read_only
     def get_most_downloaded_last_month(self, limit=5):
         """Get the most downloaded datasets in the last month with download counts"""
         
@@ -163,6 +194,50 @@ class DataSetService(BaseService):
     def update_dsmetadata(self, id, **kwargs):
         return self.dsmetadata_repository.update(id, **kwargs)
 
+    def get_dataset_folder(self, dataset: DataSet) -> str:
+        working_dir = os.getenv("WORKING_DIR", "")
+        return os.path.join(working_dir, uploads_folder_name(), f"user_{dataset.user_id}", f"dataset_{dataset.id}")
+
+    def export_bundle(self, dataset: DataSet):
+        """
+        Returns a generator streaming a zip archive with the original files of the dataset and the Glencoe,
+        SPLOT and DIMACS conversions of every UVL model. Conversions start in a process pool (reusing cached
+        ones) as soon as streaming begins, and run while the original files are being sent.
+        """
+        dataset_folder = self.get_dataset_folder(dataset)
+        dataset_files = dataset.files()
+        files = [file.name for file in dataset_files]
+
+        jobs = {
+            TransformationJob(os.path.join(dataset_folder, file.name), file.checksum, transformation): file.name
+            for file in dataset_files
+            if file.name.endswith(".uvl")
+            for transformation in TRANSFORMATIONS
+        }
+
+        return self._stream_bundle(f"dataset_{dataset.id}", dataset_folder, files, jobs)
+
+    def _stream_bundle(self, archive_folder, dataset_folder, files, jobs):
+        stream = ZipStream()
+        with self.transformation_service.transform_many(list(jobs)) as conversions:
+            with ZipFile(stream, "w", ZIP_DEFLATED) as zipf:
+                for filename in files:
+                    file_path = os.path.join(dataset_folder, filename)
+                    if not os.path.exists(file_path):
+                        logger.warning(f"File {file_path} not found while exporting dataset")
+                        continue
+
+                    with open(file_path, "rb") as source, zipf.open(f"{archive_folder}/{filename}", "w") as dest:
+                        shutil.copyfileobj(source, dest)
+                    yield stream.pop()
+
+                for job, path in conversions:
+                    suffix = TRANSFORMATIONS[job.transformation]
+                    zipf.write(path, arcname=f"{archive_folder}/{job.transformation}/{jobs[job]}{suffix}")
+                    yield stream.pop()
+
+        yield stream.pop()
+
     def get_uvlhub_doi(self, dataset: DataSet) -> str:
         domain = os.getenv("DOMAIN", "localhost")
         return f"http://{domain}/doi/{dataset.ds_meta_data.dataset_doi}"
@@ -225,6 +300,50 @@ class DOIMappingService(BaseService):
             return None
 
 
+class DOIResolverService:
+    """
+    Resolves the DOI of a /doi/<doi>/ URL to ("redirect", new_doi) when it was remapped, to ("dataset", id)
+    when a dataset has it, or to None. Resolutions, unknown DOIs included, are kept in the app's DOI cache,
+    which is invalidated when a DOI is assigned or remapped.
+    """
+
+    def __init__(self):
+        self.dataset_repository = DataSetRepository()
+        self.dsmetadata_repository = DSMetaDataRepository()
+        self.doi_mapping_repository = DOIMappingRepository()
+
+    def _load(self, doi: str):
+        doi_mapping = self.doi_mapping_repository.get_new_doi(doi)
+        if doi_mapping and doi_mapping.dataset_doi_new:
+            return ("redirect", doi_mapping.dataset_doi_new)
+        dataset_id = self.dsmetadata_repository.dataset_id_by_doi(doi)
+        return ("dataset", dataset_id) if dataset_id is not None else None
+
+    def resolve(self, doi: str):
+        doi_cache = current_app.extensions.get("doi_cache")
+        if doi_cache is None:
+            return self._load(doi)
+        return doi_cache.get_or_load(doi, self._load)
+
+    def get_dataset(self, doi: str):
+        """("redirect", new_doi), ("dataset", dataset) or None."""
+        resolution = self.resolve(doi)
+        if resolution is None or resolution[0] == "redirect":
+            return resolution
+
+        dataset = self.dataset_repository.get_by_id(resolution[1])
+        if dataset is None or dataset.ds_meta_data.dataset_doi != doi:
+            # Changed by another process, whose invalidation did not reach this one
+            doi_cache = current_app.extensions.get("doi_cache")
+            if doi_cache is not None:
+                doi_cache.invalidate(doi)
+            resolution = self.resolve(doi)
+            if resolution is None or resolution[0] == "redirect":
+                return resolution
+            dataset = self.dataset_repository.get_by_id(resolution[1])
+        return ("dataset", dataset)
+
+
 class SizeService:
 
     def __init__(self):
@@ -0,0 +1,20 @@
+from app import db
+from app.modules.dataset.models import DataSet
+from app.modules.dataset.repositories import DataSetRepository
+
+
+def test_get_most_downloaded_last_month(benchmark, benchmark_data):
+    datasets = benchmark(DataSetRepository().get_most_downloaded_last_month, limit=5)
+    assert len(datasets) == 5
+
+
+def test_to_dict(benchmark, benchmark_data, test_app):
+    def serialize_latest():
+        datasets = db.session.query(DataSet).order_by(DataSet.created_at.desc()).limit(50).all()
+        return [dataset.to_dict() for dataset in datasets]
+
+    with test_app.test_request_context("/"):
+        serialized = benchmark(serialize_latest)
+
+    assert len(serialized) == 50
+    assert serialized[0]["files"]
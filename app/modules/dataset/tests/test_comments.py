@@ -1,14 +1,17 @@
 import pytest
+from datetime import datetime, timedelta
 
-from flask_login import login_user
+from flask_login import login_user, logout_user
 from werkzeug.exceptions import HTTPException
 
 from app import db
 from app.modules.auth.repositories import UserRepository
-from app.modules.dataset.comment_service import CommentService
+from app.modules.conftest import capture_statements
+from app.modules.dataset.comment_service import COMMENTS_PAGE_SIZE, CommentService
 from app.modules.dataset.models import DatasetComment, PublicationType
 from app.modules.dataset.repositories import DSMetaDataRepository, DataSetRepository
 from app.modules.dataset.routes import moderate_comment
+from app.modules.profile.models import UserProfile
 
 
 @pytest.fixture
@@ -118,3 +121,80 @@ def test_moderate_comment_permissions(test_client, clean_database, create_user):
         resp = moderate_comment(dataset.id, comment3.id)
 
     assert DatasetComment.query.get(comment3.id) is None
+
+
+def test_list_page_uses_keyset_cursor_and_loads_authors(clean_database, create_user):
+    author = create_user(email="pager@example.com", password="pass")
+    db.session.add(UserProfile(user_id=author.id, name="Page", surname="Author"))
+    dataset = create_dataset_for_user(author)
+
+    # Comments sharing a timestamp are ordered by id
+    created_at = datetime(2025, 1, 1, 12, 0)
+    comments = [
+        DatasetComment(dataset_id=dataset.id, user_id=author.id, content=f"Comment {i}", created_at=created_at)
+        for i in range(5)
+    ]
+    db.session.add_all(comments)
+    db.session.add(DatasetComment(dataset_id=dataset.id, user_id=author.id, content="Hidden", is_visible=False))
+    db.session.commit()
+    dataset_id = dataset.id
+
+    service = CommentService()
+    first, cursor = service.list_page(dataset_id, limit=2)
+    second, cursor = service.list_page(dataset_id, after=cursor, limit=2)
+    third, cursor = service.list_page(dataset_id, after=cursor, limit=2)
+
+    assert [c.content for c in first + second + third] == [f"Comment {i}" for i in range(5)]
+    assert cursor is None
+
+    db.session.expire_all()
+    with capture_statements() as statements:
+        page, _ = service.list_page(dataset_id, limit=5)
+        names = [c.user.profile.name for c in page]
+
+    assert names == ["Page"] * 5
+    assert len(statements) == 1
+
+    with pytest.raises(ValueError):
+        service.list_page(dataset_id, after="not-a-cursor")
+
+
+def test_list_comments_endpoint_returns_next_pages(test_client, clean_database, create_user):
+    # Users logged in directly by earlier tests stay in the shared application context
+    with test_client.application.test_request_context():
+        logout_user()
+
+    author = create_user(email="loader@example.com", password="pass")
+    db.session.add(UserProfile(user_id=author.id, name="Load", surname="More"))
+    dataset = create_dataset_for_user(author)
+    db.session.add_all(
+        DatasetComment(
+            dataset_id=dataset.id,
+            user_id=author.id,
+            content=f"Loaded {i}",
+            created_at=datetime(2025, 1, 1) + timedelta(minutes=i),
+        )
+        for i in range(COMMENTS_PAGE_SIZE + 3)
+    )
+    db.session.commit()
+    dataset_id = dataset.id
+
+    first = test_client.get(f"/dataset/{dataset_id}/comments").get_json()
+    assert len(first["items"]) == COMMENTS_PAGE_SIZE
+    assert first["items"][0] == {
+        "id": first["items"][0]["id"],
+        "author": "Load More",
+        "content": "Loaded 0",
+        "created_at": "2025-01-01T00:00:00",
+        "created_at_display": "January 01, 2025 at 12:00 AM",
+        "can_delete": False,
+        "delete_url": f"/dataset/{dataset_id}/comments/{first['items'][0]['id']}/moderate",
+    }
+
+    second = test_client.get(f"/dataset/{dataset_id}/comments", query_string={"after": first["next_cursor"]})
+    assert [item["content"] for item in second.get_json()["items"]] == [
+        f"Loaded {i}" for i in range(COMMENTS_PAGE_SIZE, COMMENTS_PAGE_SIZE + 3)
+    ]
+    assert second.get_json()["next_cursor"] is None
+
+    assert test_client.get(f"/dataset/{dataset_id}/comments?after=bad").status_code == 400
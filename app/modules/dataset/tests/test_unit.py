@@ -1,12 +1,37 @@
+import csv
+import json
+import os
 import pytest
 import re
+import shutil
 from datetime import datetime, timedelta
+from io import BytesIO
+from zipfile import ZipFile
+
+from sqlalchemy.exc import IntegrityError
 
 from app import db
 from app.modules.auth.models import User
-from app.modules.dataset.models import DataSet, DSMetaData, DSDownloadRecord, PublicationType, Author
-from app.modules.dataset.services import DataSetService
+from app.modules.conftest import capture_statements, login, logout
+from app.modules.dataset.api import dataset_serializer
+from app.modules.dataset.export_service import CSV_COLUMNS, CatalogueExportService
+from app.modules.dataset import routes as dataset_routes
+from app.modules.dataset.models import (
+    Author,
+    DataSet,
+    DatasetComment,
+    DOIMapping,
+    DSDownloadRecord,
+    DSMetaData,
+    PublicationType,
+)
+from app.modules.dataset.services import DataSetService, calculate_checksum_and_size
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.hubfile.models import Hubfile
 from app.modules.profile.models import UserProfile
+from core.benchmarks.data_generator import SyntheticDataGenerator
+from core.managers.cache_manager import LocalLRUCache
+from core.serialisers.serializer import encode_json
 
 
 @pytest.fixture(scope="module")
@@ -122,3 +147,404 @@ def test_homepage_shows_trending_table(trending_setup):
 
     # Check that links to the dataset (DOI-based URL) are present for the top items
     assert "/doi/10.0000/trending1" in data or "10.0000/trending1" in data
+
+
+def test_export_bundle_contains_originals_and_conversions(trending_setup, tmp_path, monkeypatch):
+    """The export endpoint streams the original files plus the Glencoe, SPLOT and DIMACS conversions."""
+    client = trending_setup
+    with client.application.app_context():
+        dataset = DataSet.query.first()
+
+        fm_meta = FMMetaData(
+            uvl_filename="file1.uvl",
+            title="Export FM",
+            description="Export FM",
+            publication_type=PublicationType.NONE,
+        )
+        db.session.add(fm_meta)
+        db.session.commit()
+        feature_model = FeatureModel(data_set_id=dataset.id, fm_meta_data_id=fm_meta.id)
+        db.session.add(feature_model)
+        db.session.commit()
+
+        uvl_example = os.path.join(os.path.dirname(__file__), "..", "uvl_examples", "file1.uvl")
+        checksum, size = calculate_checksum_and_size(uvl_example)
+        db.session.add(Hubfile(name="file1.uvl", checksum=checksum, size=size, feature_model_id=feature_model.id))
+        db.session.commit()
+
+        dataset_folder = tmp_path / "uploads" / f"user_{dataset.user_id}" / f"dataset_{dataset.id}"
+        dataset_folder.mkdir(parents=True)
+        shutil.copy(uvl_example, dataset_folder / "file1.uvl")
+        dataset_id = dataset.id
+
+    monkeypatch.setenv("WORKING_DIR", f"{tmp_path}/")
+    monkeypatch.setattr(dataset_routes.dataset_service.transformation_service, "cache_dir", str(tmp_path / "cache"))
+
+    resp = client.get(f"/dataset/export/{dataset_id}")
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/zip"
+
+    with ZipFile(BytesIO(resp.data)) as zipf:
+        names = set(zipf.namelist())
+
+    folder = f"dataset_{dataset_id}"
+    assert names == {
+        f"{folder}/file1.uvl",
+        f"{folder}/glencoe/file1.uvl_glencoe.txt",
+        f"{folder}/splot/file1.uvl_splot.txt",
+        f"{folder}/dimacs/file1.uvl_cnf.txt",
+    }
+    # Conversions are cached for later exports and per-file downloads
+    assert len(os.listdir(tmp_path / "cache")) == 3
+
+
+def test_api_datasets_limit_offset_and_keyset_pagination(trending_setup):
+    client = trending_setup
+
+    first_page = client.get("/api/v1/datasets/?limit=2").get_json()
+    ids = [item["dataset_id"] for item in first_page["items"]]
+    assert len(ids) == 2 and ids == sorted(ids)
+    assert first_page["next_after"] == ids[-1]
+
+    by_keyset = client.get(f"/api/v1/datasets/?limit=2&after={first_page['next_after']}").get_json()
+    by_offset = client.get("/api/v1/datasets/?limit=2&offset=2").get_json()
+    assert by_keyset["items"] == by_offset["items"]
+    assert all(item["dataset_id"] > ids[-1] for item in by_keyset["items"])
+
+    last_page = client.get(f"/api/v1/datasets/?limit=100&after={ids[-1]}").get_json()
+    assert last_page["next_after"] is None
+
+    assert client.get("/api/v1/datasets/?limit=0").status_code == 400
+    assert client.get("/api/v1/datasets/?after=abc").status_code == 400
+
+
+def test_api_datasets_fields_and_filters(trending_setup):
+    client = trending_setup
+    with client.application.app_context():
+        user_id = User.query.filter_by(email="trender@example.com").first().id
+
+    resp = client.get(f"/api/v1/datasets/?fields=dataset_id,name&user_id={user_id}")
+    assert resp.status_code == 200
+    items = resp.get_json()["items"]
+    assert len(items) == 6
+    assert all(set(item) == {"dataset_id", "name"} for item in items)
+    assert {item["name"] for item in items} == {f"Trending DS {i}" for i in range(1, 7)}
+
+    single = client.get(f"/api/v1/datasets/{items[0]['dataset_id']}?fields=doi").get_json()
+    assert set(single) == {"doi"}
+
+    assert client.get("/api/v1/datasets/?user_id=999999").get_json()["items"] == []
+    assert client.get("/api/v1/datasets/?fields=unknown").status_code == 400
+    assert client.get("/api/v1/datasets/?created_at=2024-01-01").status_code == 400
+    assert client.get("/api/v1/datasets/?user_id=abc").status_code == 400
+
+
+def test_api_datasets_eager_loads_relationships(trending_setup):
+    client = trending_setup
+    with capture_statements() as statements:
+        resp = client.get("/api/v1/datasets/?limit=100")
+
+    assert resp.status_code == 200
+    assert len(resp.get_json()["items"]) >= 6
+    # Datasets with their metadata, then feature models and files: no query per dataset
+    assert len(statements) <= 3
+
+
+def test_api_datasets_column_only_fields_skip_orm_loading(trending_setup):
+    client = trending_setup
+    with capture_statements() as statements:
+        resp = client.get("/api/v1/datasets/?fields=dataset_id,created&limit=3")
+
+    assert resp.mimetype == "application/json"
+    body = resp.get_json()
+    assert [set(item) for item in body["items"]] == [{"dataset_id", "created"}] * 3
+    assert datetime.fromisoformat(body["items"][0]["created"])
+    assert body["next_after"] == body["items"][-1]["dataset_id"]
+    assert len(statements) == 1
+    assert "ds_meta_data" not in statements[0]
+
+
+def test_compiled_serializer_matches_model_values(trending_setup):
+    with trending_setup.application.app_context():
+        dataset = DataSet.query.order_by(DataSet.id).first()
+        serializer = dataset_serializer
+
+        serialized = serializer.serialize(dataset)
+        assert serialized == {
+            "dataset_id": dataset.id,
+            "created": dataset.created_at.isoformat(),
+            "name": dataset.name(),
+            "doi": dataset.get_uvlhub_doi(),
+            "files": [
+                {"file_id": file.id, "file_name": file.name, "size": file.get_formatted_size()}
+                for file in dataset.files()
+            ],
+        }
+
+        # The access plan is compiled once per model and field selection
+        assert serializer.get_plan(DataSet) is serializer.get_plan(DataSet)
+        assert serializer.serialize_many([dataset], fields=["name"]) == [{"name": dataset.name()}]
+
+        rows = db.session.query(DataSet.id, DataSet.created_at).order_by(DataSet.id).limit(2).all()
+        assert serializer.serialize_many(rows) == [
+            {"dataset_id": row.id, "created": row.created_at.isoformat()} for row in rows
+        ]
+        assert encode_json(serialized) == json.dumps(serialized, separators=(",", ":")).encode()
+
+
+@pytest.fixture
+def fragment_cache(trending_setup):
+    app = trending_setup.application
+    cache = app.extensions["fragment_cache"]
+    app.config["FRAGMENT_CACHE_ENABLED"] = True
+    cache.backend.clear()
+    yield cache
+    app.config["FRAGMENT_CACHE_ENABLED"] = False
+    cache.backend.clear()
+
+
+def test_dataset_page_fragments_are_cached_until_the_dataset_changes(trending_setup, fragment_cache):
+    client = trending_setup
+    with client.application.app_context():
+        user = User.query.filter_by(email="trender@example.com").first()
+        dataset = DataSet.query.join(DSMetaData).filter(DSMetaData.dataset_doi == "10.0000/trending2").first()
+        db.session.add(DatasetComment(dataset_id=dataset.id, user_id=user.id, content="First fragment comment"))
+        db.session.commit()
+        dataset_id = dataset.id
+        user_id = user.id
+
+    login(client, "trender@example.com", "test1234")
+    try:
+        first = client.get("/doi/10.0000/trending2/")
+        with capture_statements() as statements:
+            second = client.get("/doi/10.0000/trending2/")
+
+        assert first.data == second.data
+        assert b"First fragment comment" in second.data
+        # Comments, files and recommendations come from the cached fragments
+        assert not any("FROM dataset_comment" in statement for statement in statements)
+        assert not any("FROM feature_model" in statement for statement in statements)
+
+        with client.application.app_context():
+            version = fragment_cache.version(dataset_id)
+            db.session.add(DatasetComment(dataset_id=dataset_id, user_id=user_id, content="Second fragment comment"))
+            db.session.commit()
+            assert fragment_cache.version(dataset_id) != version
+
+        assert b"Second fragment comment" in client.get("/doi/10.0000/trending2/").data
+    finally:
+        logout(client)
+
+
+def test_cached_comments_only_show_delete_buttons_to_their_authors(trending_setup, fragment_cache):
+    client = trending_setup
+    with client.application.app_context():
+        user = User.query.filter_by(email="trender@example.com").first()
+        dataset = DataSet.query.join(DSMetaData).filter(DSMetaData.dataset_doi == "10.0000/trending3").first()
+        db.session.add(DatasetComment(dataset_id=dataset.id, user_id=user.id, content="Owned comment"))
+        db.session.commit()
+
+    login(client, "trender@example.com", "test1234")
+    author_page = client.get("/doi/10.0000/trending3/").data
+    logout(client)
+
+    login(client, "test@example.com", "test1234")
+    other_page = client.get("/doi/10.0000/trending3/").data
+    logout(client)
+
+    anonymous_page = client.get("/doi/10.0000/trending3/").data
+
+    assert b'class="delete-comment-form"' in author_page
+    for page in (other_page, anonymous_page):
+        assert b"Owned comment" in page
+        assert b'class="delete-comment-form"' not in page
+        assert b"<!--controls:" not in page
+
+
+def test_download_succeeds_when_recommendations_cannot_record_it(trending_setup, monkeypatch):
+    client = trending_setup
+    with client.application.app_context():
+        dataset_id = DataSet.query.join(DSMetaData).filter(DSMetaData.dataset_doi == "10.0000/trending6").first().id
+        downloads = DSDownloadRecord.query.filter_by(dataset_id=dataset_id).count()
+
+    def fail(dataset_id):
+        raise IntegrityError("INSERT INTO dataset_recommendation", {}, Exception("Duplicate entry"))
+
+    monkeypatch.setattr(dataset_routes.author_overlap_engine, "record_download", fail)
+    client.delete_cookie("download_cookie")
+    response = client.get(f"/dataset/download/{dataset_id}")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+    with client.application.app_context():
+        assert DSDownloadRecord.query.filter_by(dataset_id=dataset_id).count() == downloads + 1
+
+
+def test_local_lru_cache_evicts_expires_and_skips_loads_racing_an_invalidation():
+    now = [0.0]
+    cache = LocalLRUCache(maxsize=2, ttl=10, negative_ttl=1, clock=lambda: now[0])
+
+    assert cache.get_or_load("a", lambda key: 1) == 1
+    assert cache.get_or_load("b", lambda key: None) is None
+    assert cache.get_or_load("a", lambda key: 2) == 1
+    cache.get_or_load("c", lambda key: 3)
+    # "b" was the least recently used entry
+    assert cache.get_or_load("b", lambda key: "b") == "b"
+    assert cache.get_or_load("c", lambda key: 4) == 3
+    assert cache.get_or_load("a", lambda key: 5) == 5
+
+    now[0] = 11
+    assert cache.get_or_load("c", lambda key: 6) == 6
+
+    def load_while_invalidated(key):
+        cache.invalidate(key)
+        return "stale"
+
+    assert cache.get_or_load("d", load_while_invalidated) == "stale"
+    assert cache.get_or_load("d", lambda key: "fresh") == "fresh"
+
+
+def test_doi_resolutions_are_cached_until_a_doi_is_assigned_or_remapped(trending_setup):
+    client = trending_setup
+    app = client.application
+    doi_cache = app.extensions["doi_cache"]
+    doi_cache.clear()
+
+    with app.app_context():
+        dataset = DataSet.query.join(DSMetaData).filter(DSMetaData.dataset_doi == "10.0000/trending4").first()
+        ds_meta_data_id = dataset.ds_meta_data_id
+
+    assert client.get("/doi/10.0000/trending4/").status_code == 200
+    assert client.get("/doi/10.0000/unassigned/").status_code == 404
+    with capture_statements() as statements:
+        assert client.get("/doi/10.0000/trending4/").status_code == 200
+        assert client.get("/doi/10.0000/unassigned/").status_code == 404
+    assert not any("FROM doi_mapping" in statement for statement in statements)
+    assert not any("dataset_doi =" in statement for statement in statements)
+
+    try:
+        with app.app_context():
+            db.session.get(DSMetaData, ds_meta_data_id).dataset_doi = "10.0000/unassigned"
+            db.session.add(DOIMapping(dataset_doi_old="10.0000/trending4", dataset_doi_new="10.0000/unassigned"))
+            db.session.commit()
+
+        redirected = client.get("/doi/10.0000/trending4/")
+        assert redirected.status_code == 302
+        assert redirected.headers["Location"].endswith("/doi/10.0000/unassigned/")
+        assert client.get("/doi/10.0000/unassigned/").status_code == 200
+    finally:
+        with app.app_context():
+            DOIMapping.query.filter_by(dataset_doi_old="10.0000/trending4").delete()
+            db.session.get(DSMetaData, ds_meta_data_id).dataset_doi = "10.0000/trending4"
+            db.session.commit()
+        doi_cache.clear()
+
+
+def test_catalogue_export_streams_every_dataset_with_its_authors_and_files(trending_setup):
+    client = trending_setup
+    with client.application.app_context():
+        expected = {
+            dataset.id: (
+                [author.name for author in dataset.ds_meta_data.authors],
+                [file.id for file in dataset.files()],
+            )
+            for dataset in DataSet.query.join(DSMetaData).filter(DSMetaData.dataset_doi.isnot(None))
+        }
+        # Small batches, so records are merged across several fetches of each cursor
+        records = list(CatalogueExportService(batch_size=2).records())
+
+    assert [record["dataset_id"] for record in records] == sorted(expected)
+    for record in records:
+        assert [author["name"] for author in record["authors"]] == expected[record["dataset_id"]][0]
+        assert sorted(file["file_id"] for file in record["files"]) == sorted(expected[record["dataset_id"]][1])
+        assert record["files_count"] == len(record["files"])
+
+    # Anonymous users and standard users can't start an export
+    assert client.get("/api/v1/datasets/export").status_code == 302
+    login(client, "trender@example.com", "test1234")
+    try:
+        assert client.get("/api/v1/datasets/export").status_code == 302
+    finally:
+        logout(client)
+
+    # Requests share the test application context, so the role is changed in the session they use
+    User.query.filter_by(email="trender@example.com").first().role = "admin"
+    db.session.commit()
+    login(client, "trender@example.com", "test1234")
+    try:
+        response = client.get("/api/v1/datasets/export")
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert [json.loads(line) for line in response.data.decode().splitlines()] == records
+
+        response = client.get("/api/v1/datasets/export?format=csv")
+        assert response.mimetype == "text/csv"
+        rows = list(csv.reader(response.data.decode().splitlines()))
+        assert tuple(rows[0]) == CSV_COLUMNS
+        assert [int(row[0]) for row in rows[1:]] == sorted(expected)
+        trending = next(row for row in rows[1:] if row[CSV_COLUMNS.index("dataset_doi")] == "10.0000/trending1")
+        assert trending[CSV_COLUMNS.index("authors")] == "Author 1"
+        assert trending[CSV_COLUMNS.index("tags")] == "trending,tests"
+
+        assert client.get("/api/v1/datasets/export?format=xml").status_code == 400
+    finally:
+        logout(client)
+        User.query.filter_by(email="trender@example.com").first().role = "standard"
+        db.session.commit()
+
+
+def test_catalogue_export_leaves_out_datasets_without_doi(trending_setup):
+    client = trending_setup
+    with client.application.app_context():
+        owner = User.query.filter_by(email="trender@example.com").first()
+        ds_meta = DSMetaData(
+            title="Unsynchronized DS",
+            description="Only its owner sees it",
+            publication_type=PublicationType.NONE,
+            dataset_doi=None,
+        )
+        db.session.add(ds_meta)
+        db.session.commit()
+        db.session.add(Author(name="Hidden Author", orcid="0000-0000-0000-0001", ds_meta_data_id=ds_meta.id))
+        dataset = DataSet(user_id=owner.id, ds_meta_data_id=ds_meta.id, created_at=datetime.utcnow())
+        db.session.add(dataset)
+        db.session.commit()
+        dataset_id = dataset.id
+
+        try:
+            records = list(CatalogueExportService(batch_size=2).records())
+            assert records
+            assert dataset_id not in [record["dataset_id"] for record in records]
+            assert all(record["dataset_doi"] for record in records)
+            assert "Hidden Author" not in [author["name"] for record in records for author in record["authors"]]
+        finally:
+            db.session.delete(dataset)
+            Author.query.filter_by(ds_meta_data_id=ds_meta.id).delete()
+            db.session.delete(ds_meta)
+            db.session.commit()
+
+
+def test_synthetic_catalogue_is_deterministic_and_links_example_files(test_client, clean_database, tmp_path):
+    """
+    Test that the bulk seeder honours its scale factors, repeats the same catalogue for the same seed and
+    creates the files as hard links to the example files.
+    """
+    summary = SyntheticDataGenerator(40, seed=7, uploads_dir=str(tmp_path), downloads_per_dataset=2).generate()
+    assert summary["datasets"] == 40
+    assert summary["downloads"] == 80
+    assert summary["linked_files"] == summary["files"] == Hubfile.query.count()
+
+    hubfile = db.session.get(Hubfile, 1)
+    feature_model = db.session.get(FeatureModel, hubfile.feature_model_id)
+    dataset = db.session.get(DataSet, feature_model.data_set_id)
+    path = tmp_path / f"user_{dataset.user_id}" / f"dataset_{dataset.id}" / hubfile.name
+    assert os.stat(path).st_nlink > 1
+    assert calculate_checksum_and_size(path) == (hubfile.checksum, hubfile.size)
+
+    titles = [title for (title,) in db.session.query(DSMetaData.title).order_by(DSMetaData.id)]
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+
+    SyntheticDataGenerator(40, seed=7).generate()
+    assert [title for (title,) in db.session.query(DSMetaData.title).order_by(DSMetaData.id)] == titles
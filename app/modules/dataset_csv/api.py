@@ -13,7 +13,12 @@ dataset_fields = {
     "files": "files",
 }
 
-dataset_serializer = Serializer(dataset_fields, related_serializers={"files": file_serializer})
+# name, doi and files are model methods, so the relationships they read are declared to be eager loaded
+dataset_serializer = Serializer(
+    dataset_fields,
+    related_serializers={"files": file_serializer},
+    load_hints={"name": "ds_meta_data", "doi": "ds_meta_data", "files": "feature_models.files"},
+)
 
 DataSetResource = create_resource(DataSet, dataset_serializer)
 
@@ -23,24 +23,24 @@ from flask_login import current_user, login_required
 from app.modules.dataset_csv import dataset_csv_bp
 from app.modules.dataset_csv.forms import DataSetForm
 from app.modules.dataset.models import DSDownloadRecord
+from app.modules.dataset.services import DOIResolverService
 from app.modules.dataset_csv.services import (
     AuthorService,
     DataSetService,
-    DOIMappingService,
     DSDownloadRecordService,
-    DSMetaDataService,
     DSViewRecordService,
 )
 from app.modules.zenodo.services import ZenodoService
+from app.modules.recommendations.service import author_overlap_engine, index_published_dataset
+from core.managers.cache_manager import serve_page
 
 logger = logging.getLogger(__name__)
 
 
 dataset_service = DataSetService()
 author_service = AuthorService()
-dsmetadata_service = DSMetaDataService()
 zenodo_service = ZenodoService()
-doi_mapping_service = DOIMappingService()
+doi_resolver_service = DOIResolverService()
 ds_view_record_service = DSViewRecordService()
 
 
@@ -64,6 +64,9 @@ def create_dataset():
             logger.exception(f"Exception while create dataset data in local {exc}")
             return jsonify({"Exception while create dataset data in local: ": str(exc)}), 400
 
+        # Failures are logged and don't stop the upload
+        index_published_dataset(dataset)
+
         # send dataset as deposition to fakenodo (Zenodo enabled)
         # The application must not call the real Zenodo API; ZenodoService is configured to use fakenodo.
         use_zenodo = True
@@ -343,6 +346,11 @@ def download_dataset(dataset_id):
             download_date=datetime.now(timezone.utc),
             download_cookie=user_cookie,
         )
+        try:
+            author_overlap_engine.record_download(dataset_id)
+        except Exception:
+            # Non-fatal: the recommendations are recomputed by `rosemary recommendations:rebuild`
+            logger.exception("Failed to record the download for recommendations")
 
     return resp
 
@@ -350,24 +358,24 @@ def download_dataset(dataset_id):
 @dataset_csv_bp.route("/doi/<path:doi>/", methods=["GET"])
 def subdomain_index(doi):
 
-    # Check if the DOI is an old DOI
-    new_doi = doi_mapping_service.get_new_doi(doi)
-    if new_doi:
-        # Redirect to the same path with the new DOI
-        return redirect(url_for("dataset_csv.subdomain_index", doi=new_doi), code=302)
-
-    # Try to search the dataset by the provided DOI (which should already be the new one)
-    ds_meta_data = dsmetadata_service.filter_by_doi(doi)
+    # Old DOIs redirect to the new one, others resolve to their dataset (cached, see DOIResolverService)
+    resolution = doi_resolver_service.get_dataset(doi)
 
-    if not ds_meta_data:
+    if resolution is None:
         abort(404)
 
-    # Get dataset
-    dataset = ds_meta_data.data_set
+    kind, target = resolution
+    if kind == "redirect":
+        # Redirect to the same path with the new DOI
+        return redirect(url_for("dataset_csv.subdomain_index", doi=target), code=302)
+
+    dataset = target
 
     # Save the cookie to the user's browser
     user_cookie = ds_view_record_service.create_cookie(dataset=dataset)
-    resp = make_response(render_template("dataset/view_dataset.html", dataset=dataset))
+
+    # Views must be recorded on every visit, so clients revalidate the cached page with its ETag
+    resp = serve_page(lambda: render_template("dataset/view_dataset.html", dataset=dataset), cache_control="no-cache")
     resp.set_cookie("view_cookie", user_cookie)
 
     return resp
@@ -1,10 +1,12 @@
 import re
 
 import unidecode
-from sqlalchemy import any_, or_
+from sqlalchemy import or_
+from sqlalchemy.orm import selectinload
 
 from app.modules.dataset.models import Author, DataSet, DSMetaData, PublicationType
 from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from core.decorators.decorators import read_only
 from core.repositories.BaseRepository import BaseRepository
 
 
@@ -12,6 +14,7 @@ class ExploreRepository(BaseRepository):
     def __init__(self):
         super().__init__(DataSet)
 
+    @read_only
     def filter(self, query="", sorting="newest", publication_type="any", tags=[], **kwargs):
         # Normalize and remove unwanted characters
         normalized_query = unidecode.unidecode(query).lower()
@@ -38,6 +41,11 @@ class ExploreRepository(BaseRepository):
             .join(FeatureModel.fm_meta_data)
             .filter(or_(*filters))
             .filter(DSMetaData.dataset_doi.isnot(None))  # Exclude datasets with empty dataset_doi
+            # Load everything DataSet.to_dict reads up front instead of lazily per dataset
+            .options(
+                selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+                selectinload(DataSet.feature_models).selectinload(FeatureModel.files),
+            )
         )
 
         if publication_type != "any":
@@ -51,7 +59,7 @@ class ExploreRepository(BaseRepository):
                 datasets = datasets.filter(DSMetaData.publication_type == matching_type.name)
 
         if tags:
-            datasets = datasets.filter(DSMetaData.tags.ilike(any_(f"%{tag}%" for tag in tags)))
+            datasets = datasets.filter(or_(*[DSMetaData.tags.ilike(f"%{tag}%") for tag in tags]))
 
         # Order by created_at
         if sorting == "oldest":
@@ -1,18 +1,31 @@
-from flask import jsonify, render_template, request
+from flask import render_template, request
+from werkzeug.http import http_date
 
 from app.modules.explore import explore_bp
 from app.modules.explore.forms import ExploreForm
 from app.modules.explore.services import ExploreService
+from core.decorators.decorators import cached_page, read_only
+from core.serialisers.serializer import json_response
 
 
 @explore_bp.route("/explore", methods=["GET", "POST"])
+@read_only
 def index():
     if request.method == "GET":
-        query = request.args.get("query", "")
-        form = ExploreForm()
-        return render_template("explore/index.html", form=form, query=query)
+        return explore_page()
 
     if request.method == "POST":
         criteria = request.get_json()
         datasets = ExploreService().filter(**criteria)
-        return jsonify([dataset.to_dict() for dataset in datasets])
+        items = [dataset.to_dict() for dataset in datasets]
+        for item in items:
+            # Keep the date format jsonify used
+            item["created_at"] = http_date(item["created_at"])
+        return json_response(items)
+
+
+@cached_page
+def explore_page():
+    query = request.args.get("query", "")
+    form = ExploreForm()
+    return render_template("explore/index.html", form=form, query=query)
@@ -0,0 +1,28 @@
+from app.modules.explore.repositories import ExploreRepository
+
+
+def test_filter_by_word(benchmark, benchmark_data):
+    repository = ExploreRepository()
+    datasets = benchmark(repository.filter, query=benchmark_data["words"][0])
+    assert datasets
+
+
+def test_filter_by_several_words(benchmark, benchmark_data):
+    repository = ExploreRepository()
+    benchmark(repository.filter, query=" ".join(benchmark_data["words"][:3]), sorting="oldest")
+
+
+def test_filter_by_publication_type_and_tag(benchmark, benchmark_data):
+    repository = ExploreRepository()
+    benchmark(
+        repository.filter,
+        query=benchmark_data["words"][1],
+        publication_type="article",
+        tags=[benchmark_data["tags"][0]],
+    )
+
+
+def test_explore_json(benchmark, benchmark_data, test_app):
+    client = test_app.test_client()
+    response = benchmark(client.post, "/explore", json={"query": benchmark_data["words"][0]})
+    assert response.status_code == 200
@@ -0,0 +1,154 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+from werkzeug.http import http_date
+
+from app import create_app, db
+from app.modules.auth.models import User
+from app.modules.conftest import capture_statements
+from app.modules.dataset.models import Author, DataSet, DSMetaData, PublicationType
+from app.modules.dataset.repositories import AuthorRepository
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.hubfile.models import Hubfile
+from core.managers.cache_manager import serve_page
+from core.managers.config_manager import TestingConfig
+from core.managers.database_manager import PRIMARY_UNTIL_KEY
+
+
+@pytest.fixture(scope="module")
+def test_client(test_client):
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        for i in range(3):
+            ds_meta = DSMetaData(
+                title=f"Explorable dataset {i}",
+                description="Dataset for explore tests",
+                publication_type=PublicationType.JOURNAL_ARTICLE,
+                dataset_doi=f"10.1234/explore{i}",
+                tags="explore,tests",
+            )
+            ds_meta.authors.append(Author(name=f"Explorer {i}", affiliation="Univ"))
+            dataset = DataSet(user_id=user.id, ds_meta_data=ds_meta, created_at=datetime(2024, 5, 1, 10, i))
+            fm_meta = FMMetaData(
+                uvl_filename=f"explore{i}.uvl",
+                title=f"Explore FM {i}",
+                description="FM",
+                publication_type=PublicationType.NONE,
+            )
+            feature_model = FeatureModel(data_set=dataset, fm_meta_data=fm_meta)
+            feature_model.files.append(Hubfile(name=f"explore{i}.uvl", checksum=f"sum{i}", size=1024))
+            db.session.add(dataset)
+        db.session.commit()
+
+    yield test_client
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    """
+    Application whose primary and replica are two SQLite files. The primary has one author and the replica
+    three, so each count tells which database answered.
+    """
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_BINDS", {"replica": f"sqlite:///{tmp_path / 'replica.db'}"})
+    app = create_app("testing")
+
+    @app.route("/replica-test/authors", methods=["GET", "POST"])
+    def count_authors():
+        return {"authors": AuthorRepository().count()}
+
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines["replica"])
+        with db.engine.begin() as connection:
+            connection.execute(insert(Author), [{"name": "Primary author"}])
+        with db.engines["replica"].begin() as connection:
+            connection.execute(insert(Author), [{"name": f"Replica author {i}"} for i in range(3)])
+
+    yield app
+
+    # The bind registers its own metadata on `db`, which the other applications do not have an engine for
+    db.metadatas.pop("replica", None)
+
+
+def test_read_only_methods_fall_back_to_the_primary_without_replica(test_client):
+    with test_client.application.test_request_context("/"):
+        assert AuthorRepository().count() == Author.query.count()
+
+
+def test_read_only_methods_read_from_the_replica(replica_app):
+    with replica_app.test_request_context("/"):
+        assert AuthorRepository().count() == 3
+        assert Author.query.count() == 1
+
+        # Once the session has written, its reads stay on the primary
+        db.session.add(Author(name="New author"))
+        db.session.commit()
+        assert AuthorRepository().count() == 2
+
+    with replica_app.test_request_context("/", method="POST"):
+        assert AuthorRepository().count() == 2
+
+
+def test_users_read_from_the_primary_after_a_post(replica_app):
+    client = replica_app.test_client()
+
+    assert client.get("/replica-test/authors").get_json() == {"authors": 3}
+    assert client.post("/replica-test/authors").get_json() == {"authors": 1}
+    assert client.get("/replica-test/authors").get_json() == {"authors": 1}
+
+    # Once the replica has had time to catch up, reads go back to it
+    with client.session_transaction() as session:
+        session[PRIMARY_UNTIL_KEY] = 0
+    assert client.get("/replica-test/authors").get_json() == {"authors": 3}
+
+    # Searches are sent as POST but do not write, so they neither stick to the primary nor need to
+    client.post("/explore", json={"query": ""})
+    assert client.get("/replica-test/authors").get_json() == {"authors": 3}
+
+
+def test_cache_misses_are_rendered_from_the_primary(replica_app):
+    """
+    Test that pages and fragments about to be cached read from the primary, since the replica may still lag
+    behind the change that invalidated them.
+    """
+    replica_app.config.update(PAGE_CACHE_ENABLED=True, FRAGMENT_CACHE_ENABLED=True)
+
+    @replica_app.route("/replica-test/page")
+    def cached_authors_page():
+        return serve_page(lambda: f"{AuthorRepository().count()} authors")
+
+    client = replica_app.test_client()
+    response = client.get("/replica-test/page")
+    assert response.headers["X-Page-Cache"] == "MISS"
+    assert response.data == b"1 authors"
+    # Views that are not cached keep reading from the replica
+    assert client.get("/replica-test/authors").get_json() == {"authors": 3}
+
+    with replica_app.test_request_context("/"):
+        fragment_cache = replica_app.extensions["fragment_cache"]
+        assert fragment_cache.render("authors", 1, lambda: str(AuthorRepository().count())) == "1"
+        assert AuthorRepository().count() == 3
+
+
+def test_explore_json_returns_datasets(test_client):
+    response = test_client.post("/explore", json={"query": "explorable", "sorting": "oldest"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    items = response.get_json()
+    assert [item["title"] for item in items] == [f"Explorable dataset {i}" for i in range(3)]
+    assert items[0]["created_at"] == http_date(datetime(2024, 5, 1, 10, 0))
+    assert items[0]["authors"] == [{"name": "Explorer 0", "affiliation": "Univ", "orcid": None}]
+    assert items[0]["files"][0]["name"] == "explore0.uvl"
+    assert items[0]["files_count"] == 1
+
+
+def test_explore_json_loads_relationships_in_bulk(test_client):
+    with capture_statements() as statements:
+        response = test_client.post("/explore", json={"query": "explorable"})
+
+    assert len(response.get_json()) == 3
+    # Datasets, metadata, authors, feature models and files: no query per dataset
+    assert len(statements) <= 5
@@ -1,6 +1,7 @@
 from sqlalchemy import func
 
 from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from core.decorators.decorators import read_only
 from core.repositories.BaseRepository import BaseRepository
 
 
@@ -8,6 +9,7 @@ class FeatureModelRepository(BaseRepository):
     def __init__(self):
         super().__init__(FeatureModel)
 
+    @read_only
     def count_feature_models(self) -> int:
         max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
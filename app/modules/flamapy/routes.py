@@ -1,24 +1,33 @@
-import logging
-import os
-import tempfile
 import csv
+import logging
 
-from antlr4 import CommonTokenStream, FileStream
-from antlr4.error.ErrorListener import ErrorListener
-from flamapy.metamodels.fm_metamodel.transformations import GlencoeWriter, SPLOTWriter, UVLReader
-from flamapy.metamodels.pysat_metamodel.transformations import DimacsWriter, FmToPysat
-from flask import jsonify, send_file
-from uvl.UVLCustomLexer import UVLCustomLexer
-from uvl.UVLPythonParser import UVLPythonParser
+from flask import jsonify, request, send_file
 
 from app.modules.flamapy import flamapy_bp
+from app.modules.flamapy.services import (
+    TRANSFORMATIONS,
+    BDDCompilationTimeout,
+    BDDService,
+    TransformationService,
+)
 from app.modules.hubfile.services import HubfileService
 
 logger = logging.getLogger(__name__)
 
+bdd_service = BDDService()
+transformation_service = TransformationService()
+
+MAX_SAMPLE_SIZE = 100
+
 
 @flamapy_bp.route("/flamapy/check_uvl/<int:file_id>", methods=["GET"])
 def check_uvl(file_id):
+    # The UVL parser takes long to import, so it is only imported when a model is checked
+    from antlr4 import CommonTokenStream, FileStream
+    from antlr4.error.ErrorListener import ErrorListener
+    from uvl.UVLCustomLexer import UVLCustomLexer
+    from uvl.UVLPythonParser import UVLPythonParser
+
     class CustomErrorListener(ErrorListener):
         def __init__(self):
             self.errors = []
@@ -109,47 +118,60 @@ def check_csv(file_id):
         return jsonify({"error": str(e)}), 500
 
 
+def send_transformation(file_id, transformation):
+    hubfile = HubfileService().get_or_404(file_id)
+    path = transformation_service.get_transformation(hubfile.get_path(), hubfile.checksum, transformation)
+
+    # Return the (cached) file in the response
+    return send_file(path, as_attachment=True, download_name=f"{hubfile.name}{TRANSFORMATIONS[transformation]}")
+
+
 @flamapy_bp.route("/flamapy/to_glencoe/<int:file_id>", methods=["GET"])
 def to_glencoe(file_id):
-    temp_file = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
-    try:
-        hubfile = HubfileService().get_or_404(file_id)
-        fm = UVLReader(hubfile.get_path()).transform()
-        GlencoeWriter(temp_file.name, fm).transform()
-
-        # Return the file in the response
-        return send_file(temp_file.name, as_attachment=True, download_name=f"{hubfile.name}_glencoe.txt")
-    finally:
-        # Clean up the temporary file
-        os.remove(temp_file.name)
+    return send_transformation(file_id, "glencoe")
 
 
 @flamapy_bp.route("/flamapy/to_splot/<int:file_id>", methods=["GET"])
 def to_splot(file_id):
-    temp_file = tempfile.NamedTemporaryFile(suffix=".splx", delete=False)
-    try:
-        hubfile = HubfileService().get_by_id(file_id)
-        fm = UVLReader(hubfile.get_path()).transform()
-        SPLOTWriter(temp_file.name, fm).transform()
-
-        # Return the file in the response
-        return send_file(temp_file.name, as_attachment=True, download_name=f"{hubfile.name}_splot.txt")
-    finally:
-        # Clean up the temporary file
-        os.remove(temp_file.name)
+    return send_transformation(file_id, "splot")
 
 
 @flamapy_bp.route("/flamapy/to_cnf/<int:file_id>", methods=["GET"])
 def to_cnf(file_id):
-    temp_file = tempfile.NamedTemporaryFile(suffix=".cnf", delete=False)
+    return send_transformation(file_id, "dimacs")
+
+
+def bdd_analysis(file_id, operation):
+    hubfile = HubfileService().get_or_404(file_id)
     try:
-        hubfile = HubfileService().get_by_id(file_id)
-        fm = UVLReader(hubfile.get_path()).transform()
-        sat = FmToPysat(fm).transform()
-        DimacsWriter(temp_file.name, sat).transform()
-
-        # Return the file in the response
-        return send_file(temp_file.name, as_attachment=True, download_name=f"{hubfile.name}_cnf.txt")
-    finally:
-        # Clean up the temporary file
-        os.remove(temp_file.name)
+        return jsonify({"file_id": file_id, **operation(hubfile)}), 200
+    except BDDCompilationTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@flamapy_bp.route("/flamapy/configurations_number/<int:file_id>", methods=["GET"])
+def configurations_number(file_id):
+    return bdd_analysis(file_id, lambda hubfile: {"configurations_number": bdd_service.configurations_number(hubfile)})
+
+
+@flamapy_bp.route("/flamapy/sampling/<int:file_id>", methods=["GET"])
+def sampling(file_id):
+    size = min(max(request.args.get("size", 10, type=int), 0), MAX_SAMPLE_SIZE)
+    return bdd_analysis(file_id, lambda hubfile: {"configurations": bdd_service.sampling(hubfile, size)})
+
+
+@flamapy_bp.route("/flamapy/core_features/<int:file_id>", methods=["GET"])
+def core_features(file_id):
+    return bdd_analysis(file_id, lambda hubfile: {"core_features": bdd_service.core_features(hubfile)})
+
+
+@flamapy_bp.route("/flamapy/dead_features/<int:file_id>", methods=["GET"])
+def dead_features(file_id):
+    return bdd_analysis(file_id, lambda hubfile: {"dead_features": bdd_service.dead_features(hubfile)})
+
+
+@flamapy_bp.route("/flamapy/commonality/<int:file_id>", methods=["GET"])
+def commonality(file_id):
+    return bdd_analysis(file_id, lambda hubfile: {"commonality": bdd_service.commonality(hubfile)})
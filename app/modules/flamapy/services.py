@@ -1,7 +1,267 @@
-from app.modules.flamapy.repositories import FlamapyRepository
-from core.services.BaseService import BaseService
+from __future__ import annotations
 
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
 
-class FlamapyService(BaseService):
-    def __init__(self):
-        super().__init__(FlamapyRepository())
+from app.modules.hubfile.models import Hubfile
+from core.configuration.configuration import uploads_folder_name
+
+# flamapy takes long to import, so it is only imported by the functions that use it
+if TYPE_CHECKING:
+    from flamapy.metamodels.bdd_metamodel.models import BDDModel
+
+logger = logging.getLogger(__name__)
+
+
+class BDDCompilationError(Exception):
+    pass
+
+
+class BDDCompilationTimeout(BDDCompilationError):
+    pass
+
+
+def compile_bdd(uvl_path: str, bdd_path: str, features_path: str):
+    """
+    Compiles a UVL file into a BDD and stores it on disk using dd's JSON serialization, together with
+    the variable -> feature name mapping (dd only keeps variable names).
+
+    Files are written under a temporary name and renamed, so concurrent readers never see partial dumps.
+    """
+    from flamapy.metamodels.bdd_metamodel.transformations import FmToBDD
+    from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+
+    fm = UVLReader(uvl_path).transform()
+    bdd_model = FmToBDD(fm).transform()
+
+    # dd infers the serialization format from the extension, so it is kept in the temporary name
+    tmp_bdd_path = f"{bdd_path[:-len('.json')]}.{os.getpid()}.tmp.json"
+    tmp_features_path = f"{features_path}.{os.getpid()}.tmp"
+
+    bdd_model.bdd.dump(tmp_bdd_path, roots=[bdd_model.root])
+    with open(tmp_features_path, "w") as f:
+        json.dump(bdd_model.variables_features, f)
+
+    os.replace(tmp_features_path, features_path)
+    os.replace(tmp_bdd_path, bdd_path)
+
+
+class BDDService:
+    """
+    Serves BDD analyses for hubfiles. Each model is compiled at most once per checksum: compiled BDDs are
+    persisted in the cache folder and kept in a small in-process LRU, so repeated queries skip compilation.
+    """
+
+    _models = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, cache_dir: str = None, timeout: float = None, memory_cache_size: int = None):
+        working_dir = os.getenv("WORKING_DIR", "")
+        self.cache_dir = cache_dir or os.getenv(
+            "FLAMAPY_BDD_CACHE_DIR", os.path.join(working_dir, uploads_folder_name(), "bdd_cache")
+        )
+        self.timeout = timeout if timeout is not None else float(os.getenv("FLAMAPY_BDD_TIMEOUT", "30"))
+        self.memory_cache_size = (
+            memory_cache_size
+            if memory_cache_size is not None
+            else int(os.getenv("FLAMAPY_BDD_MEMORY_CACHE_SIZE", "32"))
+        )
+
+    def get_cache_paths(self, checksum: str) -> tuple[str, str]:
+        return (
+            os.path.join(self.cache_dir, f"{checksum}.json"),
+            os.path.join(self.cache_dir, f"{checksum}.features.json"),
+        )
+
+    def get_bdd_model(self, hubfile: Hubfile) -> BDDModel:
+        return self.get_bdd_model_by_path(hubfile.get_path(), hubfile.checksum)
+
+    def get_bdd_model_by_path(self, uvl_path: str, checksum: str) -> BDDModel:
+        with self._lock:
+            if checksum in self._models:
+                self._models.move_to_end(checksum)
+                return self._models[checksum]
+
+        bdd_path, features_path = self.get_cache_paths(checksum)
+        if not (os.path.exists(bdd_path) and os.path.exists(features_path)):
+            self._compile(uvl_path, bdd_path, features_path)
+
+        bdd_model = self._load(bdd_path, features_path)
+
+        with self._lock:
+            self._models[checksum] = bdd_model
+            while len(self._models) > self.memory_cache_size:
+                self._models.popitem(last=False)
+
+        return bdd_model
+
+    def _compile(self, uvl_path: str, bdd_path: str, features_path: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Heavy models can take very long to compile, so compilation runs in a separate process
+        # that is terminated once the timeout expires.
+        worker = multiprocessing.Process(target=compile_bdd, args=(uvl_path, bdd_path, features_path))
+        worker.start()
+        worker.join(self.timeout)
+
+        if worker.is_alive():
+            worker.terminate()
+            worker.join()
+            logger.warning(f"BDD compilation of {uvl_path} timed out after {self.timeout}s")
+            raise BDDCompilationTimeout(f"BDD compilation timed out after {self.timeout} seconds")
+
+        if worker.exitcode != 0 or not os.path.exists(bdd_path):
+            raise BDDCompilationError(f"BDD compilation of {os.path.basename(uvl_path)} failed")
+
+    def _load(self, bdd_path: str, features_path: str) -> BDDModel:
+        from flamapy.metamodels.bdd_metamodel.transformations import JSONReader
+
+        bdd_model = JSONReader(bdd_path).transform()
+        with open(features_path, "r") as f:
+            variables_features = json.load(f)
+        bdd_model.variables_features = variables_features
+        bdd_model.features_variables = {feature: variable for variable, feature in variables_features.items()}
+        return bdd_model
+
+    @classmethod
+    def clear_memory_cache(cls):
+        with cls._lock:
+            cls._models.clear()
+
+    def configurations_number(self, hubfile: Hubfile) -> int:
+        from flamapy.metamodels.bdd_metamodel.operations import BDDConfigurationsNumber
+
+        return BDDConfigurationsNumber().execute(self.get_bdd_model(hubfile)).get_result()
+
+    def sampling(self, hubfile: Hubfile, sample_size: int) -> list[list[str]]:
+        from flamapy.metamodels.bdd_metamodel.operations import BDDConfigurationsNumber, BDDSampling
+
+        bdd_model = self.get_bdd_model(hubfile)
+
+        # Sampling is done without replacement, so there can't be more samples than configurations
+        sample_size = min(sample_size, BDDConfigurationsNumber().execute(bdd_model).get_result())
+
+        operation = BDDSampling()
+        operation.set_sample_size(sample_size)
+        return [sorted(config.get_selected_elements()) for config in operation.execute(bdd_model).get_result()]
+
+    def core_features(self, hubfile: Hubfile) -> list[str]:
+        from flamapy.metamodels.bdd_metamodel.operations import BDDCoreFeatures
+
+        return BDDCoreFeatures().execute(self.get_bdd_model(hubfile)).get_result()
+
+    def dead_features(self, hubfile: Hubfile) -> list[str]:
+        from flamapy.metamodels.bdd_metamodel.operations import BDDDeadFeatures
+
+        return BDDDeadFeatures().execute(self.get_bdd_model(hubfile)).get_result()
+
+    def commonality(self, hubfile: Hubfile) -> dict[str, float]:
+        from flamapy.metamodels.bdd_metamodel.operations import BDDFeatureInclusionProbability
+
+        return dict(BDDFeatureInclusionProbability().execute(self.get_bdd_model(hubfile)).get_result())
+
+
+# Supported UVL transformations and the suffix of the file they produce
+TRANSFORMATIONS = {
+    "glencoe": "_glencoe.txt",
+    "splot": "_splot.txt",
+    "dimacs": "_cnf.txt",
+}
+
+TransformationJob = namedtuple("TransformationJob", ["uvl_path", "checksum", "transformation"])
+
+
+def transform_uvl(uvl_path: str, transformation: str, dest_path: str) -> str:
+    """
+    Converts a UVL file to the given format and stores the result in dest_path.
+    """
+    from flamapy.metamodels.fm_metamodel.transformations import GlencoeWriter, SPLOTWriter, UVLReader
+    from flamapy.metamodels.pysat_metamodel.transformations import DimacsWriter, FmToPysat
+
+    fm = UVLReader(uvl_path).transform()
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+
+    if transformation == "glencoe":
+        GlencoeWriter(tmp_path, fm).transform()
+    elif transformation == "splot":
+        SPLOTWriter(tmp_path, fm).transform()
+    elif transformation == "dimacs":
+        DimacsWriter(tmp_path, FmToPysat(fm).transform()).transform()
+    else:
+        raise ValueError(f"Unknown transformation: {transformation}")
+
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+class TransformationService:
+    """
+    Converts UVL models to other formats. Results are cached on disk per checksum and format, so every
+    model is converted at most once no matter how many times (or through which endpoint) it is requested.
+    """
+
+    def __init__(self, cache_dir: str = None, max_workers: int = None):
+        working_dir = os.getenv("WORKING_DIR", "")
+        self.cache_dir = os.path.abspath(
+            cache_dir
+            or os.getenv(
+                "FLAMAPY_TRANSFORMATION_CACHE_DIR",
+                os.path.join(working_dir, uploads_folder_name(), "transformation_cache"),
+            )
+        )
+        self.max_workers = max_workers or int(os.getenv("FLAMAPY_TRANSFORMATION_WORKERS", os.cpu_count() or 1))
+
+    def get_cache_path(self, checksum: str, transformation: str) -> str:
+        return os.path.join(self.cache_dir, f"{checksum}{TRANSFORMATIONS[transformation]}")
+
+    def get_transformation(self, uvl_path: str, checksum: str, transformation: str) -> str:
+        path = self.get_cache_path(checksum, transformation)
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            transform_uvl(uvl_path, transformation, path)
+        return path
+
+    @contextmanager
+    def transform_many(self, jobs: list[TransformationJob]):
+        """
+        Starts converting every job right away in a process pool and gives an iterator of (job, path) pairs:
+        cached results first, then the rest as soon as they are ready. Failed conversions are logged and left
+        out. The pool is shut down when the block exits, whether or not the iterator was consumed.
+        """
+        cached = []
+        pending = {}
+        executor = None
+
+        try:
+            for job in jobs:
+                path = self.get_cache_path(job.checksum, job.transformation)
+                if os.path.exists(path):
+                    cached.append((job, path))
+                    continue
+
+                if executor is None:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    executor = ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs)))
+                pending[executor.submit(transform_uvl, job.uvl_path, job.transformation, path)] = job
+
+            yield self._iter_results(cached, pending)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _iter_results(cached, pending):
+        yield from cached
+        for future in as_completed(pending):
+            job = pending[future]
+            try:
+                yield job, future.result()
+            except Exception as exc:
+                logger.warning(f"Could not convert {job.uvl_path} to {job.transformation}: {exc}")
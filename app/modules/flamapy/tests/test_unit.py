@@ -1,4 +1,12 @@
+import os
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
 import pytest
+from flamapy.metamodels.bdd_metamodel.operations import BDDConfigurationsNumber
+
+from app.modules.flamapy.services import BDDCompilationTimeout, BDDService
 
 
 @pytest.fixture(scope="module")
@@ -22,3 +30,56 @@ def test_sample_assertion(test_client):
     """
     greeting = "Hello, World!"
     assert greeting == "Hello, World!", "The greeting does not coincide with 'Hello, World!'"
+
+
+UVL_EXAMPLE = os.path.join(os.path.dirname(__file__), "..", "..", "dataset", "uvl_examples", "file1.uvl")
+
+
+@pytest.fixture
+def bdd_service(tmp_path):
+    BDDService.clear_memory_cache()
+    yield BDDService(cache_dir=str(tmp_path), timeout=60)
+    BDDService.clear_memory_cache()
+
+
+def test_bdd_is_compiled_once_and_persisted(bdd_service, tmp_path):
+    bdd_model = bdd_service.get_bdd_model_by_path(UVL_EXAMPLE, "checksum1")
+
+    bdd_path, features_path = bdd_service.get_cache_paths("checksum1")
+    assert os.path.exists(bdd_path) and os.path.exists(features_path)
+    assert BDDConfigurationsNumber().execute(bdd_model).get_result() == 24
+
+    # Served from the in-process cache
+    assert bdd_service.get_bdd_model_by_path(UVL_EXAMPLE, "checksum1") is bdd_model
+
+    # Served from disk, without recompiling, once the in-process cache is gone
+    BDDService.clear_memory_cache()
+    with patch("app.modules.flamapy.services.compile_bdd") as compile_mock:
+        reloaded = bdd_service.get_bdd_model_by_path(UVL_EXAMPLE, "checksum1")
+    compile_mock.assert_not_called()
+    assert BDDConfigurationsNumber().execute(reloaded).get_result() == 24
+    assert "Peer 2 Peer" in reloaded.features_variables
+
+
+def test_bdd_compilation_timeout(bdd_service):
+    bdd_service.timeout = 0
+
+    with patch("app.modules.flamapy.services.compile_bdd", side_effect=lambda *args: time.sleep(5)):
+        with pytest.raises(BDDCompilationTimeout):
+            bdd_service.get_bdd_model_by_path(UVL_EXAMPLE, "checksum2")
+
+
+def test_bdd_analyses(bdd_service):
+    hubfile = SimpleNamespace(get_path=lambda: UVL_EXAMPLE, checksum="checksum3")
+
+    assert bdd_service.configurations_number(hubfile) == 24
+    assert set(bdd_service.core_features(hubfile)) == {"Chat", "Connection", "Messages"}
+    assert bdd_service.dead_features(hubfile) == []
+    assert bdd_service.commonality(hubfile)["Chat"] == 1.0
+
+    samples = bdd_service.sampling(hubfile, 5)
+    assert len(samples) == 5
+    assert all("Chat" in configuration for configuration in samples)
+
+    # Without replacement there can't be more samples than configurations
+    assert len(bdd_service.sampling(hubfile, 100)) == 24
@@ -3,11 +3,12 @@ from flask_login import current_user, login_required
 
 from app import db
 from app.modules.auth.services import AuthenticationService
-from app.modules.dataset.models import DataSet
+from app.modules.dataset.services import DataSetService
 from app.modules.profile import profile_bp
 from app.modules.profile.forms import UserProfileForm
 from app.modules.profile.services import UserProfileService
 from app.modules.auth.models import User
+from core.decorators.decorators import cached_page
 
 
 @profile_bp.route("/profile/edit", methods=["GET", "POST"])
@@ -35,16 +36,7 @@ def my_profile():
     page = request.args.get("page", 1, type=int)
     per_page = 5
 
-    user_datasets_pagination = (
-        db.session.query(DataSet)
-        .filter(DataSet.user_id == current_user.id)
-        .order_by(DataSet.created_at.desc())
-        .paginate(page=page, per_page=per_page, error_out=False)
-    )
-
-    total_datasets_count = db.session.query(DataSet).filter(DataSet.user_id == current_user.id).count()
-
-    print(user_datasets_pagination.items)
+    user_datasets_pagination = DataSetService().paginate_by_user(current_user.id, page, per_page)
 
     return render_template(
         "profile/summary.html",
@@ -52,11 +44,12 @@ def my_profile():
         user=current_user,
         datasets=user_datasets_pagination.items,
         pagination=user_datasets_pagination,
-        total_datasets=total_datasets_count,
+        total_datasets=user_datasets_pagination.total,
     )
 
 
 @profile_bp.route("/profile/<int:user_id>", methods=["GET"])
+@cached_page
 def public_profile(user_id: int):
     """
     Public profile view for any user by id (no login required).
@@ -69,14 +62,7 @@ def public_profile(user_id: int):
     page = request.args.get("page", 1, type=int)
     per_page = 5
 
-    user_datasets_pagination = (
-        db.session.query(DataSet)
-        .filter(DataSet.user_id == user.id)
-        .order_by(DataSet.created_at.desc())
-        .paginate(page=page, per_page=per_page, error_out=False)
-    )
-
-    total_datasets_count = db.session.query(DataSet).filter(DataSet.user_id == user.id).count()
+    user_datasets_pagination = DataSetService().paginate_by_user(user.id, page, per_page)
 
     return render_template(
         "profile/public_summary.html",
@@ -84,5 +70,5 @@ def public_profile(user_id: int):
         user=user,
         datasets=user_datasets_pagination.items,
         pagination=user_datasets_pagination,
-        total_datasets=total_datasets_count,
+        total_datasets=user_datasets_pagination.total,
     )
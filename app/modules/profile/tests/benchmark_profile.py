@@ -0,0 +1,12 @@
+def test_public_profile_first_page(benchmark, benchmark_data, test_app):
+    client = test_app.test_client()
+    response = benchmark(client.get, f"/profile/{benchmark_data['heavy_user_id']}")
+    assert response.status_code == 200
+
+
+def test_public_profile_last_page(benchmark, benchmark_data, test_app):
+    client = test_app.test_client()
+    # The heavy user owns one in ten datasets, shown five per page
+    last_page = max(benchmark_data["datasets"] // 10 // 5, 1)
+    response = benchmark(client.get, f"/profile/{benchmark_data['heavy_user_id']}?page={last_page}")
+    assert response.status_code == 200
@@ -0,0 +1,3 @@
+from core.blueprints.base_blueprint import BaseBlueprint
+
+profiling_bp = BaseBlueprint("profiling", __name__, template_folder="templates")
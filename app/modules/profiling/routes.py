@@ -0,0 +1,98 @@
+import cProfile
+import logging
+import time
+
+from flask import abort, current_app, g, render_template, request, send_file
+from flask_login import current_user
+
+from app.modules.auth.routes import admin_required
+from app.modules.profiling import profiling_bp
+from app.modules.profiling.services import ProfilingService
+
+logger = logging.getLogger(__name__)
+
+profiling_service = ProfilingService()
+
+SORT_OPTIONS = ("cumulative", "tottime", "calls")
+
+
+def profiling_requested() -> bool:
+    if not current_app.config.get("PROFILING_ENABLED", False):
+        return False
+    flag = request.headers.get(current_app.config.get("PROFILING_HEADER", "X-Profile")) or request.args.get(
+        current_app.config.get("PROFILING_QUERY_PARAM", "profile")
+    )
+    # The flag is checked first so the user is only loaded for flagged requests
+    return bool(flag) and flag != "0" and current_user.is_authenticated and current_user.is_admin
+
+
+@profiling_bp.before_app_request
+def start_profiling():
+    if not profiling_requested():
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active in this thread
+        logger.warning(f"Could not profile {request.path}: a profiler is already active")
+        return
+    g.profiler = profiler
+    g.profiler_start = time.perf_counter()
+
+
+@profiling_bp.after_app_request
+def finish_profiling(response):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+
+    profiler.disable()
+    duration = time.perf_counter() - g.pop("profiler_start")
+    name = profiling_service.save(
+        profiler, request.method, request.path, response.status_code, duration, current_user.email
+    )
+    response.headers["X-Profile-Id"] = name
+    return response
+
+
+@profiling_bp.teardown_app_request
+def stop_profiling(exc):
+    # Requests that fail before the response is built never reach finish_profiling
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+
+
+@profiling_bp.route("/admin/profiles", methods=["GET"])
+@admin_required
+def list_profiles():
+    return render_template("profiling/profiles.html", profiles=profiling_service.list_profiles())
+
+
+@profiling_bp.route("/admin/profiles/<string:name>", methods=["GET"])
+@admin_required
+def view_profile(name):
+    if not profiling_service.exists(name):
+        abort(404)
+
+    sort_by = request.args.get("sort", "cumulative")
+    if sort_by not in SORT_OPTIONS:
+        sort_by = "cumulative"
+
+    return render_template(
+        "profiling/profile_detail.html",
+        name=name,
+        sort_by=sort_by,
+        sort_options=SORT_OPTIONS,
+        report=profiling_service.get_stats_report(name, sort_by),
+    )
+
+
+@profiling_bp.route("/admin/profiles/<string:name>/download", methods=["GET"])
+@admin_required
+def download_profile(name):
+    if not profiling_service.exists(name):
+        abort(404)
+    return send_file(profiling_service.get_path(name), as_attachment=True, download_name=name)
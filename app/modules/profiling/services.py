@@ -0,0 +1,108 @@
+import io
+import json
+import os
+import pstats
+import re
+from datetime import datetime, timezone
+
+from flask import current_app
+
+PROFILE_EXTENSION = ".prof"
+PROFILE_NAME_PATTERN = re.compile(r"^[\w.-]+\.prof$")
+
+
+class ProfilingService:
+    """
+    Stores cProfile captures on disk. Every capture is saved as a `.prof` file (loadable with pstats,
+    snakeviz, etc.) next to a small JSON file with the request details. Only the newest `max_files`
+    captures are kept.
+    """
+
+    def __init__(self, profiles_dir: str = None, max_files: int = None):
+        # Unless they are given, both are read from the config of the current app (PROFILING_DIR and
+        # PROFILING_MAX_FILES), so each config can override them
+        self._profiles_dir = profiles_dir
+        self._max_files = max_files
+
+    @property
+    def profiles_dir(self) -> str:
+        if self._profiles_dir is not None:
+            return os.path.abspath(self._profiles_dir)
+        default = os.path.join(os.getenv("WORKING_DIR", ""), "profiles")
+        return os.path.abspath(current_app.config.get("PROFILING_DIR") or default)
+
+    @property
+    def max_files(self) -> int:
+        if self._max_files is not None:
+            return self._max_files
+        return current_app.config.get("PROFILING_MAX_FILES", 50)
+
+    def save(self, profiler, method: str, path: str, status_code: int, duration: float, user_email: str) -> str:
+        os.makedirs(self.profiles_dir, exist_ok=True)
+
+        now = datetime.now(timezone.utc)
+        slug = re.sub(r"[^\w-]+", "-", path).strip("-")[:60] or "root"
+        name = f"{now.strftime('%Y%m%d-%H%M%S-%f')}_{method.lower()}_{slug}{PROFILE_EXTENSION}"
+
+        profiler.dump_stats(self.get_path(name))
+        with open(self._metadata_path(name), "w") as f:
+            json.dump(
+                {
+                    "name": name,
+                    "method": method,
+                    "path": path,
+                    "status_code": status_code,
+                    "duration_ms": round(duration * 1000, 1),
+                    "user": user_email,
+                    "created_at": now.isoformat(),
+                },
+                f,
+            )
+
+        self.rotate()
+        return name
+
+    def rotate(self):
+        if self.max_files <= 0:
+            return
+        # Names start with the capture timestamp, so sorting them sorts by age
+        names = self._profile_names()
+        for name in names[: max(len(names) - self.max_files, 0)]:
+            self.delete(name)
+
+    def delete(self, name: str):
+        for path in (self.get_path(name), self._metadata_path(name)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def list_profiles(self) -> list[dict]:
+        profiles = []
+        for name in reversed(self._profile_names()):
+            try:
+                with open(self._metadata_path(name), "r") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                profiles.append({"name": name})
+        return profiles
+
+    def get_path(self, name: str) -> str:
+        if not PROFILE_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid profile name: {name}")
+        return os.path.join(self.profiles_dir, name)
+
+    def exists(self, name: str) -> bool:
+        return PROFILE_NAME_PATTERN.match(name) is not None and os.path.exists(self.get_path(name))
+
+    def get_stats_report(self, name: str, sort_by: str = "cumulative", limit: int = 50) -> str:
+        output = io.StringIO()
+        stats = pstats.Stats(self.get_path(name), stream=output)
+        stats.strip_dirs().sort_stats(sort_by).print_stats(limit)
+        return output.getvalue()
+
+    def _profile_names(self) -> list[str]:
+        if not os.path.isdir(self.profiles_dir):
+            return []
+        return sorted(name for name in os.listdir(self.profiles_dir) if PROFILE_NAME_PATTERN.match(name))
+
+    def _metadata_path(self, name: str) -> str:
+        return self.get_path(name)[: -len(PROFILE_EXTENSION)] + ".json"
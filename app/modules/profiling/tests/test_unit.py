@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.conftest import login, logout
+from app.modules.profiling import routes as profiling_routes
+from app.modules.profiling.services import ProfilingService
+
+
+@pytest.fixture(scope="module")
+def test_client(test_client):
+    with test_client.application.app_context():
+        admin = User(email="admin@example.com", role="admin")
+        admin.set_password("admin1234")
+        db.session.add(admin)
+        db.session.commit()
+
+    yield test_client
+
+
+@pytest.fixture
+def profiling_service(tmp_path, monkeypatch):
+    service = ProfilingService(profiles_dir=str(tmp_path), max_files=3)
+    monkeypatch.setattr(profiling_routes, "profiling_service", service)
+    return service
+
+
+def test_flagged_admin_request_is_profiled(test_client, profiling_service):
+    login(test_client, "admin@example.com", "admin1234")
+    response = test_client.get("/", headers={"X-Profile": "1"})
+    logout(test_client)
+
+    assert response.status_code == 200
+    name = response.headers["X-Profile-Id"]
+    assert os.path.exists(profiling_service.get_path(name))
+
+    profile = profiling_service.list_profiles()[0]
+    assert profile["name"] == name
+    assert profile["path"] == "/"
+    assert profile["user"] == "admin@example.com"
+
+
+def test_requests_are_not_profiled_without_flag_or_admin(test_client, profiling_service):
+    response = test_client.get("/?profile=1")
+    assert "X-Profile-Id" not in response.headers
+
+    login(test_client, "test@example.com", "test1234")
+    response = test_client.get("/?profile=1")
+    logout(test_client)
+    assert "X-Profile-Id" not in response.headers
+
+    login(test_client, "admin@example.com", "admin1234")
+    response = test_client.get("/")
+    logout(test_client)
+    assert "X-Profile-Id" not in response.headers
+
+    assert profiling_service.list_profiles() == []
+
+
+def test_profiles_are_rotated(test_client, profiling_service):
+    login(test_client, "admin@example.com", "admin1234")
+    names = [test_client.get("/?profile=1").headers["X-Profile-Id"] for _ in range(5)]
+    logout(test_client)
+
+    assert [profile["name"] for profile in profiling_service.list_profiles()] == names[:1:-1]
+    assert not os.path.exists(profiling_service.get_path(names[0]))
+
+
+def test_admin_pages_list_view_and_download_profiles(test_client, profiling_service):
+    login(test_client, "admin@example.com", "admin1234")
+    name = test_client.get("/", headers={"X-Profile": "1"}).headers["X-Profile-Id"]
+
+    response = test_client.get("/admin/profiles")
+    assert response.status_code == 200
+    assert name.encode() in response.data
+
+    response = test_client.get(f"/admin/profiles/{name}?sort=tottime")
+    assert response.status_code == 200
+    assert b"function calls" in response.data
+
+    response = test_client.get(f"/admin/profiles/{name}/download")
+    assert response.status_code == 200
+    assert response.data == open(profiling_service.get_path(name), "rb").read()
+
+    assert test_client.get("/admin/profiles/missing.prof").status_code == 404
+    logout(test_client)
+
+
+def test_admin_pages_require_admin(test_client, profiling_service):
+    login(test_client, "test@example.com", "test1234")
+    response = test_client.get("/admin/profiles")
+    logout(test_client)
+
+    assert response.status_code == 302
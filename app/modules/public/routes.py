@@ -5,11 +5,13 @@ from flask import render_template
 from app.modules.dataset.services import DataSetService
 from app.modules.featuremodel.services import FeatureModelService
 from app.modules.public import public_bp
+from core.decorators.decorators import cached_page
 
 logger = logging.getLogger(__name__)
 
 
 @public_bp.route("/")
+@cached_page
 def index():
     logger.info("Access index")
     dataset_service = DataSetService()
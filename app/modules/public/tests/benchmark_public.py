@@ -0,0 +1,28 @@
+from app.modules.dataset.services import DataSetService
+from app.modules.featuremodel.services import FeatureModelService
+
+
+def test_index_stats(benchmark, benchmark_data):
+    dataset_service = DataSetService()
+    feature_model_service = FeatureModelService()
+
+    def stats():
+        return (
+            dataset_service.count_synchronized_datasets(),
+            feature_model_service.count_feature_models(),
+            dataset_service.total_dataset_downloads(),
+            feature_model_service.total_feature_model_downloads(),
+            dataset_service.total_dataset_views(),
+            feature_model_service.total_feature_model_views(),
+            dataset_service.get_most_downloaded_last_month(limit=5),
+            dataset_service.latest_synchronized(),
+        )
+
+    counters = benchmark(stats)
+    assert counters[1] == benchmark_data["feature_models"]
+
+
+def test_index(benchmark, benchmark_data, test_app):
+    client = test_app.test_client()
+    response = benchmark(client.get, "/")
+    assert response.status_code == 200
@@ -0,0 +1,64 @@
+from app import db
+
+# Terms are compared byte for byte: under MariaDB's default case and accent insensitive collation "tag:café"
+# and "tag:cafe", two terms of the vectors, would be the same key
+TERM_TYPE = db.String(255).with_variant(db.String(255, collation="utf8mb4_bin"), "mysql", "mariadb")
+
+
+class AuthorDatasetIndex(db.Model):
+    """Author name -> datasets index, so datasets sharing an author are found without scanning `author`."""
+
+    __tablename__ = "recommendation_author_index"
+
+    author_name = db.Column(db.String(120), primary_key=True)
+    dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), primary_key=True, index=True)
+
+
+class DatasetDownloadCount(db.Model):
+    """Number of download records of each dataset, kept up to date as downloads are recorded."""
+
+    __tablename__ = "recommendation_download_count"
+
+    dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), primary_key=True)
+    download_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DatasetRecommendation(db.Model):
+    """Top recommendations of each dataset, ordered by rank."""
+
+    __tablename__ = "dataset_recommendation"
+
+    dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    recommended_dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), nullable=False)
+    score = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DatasetNeighbour(db.Model):
+    """Most similar datasets of each dataset by content, ordered by rank. The score is the cosine similarity."""
+
+    __tablename__ = "dataset_neighbour"
+
+    dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    recommended_dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), nullable=False)
+    score = db.Column(db.Float, nullable=False, default=0)
+
+
+class DatasetTermWeight(db.Model):
+    """Term -> datasets index with the L2-normalised TF-IDF weight of the term in each dataset."""
+
+    __tablename__ = "recommendation_term_weight"
+
+    term = db.Column(TERM_TYPE, primary_key=True)
+    dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), primary_key=True, index=True)
+    weight = db.Column(db.Float, nullable=False)
+
+
+class TermDocumentFrequency(db.Model):
+    """Number of datasets holding each term, kept up to date as datasets are indexed."""
+
+    __tablename__ = "recommendation_term_frequency"
+
+    term = db.Column(TERM_TYPE, primary_key=True)
+    document_frequency = db.Column(db.Integer, nullable=False, default=0)
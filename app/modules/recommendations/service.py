@@ -1,41 +1,567 @@
-from sqlalchemy import func, desc
+import logging
+from collections import defaultdict
+
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.orm import aliased, joinedload, selectinload
+
 from app import db
-from app.modules.dataset.models import DataSet, DSDownloadRecord, Author, DSMetaData
+from app.modules.dataset.models import Author, DataSet, DSDownloadRecord, DSMetaData
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.recommendations.models import (
+    AuthorDatasetIndex,
+    DatasetDownloadCount,
+    DatasetNeighbour,
+    DatasetRecommendation,
+    DatasetTermWeight,
+    TermDocumentFrequency,
+)
+from core.decorators.decorators import read_only
+
+logger = logging.getLogger(__name__)
+
+# Recommendations stored for each dataset; pages show the first ones
+TOP_K = 10
+
+# Content neighbours less similar than this are not worth recommending
+MIN_SIMILARITY = 0.05
+
+# Terms held by more datasets than this (the publication type, common words) don't look for candidate
+# neighbours of a newly indexed dataset: they would read every dataset holding them, and their low IDF weight
+# adds little to a similarity. Candidates found through the other terms are still scored with every term.
+MAX_CANDIDATE_TERM_FREQUENCY = 1000
+
+# Rows of the stored vectors inserted by each statement of a rebuild
+VECTOR_BATCH_SIZE = 5000
+
+
+def ranking_key(entry):
+    # Most downloaded first, oldest dataset first on ties
+    recommended_id, score = entry
+    return -score, recommended_id
+
+
+class StoredListEngine:
+    """
+    Base of the engines that store the top `top_k` recommendations of every dataset in `model`, a table
+    with (dataset_id, rank) as primary key and the recommended dataset and its score in every row.
+    """
+
+    model = None
+
+    def __init__(self, top_k=TOP_K):
+        self.top_k = top_k
+        self.session = db.session
+
+    @read_only
+    def recommendations(self, dataset_id, limit=5):
+        return (
+            self.session.query(DataSet)
+            .join(self.model, self.model.recommended_dataset_id == DataSet.id)
+            .filter(self.model.dataset_id == dataset_id)
+            .order_by(self.model.rank)
+            .options(
+                joinedload(DataSet.ds_meta_data),
+                selectinload(DataSet.feature_models).selectinload(FeatureModel.files),
+            )
+            .limit(limit)
+            .all()
+        )
+
+    def stored(self, dataset_ids):
+        lists = {dataset_id: [] for dataset_id in dataset_ids}
+        if not lists:
+            return lists
+        query = (
+            select(self.model.dataset_id, self.model.recommended_dataset_id, self.model.score)
+            .where(self.model.dataset_id.in_(list(lists)))
+            .order_by(self.model.dataset_id, self.model.rank)
+        )
+        for dataset_id, recommended_id, score in self.session.execute(query):
+            lists[dataset_id].append((recommended_id, score))
+        return lists
+
+    def store(self, lists):
+        """Replaces the stored recommendations of the datasets in `lists` ({dataset id: [(id, score)]})."""
+        if not lists:
+            return
+        self.session.execute(delete(self.model).where(self.model.dataset_id.in_(list(lists))))
+        rows = [
+            {"dataset_id": dataset_id, "rank": rank, "recommended_dataset_id": recommended_id, "score": score}
+            for dataset_id, ranked in lists.items()
+            for rank, (recommended_id, score) in enumerate(ranked, start=1)
+        ]
+        if rows:
+            self.session.execute(insert(self.model), rows)
+
+    def merge(self, dataset_id, ranked, score):
+        """Returns `ranked` with `dataset_id` placed by its new `score`, or removed if the score is None."""
+        entries = [entry for entry in ranked if entry[0] != dataset_id]
+        if score is not None:
+            entries.append((dataset_id, score))
+        return sorted(entries, key=ranking_key)[: self.top_k]
+
+
+class AuthorOverlapEngine(StoredListEngine):
+    """
+    Recommends datasets sharing an author, most downloaded first.
+
+    The author -> datasets index, the download count of every dataset and the top `top_k`
+    recommendations of every dataset are stored in tables. They are updated incrementally when a
+    dataset is published and when a download is recorded, so reading the recommendations of a page is
+    a primary key lookup however many downloads there are. `rebuild` recomputes everything, e.g. after
+    bulk imports or to repair lists that concurrent updates left out of date.
+    """
+
+    model = DatasetRecommendation
+
+    def neighbours(self, dataset_id):
+        """Ids of the datasets sharing at least one author with the dataset."""
+        other = aliased(AuthorDatasetIndex)
+        query = (
+            select(other.dataset_id)
+            .join(AuthorDatasetIndex, AuthorDatasetIndex.author_name == other.author_name)
+            .where(AuthorDatasetIndex.dataset_id == dataset_id, other.dataset_id != dataset_id)
+            .distinct()
+        )
+        return set(self.session.scalars(query))
+
+    def download_count(self, dataset_id):
+        query = select(DatasetDownloadCount.download_count).where(DatasetDownloadCount.dataset_id == dataset_id)
+        return self.session.scalar(query) or 0
+
+    def ranked_neighbours(self, dataset_id):
+        """Computes the top (dataset id, score) pairs of a dataset from the index and the download counts."""
+        other = aliased(AuthorDatasetIndex)
+        score = func.coalesce(DatasetDownloadCount.download_count, 0)
+        query = (
+            select(other.dataset_id, score)
+            .select_from(AuthorDatasetIndex)
+            .join(
+                other,
+                and_(
+                    other.author_name == AuthorDatasetIndex.author_name,
+                    other.dataset_id != AuthorDatasetIndex.dataset_id,
+                ),
+            )
+            .outerjoin(DatasetDownloadCount, DatasetDownloadCount.dataset_id == other.dataset_id)
+            .where(AuthorDatasetIndex.dataset_id == dataset_id)
+            .distinct()
+            .order_by(score.desc(), other.dataset_id)
+            .limit(self.top_k)
+        )
+        return [(recommended_id, score) for recommended_id, score in self.session.execute(query)]
+
+    def promote(self, dataset_id, score, neighbour_ids):
+        """
+        Updates the lists of `neighbour_ids` after the score of `dataset_id` went up: it moves up the
+        lists it is in and enters the ones it now ranks in. The other entries keep their scores, so
+        lists are merged in place instead of recomputed. Empty lists, which may never have been
+        computed, are recomputed.
+        """
+        changed = {}
+        for neighbour_id, ranked in self.stored(neighbour_ids).items():
+            if not ranked:
+                changed[neighbour_id] = self.ranked_neighbours(neighbour_id)
+                continue
+            merged = self.merge(dataset_id, ranked, score)
+            if merged != ranked:
+                changed[neighbour_id] = merged
+        self.store(changed)
+
+    def ensure_download_count(self, dataset_id):
+        if self.session.get(DatasetDownloadCount, dataset_id) is not None:
+            return
+        query = select(func.count(DSDownloadRecord.id)).where(DSDownloadRecord.dataset_id == dataset_id)
+        self.session.execute(
+            insert(DatasetDownloadCount).values(dataset_id=dataset_id, download_count=self.session.scalar(query))
+        )
+
+    def index_dataset(self, dataset):
+        """Adds a published dataset, or its new authors, to the index and updates the affected lists."""
+        dataset_id = dataset.id
+        try:
+            previous = self.neighbours(dataset_id)
+            self.session.execute(delete(AuthorDatasetIndex).where(AuthorDatasetIndex.dataset_id == dataset_id))
+            # Names are de-duplicated by the database, which compares them by its collation: "José García" and
+            # "jose garcia " are the same key of the index
+            self.session.execute(
+                insert(AuthorDatasetIndex).from_select(
+                    ["author_name", "dataset_id"],
+                    select(Author.name, DataSet.id)
+                    .join(DataSet, DataSet.ds_meta_data_id == Author.ds_meta_data_id)
+                    .where(DataSet.id == dataset_id, Author.name != "")
+                    .distinct(),
+                )
+            )
+            self.ensure_download_count(dataset_id)
+
+            current = self.neighbours(dataset_id)
+            self.store({dataset_id: self.ranked_neighbours(dataset_id)})
+            self.promote(dataset_id, self.download_count(dataset_id), current)
+            # Datasets that no longer share an author with it are recomputed without it
+            self.store({neighbour_id: self.ranked_neighbours(neighbour_id) for neighbour_id in previous - current})
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def record_download(self, dataset_id):
+        """Counts a new download of the dataset and moves it up the lists of the datasets sharing an author."""
+        try:
+            result = self.session.execute(
+                update(DatasetDownloadCount)
+                .where(DatasetDownloadCount.dataset_id == dataset_id)
+                .values(download_count=DatasetDownloadCount.download_count + 1)
+            )
+            if not result.rowcount:
+                self.ensure_download_count(dataset_id)
+
+            self.promote(dataset_id, self.download_count(dataset_id), self.neighbours(dataset_id))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def rebuild(self):
+        """Recomputes the index, the download counts and every list in a few set-based statements."""
+        self.session.execute(delete(DatasetRecommendation))
+        self.session.execute(delete(DatasetDownloadCount))
+        self.session.execute(delete(AuthorDatasetIndex))
+
+        self.session.execute(
+            insert(AuthorDatasetIndex).from_select(
+                ["author_name", "dataset_id"],
+                select(Author.name, DataSet.id)
+                .join(DataSet, DataSet.ds_meta_data_id == Author.ds_meta_data_id)
+                .where(Author.name != "")
+                .distinct(),
+            )
+        )
+        self.session.execute(
+            insert(DatasetDownloadCount).from_select(
+                ["dataset_id", "download_count"],
+                select(DSDownloadRecord.dataset_id, func.count(DSDownloadRecord.id))
+                .where(DSDownloadRecord.dataset_id.isnot(None))
+                .group_by(DSDownloadRecord.dataset_id),
+            )
+        )
+
+        source, other = aliased(AuthorDatasetIndex), aliased(AuthorDatasetIndex)
+        pairs = (
+            select(source.dataset_id.label("dataset_id"), other.dataset_id.label("recommended_dataset_id"))
+            .join(other, and_(other.author_name == source.author_name, other.dataset_id != source.dataset_id))
+            .distinct()
+            .subquery()
+        )
+        score = func.coalesce(DatasetDownloadCount.download_count, 0)
+        ranked = (
+            select(
+                pairs.c.dataset_id,
+                pairs.c.recommended_dataset_id,
+                score.label("score"),
+                func.row_number()
+                .over(partition_by=pairs.c.dataset_id, order_by=(score.desc(), pairs.c.recommended_dataset_id))
+                .label("rank"),
+            )
+            .outerjoin(DatasetDownloadCount, DatasetDownloadCount.dataset_id == pairs.c.recommended_dataset_id)
+            .subquery()
+        )
+        self.session.execute(
+            insert(DatasetRecommendation).from_select(
+                ["dataset_id", "rank", "recommended_dataset_id", "score"],
+                select(ranked.c.dataset_id, ranked.c.rank, ranked.c.recommended_dataset_id, ranked.c.score).where(
+                    ranked.c.rank <= self.top_k
+                ),
+            )
+        )
+        self.session.commit()
+
+        stored = self.session.scalar(select(func.count()).select_from(DatasetRecommendation))
+        logger.info(f"Rebuilt the author recommendations: {stored} recommendations stored")
+        return stored
+
+
+class ContentSimilarityEngine(StoredListEngine):
+    """
+    Recommends datasets with similar content: the cosine similarity of TF-IDF vectors built from the title,
+    description, dataset and feature model tags and publication type of every dataset.
+
+    `rebuild` vectorises the whole catalogue, computes the neighbours of every dataset in batched sparse
+    products and stores the vectors as a term -> datasets index, with the number of datasets holding each
+    term. `index_dataset` vectorises only the newly published dataset with the stored document frequencies,
+    scores it against the datasets sharing one of its less common terms through the index and adds it to the
+    lists of the datasets it is now one of the nearest of. Terms held by more than `max_term_frequency`
+    datasets are not followed to find candidates, so the rows it reads are bounded by its number of terms
+    rather than by the size of the catalogue. Other vectors and lists keep their weights until the next
+    rebuild, which also picks up the slight change of the IDF weights and finds the neighbours sharing only
+    common terms.
+
+    The vectors module, and numpy and scipy with it, is imported by the methods that use it to keep them out of
+    the application startup.
+    """
+
+    model = DatasetNeighbour
+
+    def __init__(self, top_k=TOP_K, min_similarity=MIN_SIMILARITY, max_term_frequency=MAX_CANDIDATE_TERM_FREQUENCY):
+        super().__init__(top_k)
+        self.min_similarity = min_similarity
+        self.max_term_frequency = max_term_frequency
+
+    def documents(self, dataset_ids=None):
+        """Ids of every dataset, or of `dataset_ids`, in ascending order, and their terms."""
+        from app.modules.recommendations.vectors import document_terms
+
+        feature_model_tags = defaultdict(list)
+        query = (
+            select(FeatureModel.data_set_id, FMMetaData.tags)
+            .join(FMMetaData, FeatureModel.fm_meta_data_id == FMMetaData.id)
+            .where(FMMetaData.tags.isnot(None))
+        )
+        if dataset_ids is not None:
+            query = query.where(FeatureModel.data_set_id.in_(dataset_ids))
+        for dataset_id, tags in self.session.execute(query):
+            feature_model_tags[dataset_id].append(tags)
+
+        query = (
+            select(DataSet.id, DSMetaData.title, DSMetaData.description, DSMetaData.tags, DSMetaData.publication_type)
+            .join(DSMetaData, DataSet.ds_meta_data_id == DSMetaData.id)
+            .order_by(DataSet.id)
+        )
+        if dataset_ids is not None:
+            query = query.where(DataSet.id.in_(dataset_ids))
+        ids, documents = [], []
+        for dataset_id, title, description, tags, publication_type in self.session.execute(query):
+            ids.append(dataset_id)
+            documents.append(
+                document_terms(
+                    title,
+                    description,
+                    [tags] + feature_model_tags[dataset_id],
+                    publication_type.value if publication_type else None,
+                )
+            )
+        return ids, documents
+
+    def neighbour_lists(self, ids, matrix, rows):
+        from app.modules.recommendations.vectors import top_neighbours
+
+        return {
+            ids[row]: [(ids[column], similarity) for column, similarity in nearest]
+            for row, nearest in top_neighbours(matrix, rows, self.top_k, self.min_similarity)
+        }
+
+    def similarities(self, dataset_id):
+        """
+        Cosine similarity of the dataset with every other dataset at least `min_similarity` similar, most
+        similar first, from the stored vectors of the datasets sharing one of its terms held by at most
+        `max_term_frequency` datasets.
+        """
+        other = aliased(DatasetTermWeight)
+        candidates = list(
+            self.session.scalars(
+                select(other.dataset_id)
+                .join(DatasetTermWeight, DatasetTermWeight.term == other.term)
+                .join(TermDocumentFrequency, TermDocumentFrequency.term == DatasetTermWeight.term)
+                .where(
+                    DatasetTermWeight.dataset_id == dataset_id,
+                    other.dataset_id != dataset_id,
+                    TermDocumentFrequency.document_frequency <= self.max_term_frequency,
+                )
+                .distinct()
+            )
+        )
+        if not candidates:
+            return []
+
+        # Candidates are scored with all their terms, read by primary key
+        similarity = func.sum(DatasetTermWeight.weight * other.weight)
+        query = (
+            select(other.dataset_id, similarity)
+            .join(other, other.term == DatasetTermWeight.term)
+            .where(DatasetTermWeight.dataset_id == dataset_id, other.dataset_id.in_(candidates))
+            .group_by(other.dataset_id)
+            .having(similarity >= self.min_similarity)
+            .order_by(similarity.desc(), other.dataset_id)
+        )
+        return [(other_id, float(score)) for other_id, score in self.session.execute(query)]
+
+    def remove_vector(self, dataset_id):
+        """Deletes the stored vector of the dataset and takes its terms out of the document frequencies."""
+        terms = list(
+            self.session.scalars(select(DatasetTermWeight.term).where(DatasetTermWeight.dataset_id == dataset_id))
+        )
+        if not terms:
+            return
+        self.session.execute(delete(DatasetTermWeight).where(DatasetTermWeight.dataset_id == dataset_id))
+        self.session.execute(
+            update(TermDocumentFrequency)
+            .where(TermDocumentFrequency.term.in_(terms))
+            .values(document_frequency=TermDocumentFrequency.document_frequency - 1)
+        )
+        self.session.execute(delete(TermDocumentFrequency).where(TermDocumentFrequency.document_frequency <= 0))
+
+    def store_vector(self, dataset_id, terms):
+        """Stores the vector of the dataset, weighted with the stored document frequencies, and counts its terms."""
+        from app.modules.recommendations.vectors import tfidf_vector
+
+        if not terms:
+            return
+        unique_terms = list(set(terms))
+        known = set(
+            self.session.scalars(select(TermDocumentFrequency.term).where(TermDocumentFrequency.term.in_(unique_terms)))
+        )
+        if known:
+            self.session.execute(
+                update(TermDocumentFrequency)
+                .where(TermDocumentFrequency.term.in_(known))
+                .values(document_frequency=TermDocumentFrequency.document_frequency + 1)
+            )
+        new_terms = [term for term in unique_terms if term not in known]
+        if new_terms:
+            self.session.execute(
+                insert(TermDocumentFrequency), [{"term": term, "document_frequency": 1} for term in new_terms]
+            )
+
+        query = select(TermDocumentFrequency.term, TermDocumentFrequency.document_frequency).where(
+            TermDocumentFrequency.term.in_(unique_terms)
+        )
+        document_frequencies = dict(self.session.execute(query).all())
+        documents = self.session.scalar(select(func.count(DataSet.id)))
+        vector = tfidf_vector(terms, document_frequencies, documents)
+        self.session.execute(
+            insert(DatasetTermWeight),
+            [{"term": term, "dataset_id": dataset_id, "weight": weight} for term, weight in vector.items()],
+        )
+
+    def index_dataset(self, dataset):
+        """Stores the neighbours of the dataset and adds it to the lists of the datasets it is close to."""
+        ids, documents = self.documents([dataset.id])
+        if not ids:
+            return
+
+        try:
+            self.remove_vector(dataset.id)
+            self.store_vector(dataset.id, documents[0])
+
+            similarities = self.similarities(dataset.id)
+            lists = {dataset.id: similarities[: self.top_k]}
+
+            # Datasets it is similar to, plus the ones that listed it before its metadata changed
+            scores = dict(similarities)
+            listed_by = self.session.scalars(
+                select(self.model.dataset_id).where(self.model.recommended_dataset_id == dataset.id)
+            )
+            affected = set(scores) | set(listed_by)
+
+            for other_id, ranked in self.stored(affected).items():
+                if not ranked:
+                    # Lists that were never computed are computed in full
+                    lists[other_id] = self.similarities(other_id)[: self.top_k]
+                    continue
+                merged = self.merge(dataset.id, ranked, scores.get(other_id))
+                if merged != ranked:
+                    lists[other_id] = merged
+
+            self.store(lists)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def store_vectors(self, ids, matrix, vocabulary, document_frequency):
+        """Replaces the stored vectors and document frequencies with the ones of the whole catalogue."""
+        self.session.execute(delete(DatasetTermWeight))
+        self.session.execute(delete(TermDocumentFrequency))
+
+        rows = [
+            {"term": term, "document_frequency": int(frequency)}
+            for term, frequency in zip(vocabulary, document_frequency)
+        ]
+        for start in range(0, len(rows), VECTOR_BATCH_SIZE):
+            self.session.execute(insert(TermDocumentFrequency), rows[start : start + VECTOR_BATCH_SIZE])
+
+        rows = []
+        for row, dataset_id in enumerate(ids):
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            rows.extend(
+                {"term": vocabulary[column], "dataset_id": dataset_id, "weight": float(weight)}
+                for column, weight in zip(matrix.indices[start:end], matrix.data[start:end])
+            )
+            if len(rows) >= VECTOR_BATCH_SIZE:
+                self.session.execute(insert(DatasetTermWeight), rows)
+                rows = []
+        if rows:
+            self.session.execute(insert(DatasetTermWeight), rows)
+
+    def rebuild(self):
+        """Recomputes the stored vectors and the neighbours of every dataset."""
+        from app.modules.recommendations.vectors import tfidf_index, top_neighbours
+
+        ids, documents = self.documents()
+        matrix, vocabulary, document_frequency = tfidf_index(documents)
+        self.store_vectors(ids, matrix, vocabulary, document_frequency)
+
+        self.session.execute(delete(self.model))
+        stored = 0
+        pending = {}
+        for row, nearest in top_neighbours(matrix, range(len(ids)), self.top_k, self.min_similarity):
+            pending[ids[row]] = [(ids[column], similarity) for column, similarity in nearest]
+            stored += len(nearest)
+            if len(pending) >= 1000:
+                self.store(pending)
+                pending = {}
+        self.store(pending)
+        self.session.commit()
 
-def get_recommended_datasets(dataset):
+        logger.info(f"Rebuilt the content recommendations: {stored} neighbours of {len(ids)} datasets stored")
+        return stored
+
+
+author_overlap_engine = AuthorOverlapEngine()
+content_similarity_engine = ContentSimilarityEngine()
+
+
+def index_published_dataset(dataset):
+    """
+    Adds a published dataset to the recommendations of every engine. Engines are indexed independently: one
+    failing is logged and leaves the others up to date.
+    """
+    dataset_id = dataset.id
+    for engine in (author_overlap_engine, content_similarity_engine):
+        try:
+            engine.index_dataset(dataset)
+        except Exception:
+            # Non-fatal: the recommendations are recomputed by `rosemary recommendations:rebuild`
+            logger.exception(f"Failed to index dataset {dataset_id} in {type(engine).__name__}")
+
+
+def get_recommended_datasets(dataset, limit=5):
     """
-    Devuelve hasta 5 datasets del mismo autor(es), ordenados por número de descargas (MySQL-compatible).
+    Devuelve hasta `limit` datasets del mismo autor(es), ordenados por número de descargas, leídos de la
+    tabla de recomendaciones precalculadas.
     """
     if not dataset or not dataset.ds_meta_data or not dataset.ds_meta_data.authors:
         return []
 
-    author_names = [author.name for author in dataset.ds_meta_data.authors if author.name]
+    return author_overlap_engine.recommendations(dataset.id, limit)
+
 
-    if not author_names:
+def get_similar_datasets(dataset, limit=5):
+    """Datasets with the most similar content, read from the precomputed neighbour table."""
+    if not dataset:
         return []
 
-    # Subconsulta: cuenta descargas por dataset
-    downloads_subquery = (
-        db.session.query(
-            DSDownloadRecord.dataset_id,
-            func.count(DSDownloadRecord.id).label("download_count")
-        )
-        .group_by(DSDownloadRecord.dataset_id)
-        .subquery()
-    )
-
-    # Consulta principal (compatible con MySQL/MariaDB)
-    recommended = (
-        db.session.query(DataSet)
-        .join(DSMetaData, DataSet.ds_meta_data_id == DSMetaData.id)
-        .join(Author, Author.ds_meta_data_id == DSMetaData.id)
-        .outerjoin(downloads_subquery, DataSet.id == downloads_subquery.c.dataset_id)
-        .filter(Author.name.in_(author_names))
-        .filter(DataSet.id != dataset.id)
-        # Reemplazo de NULLS LAST → usar COALESCE o IFNULL para tratar NULL como 0
-        .order_by(desc(func.coalesce(downloads_subquery.c.download_count, 0)))
-        .limit(5)
-        .all()
-    )
+    return content_similarity_engine.recommendations(dataset.id, limit)
 
+
+def get_dataset_recommendations(dataset, limit=5):
+    """
+    Recommendations of the dataset page: datasets by the same authors first, completed with datasets of
+    similar content, so single-author datasets get relevant recommendations too.
+    """
+    recommended = get_recommended_datasets(dataset, limit)
+    if len(recommended) < limit:
+        seen = {ds.id for ds in recommended}
+        similar = get_similar_datasets(dataset, limit + len(seen))
+        recommended += [ds for ds in similar if ds.id not in seen][: limit - len(recommended)]
     return recommended
@@ -0,0 +1,56 @@
+import pytest
+
+from app import db
+from app.modules.dataset.models import DataSet
+from app.modules.recommendations.service import (
+    author_overlap_engine,
+    content_similarity_engine,
+    get_dataset_recommendations,
+    get_recommended_datasets,
+)
+
+
+@pytest.fixture(scope="module")
+def recommendation_index(benchmark_data):
+    author_overlap_engine.rebuild()
+    content_similarity_engine.rebuild()
+    return benchmark_data
+
+
+def test_rebuild_recommendations(benchmark, recommendation_index):
+    stored = benchmark(author_overlap_engine.rebuild)
+    assert stored > 0
+
+
+def test_get_recommended_datasets(benchmark, recommendation_index):
+    # Low ids are the most downloaded ones, and their authors have many other datasets
+    dataset = db.session.get(DataSet, 1)
+    recommended = benchmark(get_recommended_datasets, dataset)
+    assert recommended
+    assert dataset not in recommended
+
+
+def test_get_recommended_datasets_many(benchmark, recommendation_index):
+    datasets = db.session.query(DataSet).order_by(DataSet.id).limit(20).all()
+    benchmark(lambda: [get_recommended_datasets(dataset) for dataset in datasets])
+
+
+def test_record_download(benchmark, recommendation_index):
+    # A popular dataset whose authors have many datasets: the worst case for incremental updates
+    benchmark(author_overlap_engine.record_download, 1)
+
+
+def test_rebuild_content_recommendations(benchmark, recommendation_index):
+    stored = benchmark(content_similarity_engine.rebuild)
+    assert stored > 0
+
+
+def test_index_dataset_content(benchmark, recommendation_index):
+    # Vectorises the dataset alone, scores it through the stored term index and updates the similar lists
+    dataset = db.session.get(DataSet, recommendation_index["datasets"])
+    benchmark(content_similarity_engine.index_dataset, dataset)
+
+
+def test_get_dataset_recommendations_many(benchmark, recommendation_index):
+    datasets = db.session.query(DataSet).order_by(DataSet.id.desc()).limit(20).all()
+    benchmark(lambda: [get_dataset_recommendations(dataset) for dataset in datasets])
@@ -1,5 +1,20 @@
 from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
 import app.modules.recommendations.service as service
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.models import Author, DataSet, DSDownloadRecord, DSMetaData, PublicationType
+from app.modules.recommendations.vectors import (
+    MAX_TERM_LENGTH,
+    document_terms,
+    tfidf_index,
+    tfidf_matrix,
+    tfidf_vector,
+    top_neighbours,
+)
 
 
 def test_get_recommended_datasets_none():
@@ -48,3 +63,236 @@ def test_get_recommended_datasets_orders_by_downloads(monkeypatch):
     result = service.get_recommended_datasets(dataset)
     # Debe devolver B (150), C (100), A (50)
     assert [d.title for d in result] == ["B", "C", "A"]
+
+
+@pytest.fixture(scope="module")
+def authored_datasets(test_client):
+    """
+    Datasets by shared authors: 1-4 are by Ada (2 and 3 also by Grace) and 5 only by Linus.
+    Download counts: 1 -> 0, 2 -> 3, 3 -> 1, 4 -> 2, 5 -> 7.
+    """
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        authors = [["Ada"], ["Ada", "Grace"], ["Ada", "Grace"], ["Ada"], ["Linus"]]
+        downloads = [0, 3, 1, 2, 7]
+        ids = []
+        for i, (names, count) in enumerate(zip(authors, downloads), start=1):
+            ds_meta = DSMetaData(
+                title=f"Recommended DS {i}",
+                description="Desc",
+                publication_type=PublicationType.NONE,
+                dataset_doi=f"10.0000/recommended{i}",
+            )
+            ds_meta.authors = [Author(name=name) for name in names]
+            dataset = DataSet(user_id=user.id, ds_meta_data=ds_meta)
+            db.session.add(dataset)
+            db.session.flush()
+            for j in range(count):
+                db.session.add(DSDownloadRecord(dataset_id=dataset.id, download_cookie=f"rec_{i}_{j}"))
+            ids.append(dataset.id)
+        db.session.commit()
+
+    yield test_client, ids
+
+
+def stored_lists(ids):
+    return service.author_overlap_engine.stored(ids)
+
+
+def test_rebuild_ranks_datasets_sharing_an_author_by_downloads(authored_datasets):
+    client, ids = authored_datasets
+    with client.application.app_context():
+        service.author_overlap_engine.rebuild()
+        lists = stored_lists(ids)
+
+        assert lists[ids[0]] == [(ids[1], 3), (ids[3], 2), (ids[2], 1)]
+        assert lists[ids[4]] == []
+
+        dataset = db.session.get(DataSet, ids[0])
+        assert [ds.id for ds in service.get_recommended_datasets(dataset, limit=2)] == [ids[1], ids[3]]
+
+
+def test_record_download_updates_lists_like_a_rebuild(authored_datasets):
+    client, ids = authored_datasets
+    with client.application.app_context():
+        service.author_overlap_engine.rebuild()
+        # Dataset 3 goes from 1 to 4 downloads and overtakes datasets 2 and 4
+        for j in range(3):
+            db.session.add(DSDownloadRecord(dataset_id=ids[2], download_cookie=f"rec_new_{j}"))
+            db.session.commit()
+            service.author_overlap_engine.record_download(ids[2])
+
+        incremental = stored_lists(ids)
+        assert incremental[ids[0]] == [(ids[2], 4), (ids[1], 3), (ids[3], 2)]
+
+        service.author_overlap_engine.rebuild()
+        assert stored_lists(ids) == incremental
+
+
+def test_index_dataset_adds_published_datasets_to_the_lists(authored_datasets):
+    client, ids = authored_datasets
+    with client.application.app_context():
+        service.author_overlap_engine.rebuild()
+        user = User.query.filter_by(email="test@example.com").first()
+        ds_meta = DSMetaData(
+            title="Recommended DS 6",
+            description="Desc",
+            publication_type=PublicationType.NONE,
+            authors=[Author(name="Linus")],
+        )
+        dataset = DataSet(user_id=user.id, ds_meta_data=ds_meta)
+        db.session.add(dataset)
+        db.session.commit()
+
+        service.author_overlap_engine.index_dataset(dataset)
+
+        lists = stored_lists(ids + [dataset.id])
+        assert lists[dataset.id] == [(ids[4], 7)]
+        assert lists[ids[4]] == [(dataset.id, 0)]
+
+
+def test_index_published_dataset_collapses_equal_names_and_indexes_engines_independently(
+    authored_datasets, monkeypatch
+):
+    client, ids = authored_datasets
+    indexed = []
+    monkeypatch.setattr(service.content_similarity_engine, "index_dataset", indexed.append)
+    with client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        ds_meta = DSMetaData(
+            title="Recommended DS 7",
+            description="Desc",
+            publication_type=PublicationType.NONE,
+            # The same key of the index under MariaDB's case and accent insensitive collation
+            authors=[Author(name="José García"), Author(name="jose garcia "), Author(name="Linus")],
+        )
+        dataset = DataSet(user_id=user.id, ds_meta_data=ds_meta)
+        db.session.add(dataset)
+        db.session.commit()
+
+        service.index_published_dataset(dataset)
+        assert stored_lists([dataset.id])[dataset.id][0] == (ids[4], 7)
+        assert indexed == [dataset]
+
+        def fail(dataset):
+            raise RuntimeError("index unavailable")
+
+        monkeypatch.setattr(service.author_overlap_engine, "index_dataset", fail)
+        indexed.clear()
+        service.index_published_dataset(dataset)
+        assert indexed == [dataset]
+
+
+def test_tfidf_neighbours_rank_shared_terms_first():
+    documents = [
+        document_terms("Chess openings", "Opening lines", ["chess,board"], "dataset"),
+        document_terms("Chess endgames", "Endgame studies", ["chess,strategy"], "dataset"),
+        document_terms("Racing cars", "Lap times", ["racing"], "dataset"),
+        [],
+    ]
+    matrix = tfidf_matrix(documents)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    assert np.allclose(norms, [1, 1, 1, 0])
+
+    results = dict(top_neighbours(matrix, [0, 1, 2, 3], 2, 0.01, batch_size=3))
+    assert [column for column, _ in results[0]] == [1, 2]
+    assert results[0][0][1] > results[0][1][1]
+    assert results[3] == []
+
+
+def test_document_terms_fit_the_term_column():
+    long_word, other_long_word = "a" * 300, "a" * 299 + "b"
+    terms = document_terms("Chess", f"{long_word} {other_long_word}", ["café,cafe", "x" * 300], "dataset")
+
+    assert all(len(term) <= MAX_TERM_LENGTH for term in terms)
+    # Long terms are shortened to different terms, and tags keep their accents
+    assert len(set(terms)) == len(terms) - 1
+    assert {"tag:café", "tag:cafe"} <= set(terms)
+
+
+def test_tfidf_vector_matches_the_catalogue_row():
+    documents = [
+        document_terms("Chess openings", "Opening lines", ["chess,board"], "dataset"),
+        document_terms("Chess endgames", "Endgame studies", ["chess,strategy"], "dataset"),
+        document_terms("Racing cars", "Lap times", ["racing"], "dataset"),
+    ]
+    matrix, vocabulary, document_frequency = tfidf_index(documents)
+
+    vector = tfidf_vector(documents[1], dict(zip(vocabulary, document_frequency)), len(documents))
+    row = matrix.getrow(1)
+    assert set(vector) == {vocabulary[column] for column in row.indices}
+    assert np.allclose([vector[vocabulary[column]] for column in row.indices], row.data)
+
+
+@pytest.fixture(scope="module")
+def content_datasets(test_client):
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        contents = [
+            ("Chess opening repertoire", "Opening trees of chess games", "chess,openings", "Carlsen"),
+            ("Chess endgame tablebases", "Endgame positions of chess games", "chess,endgames", "Kasparov"),
+            ("Kart racing lap times", "Lap times of kart races", "racing,karts", "Senna"),
+        ]
+        ids = []
+        for title, description, tags, author in contents:
+            ds_meta = DSMetaData(
+                title=title,
+                description=description,
+                publication_type=PublicationType.OTHER,
+                tags=tags,
+                authors=[Author(name=author)],
+            )
+            dataset = DataSet(user_id=user.id, ds_meta_data=ds_meta)
+            db.session.add(dataset)
+            db.session.flush()
+            ids.append(dataset.id)
+        db.session.commit()
+
+    yield test_client, ids
+
+
+def test_content_recommendations_complete_single_author_datasets(content_datasets):
+    client, ids = content_datasets
+    with client.application.app_context():
+        service.author_overlap_engine.rebuild()
+        service.content_similarity_engine.rebuild()
+
+        opening = db.session.get(DataSet, ids[0])
+        assert service.get_recommended_datasets(opening) == []
+        assert service.get_dataset_recommendations(opening)[0].id == ids[1]
+        assert ids[2] not in [ds.id for ds in service.get_similar_datasets(opening)]
+
+
+def test_content_index_dataset_adds_it_to_similar_lists(content_datasets):
+    client, ids = content_datasets
+    with client.application.app_context():
+        service.content_similarity_engine.rebuild()
+        user = User.query.filter_by(email="test@example.com").first()
+        ds_meta = DSMetaData(
+            title="Chess middlegame plans",
+            description="Middlegame positions of chess games",
+            publication_type=PublicationType.OTHER,
+            tags="chess,openings,endgames",
+        )
+        dataset = DataSet(user_id=user.id, ds_meta_data=ds_meta)
+        db.session.add(dataset)
+        db.session.commit()
+
+        service.content_similarity_engine.index_dataset(dataset)
+
+        lists = service.content_similarity_engine.stored([dataset.id, ids[0], ids[1]])
+        assert {recommended_id for recommended_id, _ in lists[dataset.id][:2]} == {ids[0], ids[1]}
+        assert dataset.id in [recommended_id for recommended_id, _ in lists[ids[0]]]
+        assert dataset.id in [recommended_id for recommended_id, _ in lists[ids[1]]]
+
+
+def test_content_similarities_only_look_for_candidates_through_uncommon_terms(content_datasets):
+    client, ids = content_datasets
+    with client.application.app_context():
+        service.content_similarity_engine.rebuild()
+        assert service.content_similarity_engine.similarities(ids[0])[0][0] == ids[1]
+
+        # Every term the chess datasets share is held by two datasets or more
+        engine = service.ContentSimilarityEngine(max_term_frequency=1)
+        assert engine.similarities(ids[0]) == []
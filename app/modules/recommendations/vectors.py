@@ -0,0 +1,142 @@
+"""
+TF-IDF vectors of dataset metadata and batched cosine similarity search, used by the content similarity
+recommendations.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+from scipy import sparse
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]{2,}")
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were with".split()
+)
+
+# Rows whose similarities are computed in a single sparse product, at most
+BATCH_SIZE = 512
+
+# Cells (rows x datasets) of a single product: fewer rows are multiplied at once in large catalogues, so the
+# memory a product takes doesn't grow with the catalogue
+MAX_PRODUCT_CELLS = 2**23
+
+# Length of the `term` columns of the stored vectors
+MAX_TERM_LENGTH = 255
+
+
+def bounded_term(term):
+    """
+    The term itself, or, when it doesn't fit the stored vectors, its beginning followed by a hash of the
+    whole term, so different long terms stay different.
+    """
+    if len(term) <= MAX_TERM_LENGTH:
+        return term
+    digest = hashlib.sha1(term.encode("utf-8")).hexdigest()
+    return f"{term[: MAX_TERM_LENGTH - len(digest) - 1]}#{digest}"
+
+
+def tokenize(text):
+    return [
+        bounded_term(token) for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOP_WORDS
+    ]
+
+
+def document_terms(title, description, tags, publication_type):
+    """
+    Terms of a dataset: words of the title (counted twice) and description, every tag of the dataset and
+    its feature models as a single term, and the publication type.
+    """
+    title_terms = tokenize(title)
+    terms = title_terms + title_terms + tokenize(description)
+    for tag_list in tags:
+        terms.extend(bounded_term(f"tag:{tag.strip().lower()}") for tag in (tag_list or "").split(",") if tag.strip())
+    if publication_type:
+        terms.append(f"type:{publication_type}")
+    return terms
+
+
+def inverse_document_frequency(document_frequency, documents):
+    """Smoothed IDF of a term found in `document_frequency` of `documents` documents (works on arrays too)."""
+    return np.log((1 + documents) / (1 + document_frequency)) + 1
+
+
+def tfidf_index(documents):
+    """
+    Sparse matrix with one L2-normalised TF-IDF row per document (a list of terms), using sublinear term
+    frequencies and smoothed inverse document frequencies, with the term of every column and the number of
+    documents holding it.
+    """
+    vocabulary = {}
+    indptr, indices, counts = [0], [], []
+    for terms in documents:
+        document_counts = {}
+        for term in terms:
+            column = vocabulary.setdefault(term, len(vocabulary))
+            document_counts[column] = document_counts.get(column, 0) + 1
+        indices.extend(document_counts)
+        counts.extend(document_counts.values())
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(counts, dtype=np.float32), np.asarray(indices, dtype=np.int64), indptr),
+        shape=(len(documents), len(vocabulary)),
+    )
+    matrix.data = 1 + np.log(matrix.data)
+
+    document_frequency = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = inverse_document_frequency(document_frequency, len(documents))
+    matrix = (matrix @ sparse.diags(idf.astype(np.float32))).tocsr()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = (sparse.diags((1 / norms).astype(np.float32)) @ matrix).tocsr()
+    return matrix, list(vocabulary), document_frequency
+
+
+def tfidf_matrix(documents):
+    """The TF-IDF matrix of `tfidf_index`, one row per document."""
+    return tfidf_index(documents)[0]
+
+
+def tfidf_vector(terms, document_frequencies, documents):
+    """
+    L2-normalised TF-IDF weights ({term: weight}) of a single document, weighted like the rows of
+    `tfidf_index` with the document frequencies of a catalogue of `documents` documents that includes it.
+    """
+    counts = {}
+    for term in terms:
+        counts[term] = counts.get(term, 0) + 1
+    weights = {
+        term: (1 + np.log(count)) * inverse_document_frequency(document_frequencies.get(term, 1), documents)
+        for term, count in counts.items()
+    }
+    norm = np.sqrt(sum(weight * weight for weight in weights.values())) or 1
+    return {term: float(weight / norm) for term, weight in weights.items()}
+
+
+def top_neighbours(matrix, rows, top_k, min_similarity, batch_size=BATCH_SIZE, max_cells=MAX_PRODUCT_CELLS):
+    """
+    Yields (row, nearest) for each of `rows`: its `top_k` most similar rows of `matrix` by cosine similarity
+    as (row, similarity) pairs, most similar first. Rows are never their own neighbours, and neighbours below
+    `min_similarity` are left out. The products stay sparse, and the rows multiplied at once are limited so
+    that a product has at most `max_cells` cells.
+    """
+    batch_size = max(1, min(batch_size, max_cells // max(matrix.shape[0], 1)))
+    for start in range(0, len(rows), batch_size):
+        batch = np.asarray(rows[start : start + batch_size], dtype=np.int64)
+        similarities = (matrix[batch] @ matrix.T).tocsr()
+
+        for position, row in enumerate(batch):
+            begin, end = similarities.indptr[position], similarities.indptr[position + 1]
+            columns, values = similarities.indices[begin:end], similarities.data[begin:end]
+            keep = (columns != row) & (values >= min_similarity)
+            columns, values = columns[keep], values[keep]
+            if len(values) > top_k:
+                candidates = np.argpartition(-values, top_k)[:top_k]
+                columns, values = columns[candidates], values[candidates]
+
+            nearest = [(int(column), float(value)) for column, value in zip(columns, values)]
+            nearest.sort(key=lambda pair: (-pair[1], pair[0]))
+            yield int(row), nearest
@@ -1,13 +1,19 @@
 import subprocess
 from datetime import datetime, timezone
+from functools import cache
 
 from flask import abort
 
-import docker
 from app.modules.webhook.repositories import WebhookRepository
 from core.services.BaseService import BaseService
 
-client = docker.from_env()
+
+@cache
+def get_docker_client():
+    # Connects to the Docker socket on the first webhook, so the app starts on hosts without Docker
+    import docker
+
+    return docker.from_env()
 
 
 class WebhookService(BaseService):
@@ -15,9 +21,11 @@ class WebhookService(BaseService):
         super().__init__(WebhookRepository())
 
     def get_web_container(self):
+        from docker.errors import NotFound
+
         try:
-            return client.containers.get("web_app_container")
-        except docker.errors.NotFound:
+            return get_docker_client().containers.get("web_app_container")
+        except NotFound:
             abort(404, description="Web container not found.")
 
     def get_volume_name(self, container):
@@ -0,0 +1,246 @@
+import logging
+import os
+import random
+import threading
+import time
+from functools import cache
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Methods that can be sent twice without changing the result
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+
+# Statuses of a backend that is overloaded or restarting: the request may work a moment later
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+
+# Longest Retry-After, in seconds, that is honoured before retrying
+MAX_RETRY_AFTER = 10
+
+
+class ZenodoUnavailableError(Exception):
+    """Zenodo failed too many times in a row: requests fail at once until the circuit is closed again."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, so callers fail fast instead of waiting for the
+    timeouts of a backend that is down. After `reset_timeout` seconds one trial request is let through: the
+    circuit closes if it succeeds and opens again if it fails.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self.clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self):
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Zenodo circuit opened after {self._failures} consecutive failures")
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+
+class ZenodoClient:
+    """
+    HTTP client for the Zenodo (or fakenodo) API. Every request has connect and read timeouts, and goes
+    through the circuit breaker. Requests that failed with a connection error, a timeout or a retryable
+    status are retried with exponential backoff and full jitter, but only when sending them again is safe:
+    idempotent methods, calls marked `idempotent=True`, or requests that never reached the server.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        connect_timeout=3.05,
+        read_timeout=30.0,
+        retries=3,
+        backoff=0.5,
+        max_backoff=8.0,
+        breaker=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        # Keeps the connections to Zenodo open between requests
+        self.session = requests.Session()
+
+    @classmethod
+    def from_environment(cls, base_url):
+        return cls(
+            base_url,
+            connect_timeout=float(os.getenv("ZENODO_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.getenv("ZENODO_READ_TIMEOUT", "30")),
+            retries=int(os.getenv("ZENODO_RETRIES", "3")),
+            backoff=float(os.getenv("ZENODO_BACKOFF", "0.5")),
+            max_backoff=float(os.getenv("ZENODO_MAX_BACKOFF", "8")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("ZENODO_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("ZENODO_BREAKER_RESET", "30")),
+            ),
+        )
+
+    def url(self, path=""):
+        return f"{self.base_url}/{path.lstrip('/')}" if path else self.base_url
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_RETRY_AFTER)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    @staticmethod
+    def _rewind(kwargs):
+        # The uploaded files were read by the previous attempt
+        for file in (kwargs.get("files") or {}).values():
+            file = file[1] if isinstance(file, tuple) else file
+            if hasattr(file, "seek"):
+                file.seek(0)
+
+    def request(self, method, path="", idempotent=None, **kwargs):
+        """
+        Sends the request and returns the last response, or raises the last connection error or timeout.
+        Raises ZenodoUnavailableError without sending anything while the circuit is open.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", self.timeout)
+        url = self.url(path)
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow_request():
+                raise ZenodoUnavailableError(f"Zenodo is unavailable, not sending {method} {url}")
+            if attempt:
+                self._rewind(kwargs)
+
+            response = error = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectTimeout as e:
+                error, retryable = e, True
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # The server may have processed the request before the connection dropped
+                error, retryable = e, idempotent
+            except Exception:
+                # Let a half-open circuit run its trial again later
+                self.breaker.record_failure()
+                raise
+
+            if response is not None:
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                # A 429 means the request was rejected without being processed
+                retryable = response.status_code in RETRYABLE_STATUSES and (idempotent or response.status_code == 429)
+            else:
+                self.breaker.record_failure()
+
+            if not retryable or attempt >= self.retries:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._delay(attempt, response)
+            logger.info(
+                f"Retrying {method} {url} in {delay:.2f}s (attempt {attempt + 1}): {error or response.status_code}"
+            )
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, path="", **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path="", **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path="", **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path="", **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+
+@cache
+def resolve_zenodo_url():
+    """
+    Base URL of the depositions API, resolved once per process:
+
+    1) FAKENODO_URL env var
+    2) Fakenodo on the default gateway, when running inside Docker
+    3) Default local fakenodo instance (http://localhost:5001/deposit/depositions)
+    """
+    fakenodo_url = os.getenv("FAKENODO_URL")
+    if fakenodo_url:
+        return fakenodo_url.rstrip("/")
+
+    # If running inside Docker and FAKENODO_URL not set, try to detect the host gateway
+    # so a fakenodo process running on the host (listening on 0.0.0.0:5001) can be reached
+    # from the container without extra env configuration.
+    try:
+        # Parse /proc/net/route to get the default gateway
+        if os.path.exists("/proc/net/route"):
+            with open("/proc/net/route") as f:
+                for line in f.readlines()[1:]:
+                    parts = line.strip().split()
+                    if len(parts) >= 3 and parts[1] == "00000000":
+                        gw_hex = parts[2]
+                        # Convert little-endian hex to IP
+                        gw = ".".join(str(int(gw_hex[i : i + 2], 16)) for i in range(6, -1, -2))
+                        return f"http://{gw}:5001/deposit/depositions"
+    except Exception:
+        pass
+
+    # Final fallback to localhost (useful when running fakenodo inside same container)
+    return "http://localhost:5001/deposit/depositions"
+
+
+@cache
+def get_zenodo_client(base_url=None):
+    """Client shared by the whole process, so every request sees the same circuit breaker."""
+    return ZenodoClient.from_environment(base_url or resolve_zenodo_url())
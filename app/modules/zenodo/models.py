@@ -1,5 +1,63 @@
+from datetime import datetime, timezone
+
 from app import db
 
 
+def utcnow():
+    # Naive UTC, as stored by the DateTime columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Zenodo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+
+
+class ZenodoSyncRecord(db.Model):
+    """
+    Progress of the publication of a dataset by the sync job. `step` is the last step that completed, so a
+    dataset that failed is resumed from the next one instead of being published again from scratch.
+    """
+
+    __tablename__ = "zenodo_sync_record"
+
+    # Steps, in order
+    PENDING = "pending"
+    DEPOSITION_CREATED = "deposition_created"
+    FILES_UPLOADED = "files_uploaded"
+    PUBLISHED = "published"
+
+    # Statuses
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id", ondelete="CASCADE"), primary_key=True)
+    step = db.Column(db.String(32), nullable=False, default=PENDING)
+    status = db.Column(db.String(16), nullable=False, default=QUEUED, index=True)
+    deposition_id = db.Column(db.Integer)
+    # Names of the files already uploaded to the deposition, separated by newlines
+    uploaded_files = db.Column(db.Text, nullable=False, default="")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=utcnow,
+        onupdate=utcnow,
+    )
+
+    def uploaded(self):
+        return set(filter(None, self.uploaded_files.split("\n")))
+
+    def to_dict(self):
+        return {
+            "dataset_id": self.dataset_id,
+            "step": self.step,
+            "status": self.status,
+            "deposition_id": self.deposition_id,
+            "uploaded_files": sorted(self.uploaded()),
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -1,7 +1,69 @@
-from app.modules.zenodo.models import Zenodo
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app.modules.dataset.models import DataSet, DSMetaData
+from app.modules.zenodo.models import Zenodo, ZenodoSyncRecord, utcnow
 from core.repositories.BaseRepository import BaseRepository
 
 
 class ZenodoRepository(BaseRepository):
     def __init__(self):
         super().__init__(Zenodo)
+
+
+class ZenodoSyncRecordRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(ZenodoSyncRecord)
+
+    def _unsynchronized(self, *columns):
+        return (
+            self.session.query(*columns)
+            .join(DSMetaData, DataSet.ds_meta_data_id == DSMetaData.id)
+            .filter(DSMetaData.dataset_doi.is_(None))
+        )
+
+    def unsynchronized_dataset_ids(self, limit=None):
+        query = self._unsynchronized(DataSet.id).order_by(DataSet.id)
+        if limit:
+            query = query.limit(limit)
+        return [dataset_id for (dataset_id,) in query]
+
+    def count_unsynchronized(self) -> int:
+        return self._unsynchronized(func.count(DataSet.id)).scalar()
+
+    def claim(self, dataset_id, stale_before) -> bool:
+        """
+        Marks the dataset as being synchronized by the caller. Fails if another job is already on it, unless
+        that job has not recorded any progress since `stale_before`.
+        """
+        if self.get_by_id(dataset_id) is None:
+            try:
+                self.create(dataset_id=dataset_id)
+            except IntegrityError:
+                # Created at the same time by another job
+                self.session.rollback()
+
+        claimed = (
+            self.session.query(ZenodoSyncRecord)
+            .filter(
+                ZenodoSyncRecord.dataset_id == dataset_id,
+                or_(ZenodoSyncRecord.status != ZenodoSyncRecord.RUNNING, ZenodoSyncRecord.updated_at < stale_before),
+            )
+            .update(
+                {
+                    "status": ZenodoSyncRecord.RUNNING,
+                    "attempts": ZenodoSyncRecord.attempts + 1,
+                    "updated_at": utcnow(),
+                },
+                synchronize_session=False,
+            )
+        )
+        self.session.commit()
+        return claimed == 1
+
+    def count_by_status(self) -> dict:
+        rows = self.session.query(ZenodoSyncRecord.status, func.count()).group_by(ZenodoSyncRecord.status)
+        return dict(rows.all())
+
+    def latest(self, limit=50):
+        return self.model.query.order_by(ZenodoSyncRecord.updated_at.desc()).limit(limit).all()
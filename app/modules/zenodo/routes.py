@@ -1,7 +1,8 @@
-from flask import render_template
+from flask import current_app, jsonify, render_template, request
 
+from app.modules.auth.routes import admin_required
 from app.modules.zenodo import zenodo_bp
-from app.modules.zenodo.services import ZenodoService
+from app.modules.zenodo.services import ZenodoService, ZenodoSyncService, start_background_sync
 
 
 @zenodo_bp.route("/zenodo", methods=["GET"])
@@ -15,6 +16,27 @@ def zenodo_test() -> dict:
     result = service.test_full_connection()
     return {
         "zenodo_url": service.ZENODO_API_URL,
-        "test_result": result.get_json() if hasattr(result, "get_json") else result
+        "test_result": result.get_json() if hasattr(result, "get_json") else result,
     }
 
+
+@zenodo_bp.route("/admin/zenodo/sync", methods=["GET"])
+@admin_required
+def sync_status():
+    service = ZenodoSyncService()
+    return jsonify(
+        {
+            "pending": service.pending_count(),
+            "by_status": service.summary(),
+            "records": [record.to_dict() for record in service.latest(request.args.get("limit", 50, type=int))],
+        }
+    )
+
+
+@zenodo_bp.route("/admin/zenodo/sync", methods=["POST"])
+@admin_required
+def start_sync():
+    workers = request.args.get("workers", current_app.config.get("ZENODO_SYNC_WORKERS", 4), type=int)
+    if not start_background_sync(current_app._get_current_object(), workers=workers):
+        return jsonify({"message": "A synchronization is already running"}), 409
+    return jsonify({"message": "Synchronization started", "workers": workers}), 202
@@ -1,5 +1,8 @@
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 
 import requests
 from dotenv import load_dotenv
@@ -7,8 +10,11 @@ from flask import Response, jsonify
 from flask_login import current_user
 
 from app.modules.dataset.models import DataSet
+from app.modules.dataset.services import DataSetService
 from app.modules.featuremodel.models import FeatureModel
-from app.modules.zenodo.repositories import ZenodoRepository
+from app.modules.zenodo.client import ZenodoUnavailableError, get_zenodo_client, resolve_zenodo_url
+from app.modules.zenodo.models import ZenodoSyncRecord, utcnow
+from app.modules.zenodo.repositories import ZenodoRepository, ZenodoSyncRecordRepository
 from core.configuration.configuration import uploads_folder_name
 from core.services.BaseService import BaseService
 
@@ -21,37 +27,9 @@ class ZenodoService(BaseService):
 
     def get_zenodo_url(self):
         """
-        Always returns the base URL for Fakenodo.
-
-        Priority:
-        1) FAKENODO_URL env var
-        2) Default local fakenodo instance (http://localhost:5001/deposit/depositions)
+        Always returns the base URL for Fakenodo, resolved once per process (see resolve_zenodo_url).
         """
-        fakenodo_url = os.getenv("FAKENODO_URL")
-        if fakenodo_url:
-            return fakenodo_url.rstrip("/")
-
-        # If running inside Docker and FAKENODO_URL not set, try to detect the host gateway
-        # so a fakenodo process running on the host (listening on 0.0.0.0:5001) can be reached
-        # from the container without extra env configuration.
-        try:
-            # Parse /proc/net/route to get the default gateway
-            if os.path.exists("/proc/net/route"):
-                with open("/proc/net/route") as f:
-                    for line in f.readlines()[1:]:
-                        parts = line.strip().split()
-                        if len(parts) >= 3 and parts[1] == "00000000":
-                            gw_hex = parts[2]
-                            # Convert little-endian hex to IP
-                            gw = ".".join(str(int(gw_hex[i : i + 2], 16)) for i in range(6, -1, -2))
-                            candidate = f"http://{gw}:5001/deposit/depositions"
-                            return candidate.rstrip("/")
-        except Exception:
-            pass
-
-        # Final fallback to localhost (useful when running fakenodo inside same container)
-        return "http://localhost:5001/deposit/depositions"
-
+        return resolve_zenodo_url()
 
     def get_zenodo_access_token(self):
         return os.getenv("ZENODO_ACCESS_TOKEN")
@@ -70,6 +48,9 @@ class ZenodoService(BaseService):
         # Basic headers (no Authorization header for fakenodo)
         self.headers = {"Content-Type": "application/json"}
 
+        # Timeouts, retries and circuit breaker shared by every ZenodoService of the process
+        self.client = get_zenodo_client(self.ZENODO_API_URL)
+
         # No auth params when using fakenodo-only
         self.params = {}
 
@@ -80,7 +61,10 @@ class ZenodoService(BaseService):
         Returns:
             bool: True if the connection is successful, False otherwise.
         """
-        response = requests.get(self.ZENODO_API_URL, params=self.params, headers=self.headers)
+        try:
+            response = self.client.get(params=self.params, headers=self.headers)
+        except (requests.RequestException, ZenodoUnavailableError):
+            return False
         return response.status_code == 200
 
     def test_full_connection(self) -> Response:
@@ -111,7 +95,7 @@ class ZenodoService(BaseService):
             }
         }
 
-        response = requests.post(self.ZENODO_API_URL, json=data, params=self.params, headers=self.headers)
+        response = self.client.post(json=data, params=self.params, headers=self.headers)
 
         if response.status_code != 201:
             return jsonify(
@@ -127,7 +111,9 @@ class ZenodoService(BaseService):
         data = {"name": "test_file.txt"}
         files = {"file": open(file_path, "rb")}
         publish_url = f"{self.ZENODO_API_URL}/{deposition_id}/files"
-        response = requests.post(publish_url, params=self.params, data=data, files=files)
+        response = self.client.post(
+            f"{deposition_id}/files", params=self.params, data=data, files=files, idempotent=True
+        )
         files["file"].close()  # Close the file after uploading
 
         logger.info(f"Publish URL: {publish_url}")
@@ -142,7 +128,7 @@ class ZenodoService(BaseService):
             success = False
 
         # Step 3: Delete the deposition
-        response = requests.delete(f"{self.ZENODO_API_URL}/{deposition_id}", params=self.params)
+        response = self.client.delete(f"{deposition_id}", params=self.params)
 
         if os.path.exists(file_path):
             os.remove(file_path)
@@ -156,7 +142,7 @@ class ZenodoService(BaseService):
         Returns:
             dict: The response in JSON format with the depositions.
         """
-        response = requests.get(self.ZENODO_API_URL, params=self.params, headers=self.headers)
+        response = self.client.get(params=self.params, headers=self.headers)
         if response.status_code != 200:
             raise Exception("Failed to get depositions")
         return response.json()
@@ -201,7 +187,7 @@ class ZenodoService(BaseService):
 
         data = {"metadata": metadata}
 
-        response = requests.post(self.ZENODO_API_URL, params=self.params, json=data, headers=self.headers)
+        response = self.client.post(params=self.params, json=data, headers=self.headers)
         if response.status_code != 201:
             # Try to extract JSON error if possible, otherwise include raw text
             try:
@@ -232,10 +218,11 @@ class ZenodoService(BaseService):
         data = {"name": uvl_filename}
         user_id = current_user.id if user is None else user.id
         file_path = os.path.join(uploads_folder_name(), f"user_{str(user_id)}", f"dataset_{dataset.id}/", uvl_filename)
-        files = {"file": open(file_path, "rb")}
-
-        publish_url = f"{self.ZENODO_API_URL}/{deposition_id}/files"
-        response = requests.post(publish_url, params=self.params, data=data, files=files)
+        # Fakenodo replaces a file uploaded again with the same name, so a failed upload can be retried
+        with open(file_path, "rb") as file:
+            response = self.client.post(
+                f"{deposition_id}/files", params=self.params, data=data, files={"file": file}, idempotent=True
+            )
         if response.status_code != 201:
             error_message = f"Failed to upload files. Error details: {response.json()}"
             raise Exception(error_message)
@@ -251,8 +238,7 @@ class ZenodoService(BaseService):
         Returns:
             dict: The response in JSON format with the details of the published deposition.
         """
-        publish_url = f"{self.ZENODO_API_URL}/{deposition_id}/actions/publish"
-        response = requests.post(publish_url, params=self.params, headers=self.headers)
+        response = self.client.post(f"{deposition_id}/actions/publish", params=self.params, headers=self.headers)
         if response.status_code != 202:
             raise Exception("Failed to publish deposition")
         return response.json()
@@ -267,8 +253,7 @@ class ZenodoService(BaseService):
         Returns:
             dict: The response in JSON format with the details of the deposition.
         """
-        deposition_url = f"{self.ZENODO_API_URL}/{deposition_id}"
-        response = requests.get(deposition_url, params=self.params, headers=self.headers)
+        response = self.client.get(f"{deposition_id}", params=self.params, headers=self.headers)
         if response.status_code != 200:
             raise Exception("Failed to get deposition")
         return response.json()
@@ -283,4 +268,145 @@ class ZenodoService(BaseService):
         Returns:
             str: The DOI of the deposition.
         """
-        return self.get_deposition(deposition_id).get("doi")
\ No newline at end of file
+        return self.get_deposition(deposition_id).get("doi")
+
+
+class ZenodoSyncService(BaseService):
+    """
+    Publishes the datasets that have no DOI yet, for instance because Zenodo was down when they were
+    uploaded. The progress of every dataset is recorded after each step (deposition created, each file
+    uploaded, published), so a dataset that fails again is resumed where it stopped.
+    """
+
+    # A dataset claimed by a job that has recorded no progress for this long is taken over by the next one
+    STALE_AFTER = timedelta(minutes=30)
+
+    def __init__(self, zenodo_service=None):
+        super().__init__(ZenodoSyncRecordRepository())
+        self.zenodo_service = zenodo_service or ZenodoService()
+
+    def pending_dataset_ids(self, limit=None):
+        return self.repository.unsynchronized_dataset_ids(limit)
+
+    def pending_count(self) -> int:
+        return self.repository.count_unsynchronized()
+
+    def summary(self) -> dict:
+        return self.repository.count_by_status()
+
+    def latest(self, limit=50):
+        return self.repository.latest(limit)
+
+    def _deposition_exists(self, deposition_id) -> bool:
+        response = self.zenodo_service.client.get(f"{deposition_id}")
+        if response.status_code == 404:
+            return False
+        if response.status_code != 200:
+            raise Exception(f"Failed to get deposition {deposition_id}: {response.status_code}")
+        return True
+
+    def sync_dataset(self, dataset_id: int) -> dict:
+        """Runs the steps left to publish the dataset, returning its progress record as a dictionary."""
+        if not self.repository.claim(dataset_id, utcnow() - self.STALE_AFTER):
+            return {"dataset_id": dataset_id, "status": "skipped"}
+
+        record = self.repository.get_by_id(dataset_id)
+        dataset = DataSet.query.get(dataset_id)
+        dataset_service = DataSetService()
+        session = self.repository.session
+
+        try:
+            if record.deposition_id is None and dataset.ds_meta_data.deposition_id:
+                # Created by the upload form before it failed
+                record.deposition_id = dataset.ds_meta_data.deposition_id
+                record.step = ZenodoSyncRecord.DEPOSITION_CREATED
+            if record.deposition_id is not None and not self._deposition_exists(record.deposition_id):
+                record.deposition_id = None
+                record.step = ZenodoSyncRecord.PENDING
+                record.uploaded_files = ""
+            if record.step == ZenodoSyncRecord.PUBLISHED:
+                # The DOI was published but not stored
+                record.step = ZenodoSyncRecord.FILES_UPLOADED
+            session.commit()
+
+            if record.step == ZenodoSyncRecord.PENDING:
+                deposition = self.zenodo_service.create_new_deposition(dataset)
+                record.deposition_id = int(deposition["id"])
+                record.step = ZenodoSyncRecord.DEPOSITION_CREATED
+                dataset.ds_meta_data.deposition_id = record.deposition_id
+                session.commit()
+
+            if record.step == ZenodoSyncRecord.DEPOSITION_CREATED:
+                for feature_model in dataset.feature_models:
+                    filename = feature_model.fm_meta_data.uvl_filename
+                    if filename in record.uploaded():
+                        continue
+                    self.zenodo_service.upload_file(dataset, record.deposition_id, feature_model, user=dataset.user)
+                    record.uploaded_files = "\n".join(sorted(record.uploaded() | {filename}))
+                    session.commit()
+                record.step = ZenodoSyncRecord.FILES_UPLOADED
+                session.commit()
+
+            # A deposition published before the job stopped is not published again
+            doi = self.zenodo_service.get_deposition(record.deposition_id).get("doi")
+            if not doi:
+                doi = self.zenodo_service.publish_deposition(record.deposition_id).get("doi")
+            if not doi:
+                raise Exception("The deposition was published without a DOI")
+            dataset_service.update_dsmetadata(dataset.ds_meta_data_id, dataset_doi=doi)
+
+            record.step = ZenodoSyncRecord.PUBLISHED
+            record.status = ZenodoSyncRecord.DONE
+            record.last_error = None
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Could not synchronize dataset {dataset_id}: {e}")
+            record = self.repository.get_by_id(dataset_id)
+            record.status = ZenodoSyncRecord.FAILED
+            record.last_error = str(e)[:2000]
+            session.commit()
+
+        return record.to_dict()
+
+    def sync_all(self, app, dataset_ids=None, workers=4, on_progress=None) -> list:
+        """
+        Synchronizes the datasets, `workers` at a time. Each of them runs in its own application context, so
+        with its own database session, in a thread of the pool.
+        """
+        if dataset_ids is None:
+            dataset_ids = self.pending_dataset_ids()
+
+        def sync_in_context(dataset_id):
+            with app.app_context():
+                return ZenodoSyncService(self.zenodo_service).sync_dataset(dataset_id)
+
+        results = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for future in as_completed([executor.submit(sync_in_context, dataset_id) for dataset_id in dataset_ids]):
+                results.append(future.result())
+                if on_progress:
+                    on_progress(results[-1], len(results), len(dataset_ids))
+        return results
+
+
+_background_sync_lock = threading.Lock()
+
+
+def start_background_sync(app, workers=4) -> bool:
+    """Synchronizes the pending datasets in a thread of this process. Returns False if one is already running."""
+    if not _background_sync_lock.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            with app.app_context():
+                results = ZenodoSyncService().sync_all(app, workers=workers)
+            logger.info(f"Background Zenodo sync finished: {len(results)} datasets")
+        except Exception:
+            logger.exception("Background Zenodo sync failed")
+        finally:
+            _background_sync_lock.release()
+
+    threading.Thread(target=run, name="zenodo-sync", daemon=True).start()
+    return True
@@ -0,0 +1,232 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+
+import pytest
+import requests
+from flask import request
+from werkzeug.serving import make_server
+
+from app.modules.dataset.models import DataSet
+from app.modules.zenodo.client import CircuitBreaker, ZenodoClient, ZenodoUnavailableError, resolve_zenodo_url
+from app.modules.zenodo.models import ZenodoSyncRecord
+from app.modules.zenodo.services import ZenodoService, ZenodoSyncService
+from core.benchmarks.data_generator import SyntheticDataGenerator
+from fakenodo.app import FaultInjector, create_app
+from fakenodo.storage import BlobStore, JSONLogStorage, MemoryStorage, SQLiteStorage
+
+DEPOSITIONS = "/deposit/depositions"
+
+
+def fakenodo_client(storage, tmp_path, faults=None):
+    app = create_app(storage=storage, blobs=BlobStore(str(tmp_path / "files")), faults=faults or FaultInjector())
+    return app.test_client()
+
+
+def publish_dataset(client, title, content):
+    deposition_id = client.post(DEPOSITIONS, json={"metadata": {"title": title}}).get_json()["id"]
+    response = client.post(
+        f"{DEPOSITIONS}/{deposition_id}/files", data={"name": "model.uvl", "file": (BytesIO(content), "model.uvl")}
+    )
+    assert response.status_code == 201
+    assert client.post(f"{DEPOSITIONS}/{deposition_id}/actions/publish").status_code == 202
+    return deposition_id
+
+
+def test_fakenodo_keeps_depositions_and_file_contents_across_restarts(tmp_path):
+    log_path = str(tmp_path / "fakenodo.jsonl")
+    client = fakenodo_client(JSONLogStorage(log_path), tmp_path)
+    deposition_id = publish_dataset(client, "Steam top sellers", b"features\n    Games\n")
+    with open(log_path, "a") as log:
+        log.write('{"event": "create", "deposi')  # the server stopped while writing a change
+
+    client = fakenodo_client(JSONLogStorage(log_path), tmp_path)
+    deposition = client.get(f"{DEPOSITIONS}/{deposition_id}").get_json()
+    assert deposition["metadata"]["title"] == "Steam top sellers"
+    assert deposition["doi"] == deposition["published_versions"][0]["doi"]
+    assert deposition["files"][0]["checksum"] == hashlib.md5(b"features\n    Games\n").hexdigest()
+    assert deposition["files"][0]["filesize"] == 19
+
+    content = client.get(f"{DEPOSITIONS}/{deposition_id}/files/{deposition['files'][0]['id']}/content")
+    assert content.data == b"features\n    Games\n"
+    assert content.headers["Content-MD5"] == deposition["files"][0]["checksum"]
+
+    # New changes follow the last complete one
+    assert client.post(DEPOSITIONS, json={}).get_json()["id"] == deposition_id + 1
+    assert len(JSONLogStorage(log_path).list_depositions(0, 10)[0]) == 2
+
+
+def test_fakenodo_rejects_files_whose_checksum_does_not_match(tmp_path):
+    client = fakenodo_client(SQLiteStorage(str(tmp_path / "fakenodo.db")), tmp_path)
+    deposition_id = client.post(DEPOSITIONS, json={}).get_json()["id"]
+
+    response = client.post(
+        f"{DEPOSITIONS}/{deposition_id}/files",
+        data={"name": "model.uvl", "checksum": "md5:0123", "file": (BytesIO(b"features"), "model.uvl")},
+    )
+
+    assert response.status_code == 400
+    assert client.get(f"{DEPOSITIONS}/{deposition_id}/files").get_json() == []
+
+
+def test_fakenodo_handles_concurrent_publications_and_paginates(tmp_path):
+    client = fakenodo_client(SQLiteStorage(str(tmp_path / "fakenodo.db")), tmp_path)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        ids = list(executor.map(lambda i: publish_dataset(client, f"Dataset {i}", b"features %d" % i), range(24)))
+    assert sorted(ids) == list(range(1, 25))
+
+    response = client.get(f"{DEPOSITIONS}?page=2&size=10")
+    assert response.status_code == 200
+    assert [deposition["id"] for deposition in response.get_json()] == list(range(14, 4, -1))
+    assert response.headers["X-Total-Count"] == "24"
+    assert 'page=3&size=10>; rel="next"' in response.headers["Link"]
+    assert 'page=1&size=10>; rel="prev"' in response.headers["Link"]
+    assert client.get(f"{DEPOSITIONS}?size=1000").status_code == 400
+
+    # Every deposition got its own DOI
+    dois = {client.get(f"{DEPOSITIONS}/{i}").get_json()["doi"] for i in ids}
+    assert len(dois) == 24 and None not in dois
+
+
+def test_fakenodo_injects_errors_before_or_after_processing(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "fakenodo.db"))
+    client = fakenodo_client(storage, tmp_path, faults=FaultInjector(latency=(0.01, 0.02), error_rate=1.0))
+
+    response = client.post(DEPOSITIONS, json={})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert storage.list_depositions(0, 10)[1] == 0
+
+    client = fakenodo_client(
+        storage, tmp_path, faults=FaultInjector(error_rate=1.0, error_statuses=[500], phase="after")
+    )
+    assert client.post(DEPOSITIONS, json={}).status_code == 500
+    assert storage.list_depositions(0, 10)[1] == 1
+
+
+@contextmanager
+def fakenodo_server(tmp_path, faults):
+    """Fakenodo served over HTTP in a thread, counting the requests it receives."""
+    app = create_app(storage=MemoryStorage(), blobs=BlobStore(str(tmp_path / "files")), faults=faults)
+    received = []
+    app.before_request_funcs.setdefault(None, []).insert(0, lambda: received.append(f"{request.method} {request.path}"))
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}{DEPOSITIONS}", received
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def test_zenodo_client_retries_idempotent_requests_and_opens_the_circuit(tmp_path):
+    faults = FaultInjector(error_rate=1.0, error_statuses=[502])
+    with fakenodo_server(tmp_path, faults) as (url, received):
+        breaker = CircuitBreaker(failure_threshold=5, reset_timeout=60)
+        client = ZenodoClient(url, retries=2, backoff=0, breaker=breaker)
+
+        assert client.get().status_code == 502
+        assert len(received) == 3
+
+        # Creating a deposition is not idempotent: it is sent once
+        assert client.post(json={}).status_code == 502
+        assert len(received) == 4
+
+        # The fifth failure in a row opens the circuit: the retries stop there, and later calls fail at once
+        with pytest.raises(ZenodoUnavailableError):
+            client.get()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert len(received) == 5
+
+        with pytest.raises(ZenodoUnavailableError):
+            client.get()
+        assert len(received) == 5
+
+
+def test_zenodo_client_times_out_and_closes_the_circuit_once_zenodo_recovers(tmp_path):
+    faults = FaultInjector(latency=(0.5, 0.5))
+    with fakenodo_server(tmp_path, faults) as (url, received):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+        client = ZenodoClient(url, read_timeout=0.05, retries=0, breaker=breaker)
+
+        start = time.monotonic()
+        with pytest.raises(requests.Timeout):
+            client.get()
+        assert time.monotonic() - start < 0.4
+        assert breaker.state == CircuitBreaker.OPEN
+
+        time.sleep(0.2)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        faults.latency = (0.0, 0.0)
+        assert client.post(json={}).status_code == 201
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_zenodo_url_is_resolved_once_per_process(monkeypatch):
+    resolve_zenodo_url.cache_clear()
+    monkeypatch.setenv("FAKENODO_URL", "http://fakenodo:5001/deposit/depositions/")
+    try:
+        assert ZenodoService().ZENODO_API_URL == "http://fakenodo:5001/deposit/depositions"
+
+        monkeypatch.setenv("FAKENODO_URL", "http://elsewhere:5001/deposit/depositions")
+        assert ZenodoService().ZENODO_API_URL == "http://fakenodo:5001/deposit/depositions"
+        assert ZenodoService().client is ZenodoService().client
+    finally:
+        resolve_zenodo_url.cache_clear()
+
+
+def test_zenodo_sync_resumes_failed_publications_without_repeating_steps(
+    test_app, test_client, clean_database, tmp_path, monkeypatch
+):
+    uploads = tmp_path / "uploads"
+    monkeypatch.setenv("UPLOADS_DIR", str(uploads))
+    SyntheticDataGenerator(12, seed=3, uploads_dir=str(uploads)).generate()
+
+    with fakenodo_server(tmp_path, FaultInjector()) as (url, received):
+        zenodo_service = ZenodoService()
+        zenodo_service.client = ZenodoClient(url, retries=0)
+        service = ZenodoSyncService(zenodo_service)
+        pending = service.pending_dataset_ids()
+        assert pending
+        assert service.pending_count() == len(pending)
+
+        def publish_fails(deposition_id):
+            raise Exception("Zenodo is down")
+
+        # Zenodo goes down after the files were uploaded
+        monkeypatch.setattr(zenodo_service, "publish_deposition", publish_fails)
+        results = service.sync_all(test_app, workers=4)
+        assert {result["status"] for result in results} == {"failed"}
+        assert {result["step"] for result in results} == {ZenodoSyncRecord.FILES_UPLOADED}
+        uploads_sent = sum(1 for line in received if line.endswith("/files"))
+        assert uploads_sent == sum(len(DataSet.query.get(i).feature_models) for i in pending)
+
+        monkeypatch.undo()
+        monkeypatch.setenv("UPLOADS_DIR", str(uploads))
+        received.clear()
+        results = service.sync_all(test_app, workers=4)
+
+        assert {result["status"] for result in results} == {"done"}
+        assert service.pending_dataset_ids() == []
+        assert service.pending_count() == 0
+        assert service.summary() == {ZenodoSyncRecord.DONE: len(pending)}
+        # Resumed at the publication: no deposition was created and no file was uploaded again
+        assert not [line for line in received if line == f"POST {DEPOSITIONS}" or line.endswith("/files")]
+        assert sum(1 for line in received if line.endswith("/actions/publish")) == len(pending)
+
+        dataset = DataSet.query.get(pending[0])
+        deposition = zenodo_service.get_deposition(dataset.ds_meta_data.deposition_id)
+        assert dataset.ds_meta_data.dataset_doi == deposition["doi"]
+
+        # A dataset being synchronized by another job is left to it
+        record = service.repository.get_by_id(pending[0])
+        assert record.updated_at.tzinfo is None
+        record.status = ZenodoSyncRecord.RUNNING
+        service.repository.session.commit()
+        assert service.sync_dataset(pending[0]) == {"dataset_id": pending[0], "status": "skipped"}
@@ -0,0 +1,314 @@
+import os
+import random
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.models import Author, DataSet, DSDownloadRecord, DSMetaData, DSViewRecord, PublicationType
+from app.modules.dataset.services import calculate_checksum_and_size
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.hubfile.models import Hubfile
+from app.modules.profile.models import UserProfile
+
+WORDS = (
+    "feature model product line variability configuration software automotive mobile linux kernel "
+    "smart home embedded cloud security web robotics drone game engine database compiler network "
+    "sensor medical energy railway avionics printer camera browser editor tablet wearable"
+).split()
+
+TAGS = ("tag1", "tag2", "tag3", "automotive", "linux", "iot", "web", "embedded", "security", "games")
+
+PUBLICATION_TYPES = [member for member in PublicationType if member is not PublicationType.NONE]
+
+AUTHOR_NAMES = ("Ana", "Luis", "Marta", "Pablo", "Lucia", "Jorge", "Elena", "David", "Sara", "Ivan")
+AUTHOR_SURNAMES = ("Garcia", "Lopez", "Perez", "Sanchez", "Romero", "Navarro", "Torres", "Ruiz", "Diaz", "Moreno")
+
+# Files the synthetic feature models are hard links to, relative to the working directory
+EXAMPLE_FILE_DIRS = (("app", "modules", "dataset", "uvl_examples"), ("app", "modules", "dataset_csv", "csv_example"))
+
+
+def example_files(working_dir=None):
+    """(path, extension, checksum, size) of every example UVL and CSV file, sorted by path."""
+    if working_dir is None:
+        working_dir = os.getenv("WORKING_DIR", "")
+
+    examples = []
+    for directory in EXAMPLE_FILE_DIRS:
+        path = os.path.join(working_dir, *directory)
+        if not os.path.isdir(path):
+            continue
+        for name in sorted(os.listdir(path)):
+            extension = os.path.splitext(name)[1].lower()
+            if extension in (".uvl", ".csv"):
+                file_path = os.path.join(path, name)
+                examples.append((file_path, extension, *calculate_checksum_and_size(file_path)))
+    return examples
+
+
+class SyntheticDataGenerator:
+    """
+    Fills the database with a deterministic synthetic catalogue of `scale` datasets, along with their owners,
+    authors, feature models, files and download/view records. Rows are inserted in batches through Core
+    inserts, so scales of hundreds of thousands of datasets are feasible.
+
+    The first user owns one in ten datasets and the author pool is much smaller than the catalogue, so
+    profile pagination and author-based recommendations work on realistically large result sets.
+    Popularity is skewed towards a small fraction of the datasets, as it is in production.
+
+    The per-dataset factors below can be overridden by keyword (e.g. `downloads_per_dataset=50`). With
+    `uploads_dir`, every file is also created on disk as a hard link to one of the example UVL and CSV files,
+    so downloads and analyses work on the synthetic datasets too.
+    """
+
+    DATASETS_PER_USER = 20
+    DATASETS_PER_AUTHOR = 10
+    MAX_AUTHORS_PER_DATASET = 3
+    MAX_FEATURE_MODELS_PER_DATASET = 3
+    DOWNLOADS_PER_DATASET = 5
+    VIEWS_PER_DATASET = 5
+    SYNCHRONIZED_RATIO = 0.9
+    RECORDS_DAYS = 60
+    BATCH_SIZE = 5000
+
+    FACTORS = (
+        "datasets_per_user",
+        "datasets_per_author",
+        "max_authors_per_dataset",
+        "max_feature_models_per_dataset",
+        "downloads_per_dataset",
+        "views_per_dataset",
+        "synchronized_ratio",
+        "records_days",
+        "batch_size",
+    )
+
+    def __init__(
+        self, scale: int, seed: int = 42, now: datetime = None, uploads_dir: str = None, working_dir=None, **factors
+    ):
+        for name, value in factors.items():
+            if name not in self.FACTORS:
+                raise ValueError(f"Unknown scale factor '{name}'. Available: {', '.join(self.FACTORS)}")
+            setattr(self, name.upper(), type(getattr(self, name.upper()))(value))
+
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        self.uploads_dir = uploads_dir
+        self.examples = example_files(working_dir)
+        self.linked_files = 0
+
+        self.users = max(scale // self.DATASETS_PER_USER, 1)
+        self.author_pool = [
+            (
+                f"{self.rng.choice(AUTHOR_NAMES)} {self.rng.choice(AUTHOR_SURNAMES)} {i}",
+                f"University {i % 50}",
+                f"0000-0000-{i // 10000:04d}-{i % 10000:04d}",
+            )
+            for i in range(max(scale // self.DATASETS_PER_AUTHOR, 1))
+        ]
+
+    def generate(self) -> dict:
+        summary = {"scale": self.scale, "heavy_user_id": 1, "words": WORDS, "tags": TAGS}
+        summary.update(self.generate_users())
+        summary.update(self.generate_datasets())
+        summary.update(self.generate_records())
+        if self.uploads_dir:
+            summary["linked_files"] = self.linked_files
+        return summary
+
+    def generate_users(self) -> dict:
+        # Hashing is deliberately slow, so every synthetic user shares the same password hash
+        password = generate_password_hash("benchmark1234")
+        created_at = self.now - timedelta(days=self.RECORDS_DAYS)
+
+        self.insert(
+            User,
+            (
+                {
+                    "id": user_id,
+                    "email": f"user{user_id}@benchmark.example",
+                    "password": password,
+                    "created_at": created_at,
+                    "role": "standard",
+                    "two_factor_enabled": False,
+                }
+                for user_id in range(1, self.users + 1)
+            ),
+        )
+        self.insert(
+            UserProfile,
+            (
+                {"id": user_id, "user_id": user_id, "name": "User", "surname": str(user_id)}
+                for user_id in range(1, self.users + 1)
+            ),
+        )
+        return {"users": self.users}
+
+    def generate_datasets(self) -> dict:
+        ds_meta_data, authors, datasets, fm_meta_data, feature_models, files = [], [], [], [], [], []
+        counts = {"authors": 0, "feature_models": 0, "files": 0}
+
+        def flush(force=False):
+            if force or len(ds_meta_data) >= self.BATCH_SIZE:
+                # Insertion order follows the foreign keys between the tables
+                for model, rows in (
+                    (DSMetaData, ds_meta_data),
+                    (Author, authors),
+                    (DataSet, datasets),
+                    (FMMetaData, fm_meta_data),
+                    (FeatureModel, feature_models),
+                    (Hubfile, files),
+                ):
+                    self.insert(model, rows)
+                    rows.clear()
+
+        for dataset_id in range(1, self.scale + 1):
+            title = self.sentence(3)
+            synchronized = self.rng.random() < self.SYNCHRONIZED_RATIO
+            ds_meta_data.append(
+                {
+                    "id": dataset_id,
+                    "deposition_id": dataset_id if synchronized else None,
+                    "title": title,
+                    "description": self.sentence(20),
+                    "publication_type": self.rng.choice(PUBLICATION_TYPES),
+                    "publication_doi": f"10.1234/publication.{dataset_id}",
+                    # Not the DOIs of the module seeders, which may run on top of the synthetic catalogue
+                    "dataset_doi": f"10.1234/synthetic.{dataset_id}" if synchronized else None,
+                    "tags": ",".join(self.rng.sample(TAGS, 2)),
+                }
+            )
+
+            for name, affiliation, orcid in self.rng.sample(
+                self.author_pool, min(self.rng.randint(1, self.MAX_AUTHORS_PER_DATASET), len(self.author_pool))
+            ):
+                counts["authors"] += 1
+                authors.append(
+                    {
+                        "id": counts["authors"],
+                        "name": name,
+                        "affiliation": affiliation,
+                        "orcid": orcid,
+                        "ds_meta_data_id": dataset_id,
+                    }
+                )
+
+            # The first user is a heavy uploader, owning one in ten datasets
+            user_id = 1 if dataset_id % 10 == 0 else self.rng.randint(1, self.users)
+            datasets.append(
+                {
+                    "id": dataset_id,
+                    "user_id": user_id,
+                    "ds_meta_data_id": dataset_id,
+                    "created_at": self.now - timedelta(minutes=self.scale - dataset_id),
+                }
+            )
+
+            for _ in range(self.rng.randint(1, self.MAX_FEATURE_MODELS_PER_DATASET)):
+                counts["feature_models"] += 1
+                counts["files"] += 1
+                fm_id = counts["feature_models"]
+                example = self.examples[fm_id % len(self.examples)] if self.examples else None
+                filename = f"model{fm_id}{example[1] if example else '.uvl'}"
+                fm_meta_data.append(
+                    {
+                        "id": fm_id,
+                        "uvl_filename": filename,
+                        "title": self.sentence(2),
+                        "description": self.sentence(10),
+                        "publication_type": self.rng.choice(PUBLICATION_TYPES),
+                        "publication_doi": None,
+                        "tags": ",".join(self.rng.sample(TAGS, 2)),
+                        "uvl_version": "1.0",
+                    }
+                )
+                feature_models.append({"id": fm_id, "data_set_id": dataset_id, "fm_meta_data_id": fm_id})
+                files.append(
+                    {
+                        "id": fm_id,
+                        "name": filename,
+                        "checksum": example[2] if example else f"{fm_id:032x}",
+                        "size": example[3] if example else self.rng.randint(200, 20000),
+                        "feature_model_id": fm_id,
+                    }
+                )
+                if self.uploads_dir and example:
+                    self.link_file(example[0], user_id, dataset_id, filename)
+
+            flush()
+        flush(force=True)
+
+        return {"datasets": self.scale, **counts}
+
+    def generate_records(self) -> dict:
+        downloads = self.scale * self.DOWNLOADS_PER_DATASET
+        views = self.scale * self.VIEWS_PER_DATASET
+
+        self.insert(
+            DSDownloadRecord,
+            (
+                {
+                    "id": record_id,
+                    "user_id": None,
+                    "dataset_id": self.popular_dataset_id(),
+                    "download_date": self.record_date(),
+                    "download_cookie": str(uuid.UUID(int=self.rng.getrandbits(128))),
+                }
+                for record_id in range(1, downloads + 1)
+            ),
+        )
+        self.insert(
+            DSViewRecord,
+            (
+                {
+                    "id": record_id,
+                    "user_id": None,
+                    "dataset_id": self.popular_dataset_id(),
+                    "view_date": self.record_date(),
+                    "view_cookie": str(uuid.UUID(int=self.rng.getrandbits(128))),
+                }
+                for record_id in range(1, views + 1)
+            ),
+        )
+        return {"downloads": downloads, "views": views}
+
+    def insert(self, model, rows):
+        # Each batch is sent as a single executemany (multi-row INSERT ... VALUES) and committed on its own,
+        # so millions of records never pile up in one transaction
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.BATCH_SIZE:
+                db.session.execute(model.__table__.insert(), batch)
+                db.session.commit()
+                batch = []
+        if batch:
+            db.session.execute(model.__table__.insert(), batch)
+        db.session.commit()
+
+    def link_file(self, example_path, user_id, dataset_id, filename):
+        folder = os.path.join(self.uploads_dir, f"user_{user_id}", f"dataset_{dataset_id}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            os.remove(path)
+        try:
+            os.link(example_path, path)
+        except OSError:
+            # Hard links need both paths on the same file system
+            shutil.copyfile(example_path, path)
+        self.linked_files += 1
+
+    def sentence(self, words: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(words))
+
+    def popular_dataset_id(self) -> int:
+        # Cubing a uniform sample skews it towards 0, so low ids concentrate most of the activity
+        return int(self.scale * self.rng.random() ** 3) + 1
+
+    def record_date(self) -> datetime:
+        return self.now - timedelta(seconds=self.rng.randint(0, self.RECORDS_DAYS * 24 * 3600))
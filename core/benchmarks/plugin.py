@@ -0,0 +1,169 @@
+"""
+Pytest plugin behind `rosemary benchmark`. It provides the `benchmark_data` fixture, which fills the test
+database with a synthetic catalogue, and the `benchmark` fixture, which times a callable over several
+rounds and compares the median with the stored baseline for the same scale.
+
+Baselines depend on the machine and the database, so they are not shipped: record them on the machine that
+runs the benchmarks with `rosemary benchmark --save` (written to core/benchmarks/baselines.json, or to
+--benchmark-baselines). Until then benchmarks are only timed, and the summary says so.
+
+Benchmarks live next to the unit tests of each module, in `tests/benchmark_*.py` files, so the regular
+test run does not collect them.
+"""
+
+import json
+import os
+import statistics
+import time
+
+import pytest
+
+from app import db
+from core.benchmarks.data_generator import SyntheticDataGenerator
+
+results_key = pytest.StashKey[dict]()
+
+
+def default_baselines_path():
+    return os.path.join(os.getenv("WORKING_DIR", ""), "core", "benchmarks", "baselines.json")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark")
+    group.addoption(
+        "--benchmark-scale",
+        type=int,
+        default=int(os.getenv("BENCHMARK_SCALE", "10000")),
+        help="Number of synthetic datasets to generate.",
+    )
+    group.addoption("--benchmark-rounds", type=int, default=5, help="Timed rounds per benchmark.")
+    group.addoption(
+        "--benchmark-threshold",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown over the baseline median before a benchmark fails (0.25 = 25%%).",
+    )
+    group.addoption("--benchmark-baselines", default=None, help="Path of the baselines JSON file.")
+    group.addoption("--benchmark-save", action="store_true", help="Store the results as the new baselines.")
+
+
+def pytest_configure(config):
+    config.stash[results_key] = {}
+
+
+def load_baselines(config) -> dict:
+    path = config.getoption("--benchmark-baselines") or default_baselines_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class Benchmark:
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.scale = config.getoption("--benchmark-scale")
+        self.rounds = config.getoption("--benchmark-rounds")
+        self.threshold = config.getoption("--benchmark-threshold")
+
+    def __call__(self, func, *args, setup=None, **kwargs):
+        """
+        Runs `func` once to warm up and then `rounds` more times, timing each run. Before every run
+        `setup` is called (by default the session is expired, so each round loads its data like a fresh
+        request would). Returns the result of the last run.
+        """
+        setup = setup or db.session.expire_all
+
+        setup()
+        result = func(*args, **kwargs)
+
+        timings = []
+        for _ in range(self.rounds):
+            setup()
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+
+        stats = {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "max": max(timings),
+            "rounds": self.rounds,
+        }
+        baseline = load_baselines(self.config).get(str(self.scale), {}).get(self.name)
+        stats["baseline"] = baseline["median"] if baseline else None
+        self.config.stash[results_key][self.name] = stats
+
+        if baseline and stats["median"] > baseline["median"] * (1 + self.threshold):
+            pytest.fail(
+                f"Benchmark {self.name} regressed: median {stats['median'] * 1000:.1f} ms, "
+                f"baseline {baseline['median'] * 1000:.1f} ms (threshold {self.threshold:.0%})"
+            )
+
+        return result
+
+
+@pytest.fixture
+def benchmark(request):
+    module = request.module.__name__.split(".")
+    # app.modules.<module>.tests.benchmark_<file>
+    name = f"{module[2]}.{request.node.name}" if len(module) > 2 else request.node.name
+    return Benchmark(name, request.config)
+
+
+@pytest.fixture(scope="session")
+def benchmark_data(test_app, request):
+    scale = request.config.getoption("--benchmark-scale")
+
+    db.drop_all()
+    db.create_all()
+
+    start = time.perf_counter()
+    summary = SyntheticDataGenerator(scale).generate()
+    print(f"\nBENCHMARK: generated {scale} datasets in {time.perf_counter() - start:.1f}s: {summary}")
+
+    yield summary
+
+    db.session.remove()
+    db.drop_all()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    results = config.stash.get(results_key, {})
+    if not results:
+        return
+
+    terminalreporter.section(f"benchmarks (scale {config.getoption('--benchmark-scale')})")
+    if not any(stats["baseline"] for stats in results.values()) and not config.getoption("--benchmark-save"):
+        terminalreporter.write_line(
+            "No baselines recorded for this scale, so regressions are not checked. "
+            "Record them with `rosemary benchmark --save`."
+        )
+    terminalreporter.write_line(
+        f"{'name':<50} {'min (ms)':>10} {'median (ms)':>12} {'max (ms)':>10} {'baseline (ms)':>14} {'change':>8}"
+    )
+    for name, stats in sorted(results.items()):
+        baseline = stats["baseline"]
+        baseline_ms = f"{baseline * 1000:.1f}" if baseline else "-"
+        change = f"{(stats['median'] / baseline - 1):+.0%}" if baseline else "-"
+        terminalreporter.write_line(
+            f"{name:<50} {stats['min'] * 1000:>10.1f} {stats['median'] * 1000:>12.1f} {stats['max'] * 1000:>10.1f} "
+            f"{baseline_ms:>14} {change:>8}"
+        )
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    results = config.stash.get(results_key, {})
+    if not results or not config.getoption("--benchmark-save"):
+        return
+
+    path = config.getoption("--benchmark-baselines") or default_baselines_path()
+    baselines = load_baselines(config)
+    scale_baselines = baselines.setdefault(str(config.getoption("--benchmark-scale")), {})
+    for name, stats in results.items():
+        scale_baselines[name] = {"median": stats["median"], "min": stats["min"], "rounds": stats["rounds"]}
+
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
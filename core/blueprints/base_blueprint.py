@@ -1,6 +1,8 @@
 import os
 
-from flask import Blueprint, Response
+from flask import Blueprint, current_app
+
+from core.managers.asset_manager import send_asset
 
 
 class BaseBlueprint(Blueprint):
@@ -28,21 +30,21 @@ class BaseBlueprint(Blueprint):
             root_path=root_path,
         )
         self.module_path = os.path.join(os.getenv("WORKING_DIR", ""), "app", "modules", name)
+        self.script_path = os.path.join(self.module_path, "assets", "scripts.js")
         self.add_script_route()
 
     def add_script_route(self):
-        script_path = os.path.join(self.module_path, "assets", "scripts.js")
-        if os.path.exists(script_path):
-            self.add_url_rule(f"/{self.name}/scripts.js", "scripts", self.send_script)
+        if os.path.exists(self.script_path):
+            # The content hash in the URL lets browsers keep the script until it changes
+            self.add_url_rule(f"/{self.name}/scripts.<digest>.js", "scripts", self.send_script)
+            self.url_defaults(self.add_script_digest)
         else:
-            print(f"(BaseBlueprint) -> {script_path} does not exist.")
+            print(f"(BaseBlueprint) -> {self.script_path} does not exist.")
 
-    def send_script(self):
-        script_path = os.path.join(self.module_path, "assets", "scripts.js")
+    def add_script_digest(self, endpoint, values):
+        if endpoint == f"{self.name}.scripts" and "digest" not in values:
+            asset = current_app.extensions["assets"].get(self.name)
+            values["digest"] = asset.digest if asset is not None else "missing"
 
-        try:
-            with open(script_path, "r") as file:
-                script_content = file.read()
-            return Response(script_content, mimetype="application/javascript")
-        except FileNotFoundError:
-            return Response(f"File not found: {script_path}", status=404)
+    def send_script(self, digest):
+        return send_asset(self.name, digest)
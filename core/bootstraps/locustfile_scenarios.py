@@ -0,0 +1,10 @@
+"""
+Maintained load test suite: the weighted scenarios of core.locust.scenarios, with the SLOs of core.locust.slo
+failing the run when they are breached.
+
+    rosemary locust --headless
+    locust -f core/bootstraps/locustfile_scenarios.py --headless -u 50 -r 5 -t 5m --host http://localhost:5000
+"""
+
+from core.locust import slo  # noqa: F401  (registers the SLO arguments and checks)
+from core.locust.scenarios import AnalystUser, AnonymousVisitor, UploaderUser  # noqa: F401
@@ -2,6 +2,9 @@ from functools import wraps
 
 from flask import abort
 
+from core.managers.cache_manager import serve_page
+from core.managers.database_manager import replica_reads
+
 
 def pass_or_abort(condition):
 
@@ -16,3 +19,28 @@ def pass_or_abort(condition):
         return decorated_function
 
     return decorator
+
+
+def cached_page(f):
+    """Serves the view from the page cache when the request comes from an anonymous user."""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        return serve_page(lambda: f(*args, **kwargs))
+
+    return decorated_function
+
+
+def read_only(f):
+    """
+    Runs the queries of a repository method or view on the read replica, when there is one and the user may
+    use it. Views marked read-only may read from the replica even when they handle a POST.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with replica_reads():
+            return f(*args, **kwargs)
+
+    decorated_function.read_only = True
+    return decorated_function
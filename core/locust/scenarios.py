@@ -0,0 +1,173 @@
+"""
+Load test scenarios covering the main paths of the application. Every user class has a weight, so a run
+spawns mostly anonymous visitors, some users analysing feature models and a few uploaders, and weighted
+tasks, so each of them mixes its requests like real traffic.
+
+The users sample the catalogue through the datasets API when they start, so the scenarios work on any
+database; `rosemary db:seed --reset --scale N` fills one with a production-sized catalogue.
+"""
+
+import os
+import random
+import re
+from urllib.parse import urlparse
+
+from locust import HttpUser, between, task
+
+from core.locust.common import get_csrf_token
+
+# Datasets sampled from the API by each user when it starts
+CATALOGUE_SAMPLE_SIZE = int(os.getenv("LOCUST_CATALOGUE_SAMPLE", "200"))
+
+LOGIN_EMAIL = os.getenv("LOCUST_USER_EMAIL", "user1@example.com")
+LOGIN_PASSWORD = os.getenv("LOCUST_USER_PASSWORD", "1234")
+
+SEARCH_SORTINGS = ("newest", "oldest")
+FLAMAPY_FORMATS = ("glencoe", "splot", "cnf")
+
+CSV_EXAMPLE = os.path.join(
+    os.getenv("WORKING_DIR", ""), "app", "modules", "dataset_csv", "csv_example", "topselling_steam_games.csv"
+)
+
+
+class Catalogue:
+    """DOIs, files and title words of a sample of the datasets, used to build realistic requests."""
+
+    def __init__(self, items):
+        self.dois = []
+        self.dataset_ids = []
+        self.uvl_file_ids = []
+        self.file_ids = []
+        self.words = []
+        for item in items:
+            self.dataset_ids.append(item["dataset_id"])
+            doi = urlparse(item.get("doi") or "").path
+            # Datasets not synchronized with Zenodo have no DOI page
+            if doi.startswith("/doi/") and not doi.endswith("/None"):
+                self.dois.append(doi[len("/doi/") :].strip("/"))
+            for file in item.get("files") or []:
+                self.file_ids.append(file["file_id"])
+                if file["file_name"].lower().endswith(".uvl"):
+                    self.uvl_file_ids.append(file["file_id"])
+            self.words.extend(word for word in re.findall(r"[a-z]{4,}", (item.get("name") or "").lower()))
+
+    @classmethod
+    def load(cls, client):
+        # The newest datasets are the ones visitors mostly open
+        response = client.get(
+            f"/api/v1/datasets/?fields=dataset_id,name,doi,files&limit={CATALOGUE_SAMPLE_SIZE}",
+            name="/api/v1/datasets/ (catalogue sample)",
+        )
+        try:
+            return cls(response.json()["items"])
+        except (ValueError, KeyError):
+            return cls([])
+
+    def query(self):
+        """One or two words taken from dataset titles, as users type them in the search box."""
+        if not self.words:
+            return ""
+        return " ".join(random.sample(self.words, min(len(self.words), random.choice((1, 1, 2)))))
+
+
+class CatalogueUser(HttpUser):
+    abstract = True
+    wait_time = between(1, 5)
+
+    def on_start(self):
+        self.catalogue = Catalogue.load(self.client)
+
+
+class AnonymousVisitor(CatalogueUser):
+    """Browses the homepage, searches, opens datasets and previews and downloads their files."""
+
+    weight = 6
+
+    @task(5)
+    def homepage(self):
+        self.client.get("/", name="/ (homepage)")
+
+    @task(1)
+    def explore_page(self):
+        self.client.get("/explore", name="/explore (page)")
+
+    @task(4)
+    def search(self):
+        criteria = {
+            "query": self.catalogue.query(),
+            "sorting": random.choice(SEARCH_SORTINGS),
+            "publication_type": "any",
+            "tags": [],
+        }
+        self.client.post("/explore", json=criteria, name="/explore (search)")
+
+    @task(4)
+    def dataset_page(self):
+        if self.catalogue.dois:
+            self.client.get(f"/doi/{random.choice(self.catalogue.dois)}/", name="/doi/<doi>/")
+
+    @task(2)
+    def file_preview(self):
+        if self.catalogue.file_ids:
+            self.client.get(f"/file/view/{random.choice(self.catalogue.file_ids)}", name="/file/view/<id>")
+
+    @task(1)
+    def dataset_download(self):
+        if self.catalogue.dataset_ids:
+            self.client.get(
+                f"/dataset/download/{random.choice(self.catalogue.dataset_ids)}", name="/dataset/download/<id>"
+            )
+
+
+class AnalystUser(CatalogueUser):
+    """Converts feature models to other formats and checks them with flamapy."""
+
+    weight = 2
+
+    @task(3)
+    def convert(self):
+        if self.catalogue.uvl_file_ids:
+            file_format = random.choice(FLAMAPY_FORMATS)
+            self.client.get(
+                f"/flamapy/to_{file_format}/{random.choice(self.catalogue.uvl_file_ids)}",
+                name="/flamapy/to_<format>/<id>",
+            )
+
+    @task(1)
+    def check(self):
+        if self.catalogue.uvl_file_ids:
+            self.client.get(
+                f"/flamapy/check_uvl/{random.choice(self.catalogue.uvl_file_ids)}", name="/flamapy/check_uvl/<id>"
+            )
+
+
+class UploaderUser(CatalogueUser):
+    """Logs in and uploads CSV files, removing them from its temporary folder afterwards."""
+
+    weight = 1
+
+    def on_start(self):
+        super().on_start()
+        response = self.client.get("/login")
+        data = {"email": LOGIN_EMAIL, "password": LOGIN_PASSWORD, "csrf_token": get_csrf_token(response)}
+        self.client.post("/login", data=data, name="/login")
+
+    @task(1)
+    def upload_page(self):
+        self.client.get("/csvdataset/upload", name="/csvdataset/upload")
+
+    @task(3)
+    def upload_csv(self):
+        with open(CSV_EXAMPLE, "rb") as file:
+            with self.client.post(
+                "/csvdataset/file/upload",
+                files={"file": (os.path.basename(CSV_EXAMPLE), file, "text/csv")},
+                name="/csvdataset/file/upload",
+                catch_response=True,
+            ) as response:
+                if response.status_code != 200:
+                    response.failure(f"Upload failed with status {response.status_code}")
+                    return
+                filename = response.json().get("filename")
+
+        self.client.post("/csvdataset/file/delete", json={"file": filename}, name="/csvdataset/file/delete")
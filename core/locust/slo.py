@@ -0,0 +1,95 @@
+"""
+Service level objectives of the load tests. When a run ends, the p50/p95/p99 response times (in ms) of each
+request name and of all requests together are compared with their thresholds, and the run fails (exit code 1)
+if any of them, or the failure ratio, is over its limit.
+
+Thresholds can be replaced with `--slo-file thresholds.json`, holding the same structure as DEFAULT_SLOS, or
+disabled with `--no-slo`.
+"""
+
+import json
+
+from locust import events
+from locust.stats import StatsEntry
+
+AGGREGATE = "Aggregated"
+
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+DEFAULT_SLOS = {
+    AGGREGATE: {"p50": 300, "p95": 1500, "p99": 3000},
+    "/ (homepage)": {"p50": 150, "p95": 500, "p99": 1000},
+    "/explore (search)": {"p50": 300, "p95": 1000, "p99": 2000},
+    "/doi/<doi>/": {"p50": 200, "p95": 800, "p99": 1500},
+    "/file/view/<id>": {"p50": 150, "p95": 500, "p99": 1000},
+    "/dataset/download/<id>": {"p50": 500, "p95": 2000, "p99": 4000},
+    "/flamapy/to_<format>/<id>": {"p50": 1000, "p95": 4000, "p99": 8000},
+    "/csvdataset/file/upload": {"p50": 500, "p95": 2000, "p99": 4000},
+}
+
+DEFAULT_MAX_FAIL_RATIO = 0.01
+
+
+def check_slos(entries, slos, max_fail_ratio=DEFAULT_MAX_FAIL_RATIO):
+    """
+    Breached objectives of `entries` (request name to locust StatsEntry), as (name, objective, value, limit)
+    tuples. Requests that were never made are skipped.
+    """
+    breaches = []
+    for name, thresholds in slos.items():
+        entry = entries.get(name)
+        if entry is None or not entry.num_requests:
+            continue
+        for objective, limit in thresholds.items():
+            value = entry.get_response_time_percentile(PERCENTILES[objective])
+            if value > limit:
+                breaches.append((name, objective, value, limit))
+
+    total = entries.get(AGGREGATE)
+    if total is not None and total.num_requests and total.fail_ratio > max_fail_ratio:
+        breaches.append((AGGREGATE, "fail ratio", round(total.fail_ratio, 4), max_fail_ratio))
+    return breaches
+
+
+def stats_by_name(stats):
+    """StatsEntry of every request name (all methods merged) and of all requests together."""
+    entries = {}
+    for (name, _), entry in stats.entries.items():
+        if name not in entries:
+            entries[name] = StatsEntry(stats, name, None)
+        entries[name].extend(entry)
+    entries[AGGREGATE] = stats.total
+    return entries
+
+
+@events.init_command_line_parser.add_listener
+def add_slo_arguments(parser):
+    parser.add_argument("--slo-file", type=str, default="", help="JSON file with the p50/p95/p99 thresholds (ms)")
+    parser.add_argument(
+        "--slo-max-fail-ratio",
+        type=float,
+        default=DEFAULT_MAX_FAIL_RATIO,
+        help="Highest ratio of failed requests",
+    )
+    parser.add_argument("--no-slo", action="store_true", default=False, help="Do not fail the run on SLO breaches")
+
+
+@events.quitting.add_listener
+def enforce_slos(environment, **kwargs):
+    options = environment.parsed_options
+    if options is None or getattr(options, "no_slo", False):
+        return
+
+    slos = DEFAULT_SLOS
+    if options.slo_file:
+        with open(options.slo_file) as file:
+            slos = json.load(file)
+
+    breaches = check_slos(stats_by_name(environment.stats), slos, options.slo_max_fail_ratio)
+    for name, objective, value, limit in breaches:
+        print(f"SLO breached: {name} {objective} = {value} (limit {limit})")
+
+    if breaches:
+        environment.process_exit_code = 1
+    else:
+        print("All SLOs met.")
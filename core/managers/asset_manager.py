@@ -0,0 +1,299 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import brotli
+import zstandard
+from flask import current_app, request
+
+logger = logging.getLogger(__name__)
+
+# Content-Encoding of the precompressed variants, in order of preference when the client accepts several
+ENCODINGS = ("br", "zstd", "gzip")
+
+# Suffix of each variant in the generated static directory (the one nginx's gzip_static looks for, too)
+ENCODING_SUFFIXES = {"br": ".br", "zstd": ".zst", "gzip": ".gz"}
+
+MANIFEST_NAME = "manifest.json"
+
+IDENTIFIER_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$\\")
+
+# After these characters, or keywords, a slash starts a regular expression instead of a division
+REGEX_PRECEDERS = frozenset("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORDS = frozenset("return typeof case do else in of new delete void throw instanceof yield await".split())
+
+
+def _is_identifier_char(char):
+    return char in IDENTIFIER_CHARS or char > "\x7f"
+
+
+def _skip_quoted(source, start, quote):
+    """Index after the string starting at `start`."""
+    i = start + 1
+    while i < len(source):
+        if source[i] == "\\":
+            i += 2
+            continue
+        if source[i] == quote or (source[i] == "\n" and quote != "`"):
+            return i + 1
+        if quote == "`" and source.startswith("${", i):
+            i = _skip_expression(source, i + 2)
+            continue
+        i += 1
+    return i
+
+
+def _skip_regex(source, start):
+    """Index after the regular expression literal, and its flags, starting at `start`."""
+    i = start + 1
+    in_class = False
+    while i < len(source) and source[i] != "\n":
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            break
+        i += 1
+    while i < len(source) and _is_identifier_char(source[i]):
+        i += 1
+    return i
+
+
+def _skip_expression(source, start):
+    """Index after the brace that closes the template literal expression starting at `start`."""
+    depth = 0
+    i = start
+    while i < len(source):
+        char = source[i]
+        if char in "'\"`":
+            i = _skip_quoted(source, i, char)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            if depth == 0:
+                return i + 1
+            depth -= 1
+        i += 1
+    return i
+
+
+def _starts_regex(output):
+    code = "".join(output[-16:])
+    if not code or code[-1] in REGEX_PRECEDERS:
+        return True
+    word_start = len(code)
+    while word_start > 0 and _is_identifier_char(code[word_start - 1]):
+        word_start -= 1
+    return code[word_start:] in REGEX_KEYWORDS and not code[:word_start].endswith(".")
+
+
+def minify_js(source):
+    """
+    Removes the comments and the whitespace of a script that is not needed to parse it. Line breaks are kept,
+    so statements that rely on automatic semicolon insertion still work, and strings, template literals and
+    regular expressions are copied untouched.
+    """
+    output = []
+    pending = ""  # whitespace seen since the last token: "", " " or "\n"
+    i = 0
+
+    def emit(token):
+        nonlocal pending
+        if output and pending:
+            previous = output[-1][-1]
+            if pending == "\n":
+                output.append("\n")
+            elif (_is_identifier_char(previous) and _is_identifier_char(token[0])) or (
+                previous in "+-/" and token[0] == previous
+            ):
+                output.append(" ")
+        pending = ""
+        output.append(token)
+
+    while i < len(source):
+        char = source[i]
+        if char in " \t\r\n\f\v\ufeff":
+            if char == "\n":
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i += 1
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = len(source) if end == -1 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = len(source) if end == -1 else end + 2
+            if "\n" in source[i:end]:
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i = end
+        elif char in "'\"`":
+            end = _skip_quoted(source, i, char)
+            emit(source[i:end])
+            i = end
+        elif char == "/" and _starts_regex(output):
+            end = _skip_regex(source, i)
+            emit(source[i:end])
+            i = end
+        else:
+            emit(char)
+            i += 1
+
+    return "".join(output) + "\n" if output else ""
+
+
+class ScriptAsset:
+    """A module script, minified when enabled, with its content hash and precompressed variants."""
+
+    def __init__(self, name, path, minify=True):
+        self.name = name
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+
+        with open(path, "r", encoding="utf-8") as file:
+            source = file.read()
+        self.body = (minify_js(source) if minify else source).encode("utf-8")
+        self.digest = hashlib.sha256(self.body).hexdigest()[:12]
+        self.variants = {
+            "br": brotli.compress(self.body, mode=brotli.MODE_TEXT),
+            "zstd": zstandard.ZstdCompressor(level=19).compress(self.body),
+            "gzip": gzip.compress(self.body, compresslevel=9, mtime=0),
+        }
+
+    @property
+    def filename(self):
+        return f"scripts.{self.digest}.js"
+
+    def is_stale(self):
+        try:
+            return os.path.getmtime(self.path) != self.mtime
+        except OSError:
+            return False
+
+    def negotiate(self, accept_encodings):
+        """The Content-Encoding and body to send to a client accepting `accept_encodings`."""
+        for encoding in ENCODINGS:
+            if accept_encodings[encoding] and len(self.variants[encoding]) < len(self.body):
+                return encoding, self.variants[encoding]
+        return None, self.body
+
+
+class AssetPipeline:
+    """
+    Collects the `assets/scripts.js` of every module when the application starts. Each script is served from
+    a URL holding its content hash, so browsers and proxies keep it until it changes.
+
+    With ASSETS_AUTO_RELOAD (development) a script is rebuilt when its file changes. With ASSETS_OUTPUT_DIR the
+    scripts and their compressed variants are also written there for nginx to serve them.
+    """
+
+    def __init__(self, minify=True, auto_reload=False, max_age=31536000):
+        self._lock = threading.Lock()
+        self.minify = minify
+        self.auto_reload = auto_reload
+        self.max_age = max_age
+        self.assets = {}
+
+    def add(self, name, path):
+        self.assets[name] = ScriptAsset(name, path, self.minify)
+        return self.assets[name]
+
+    def get(self, name):
+        asset = self.assets.get(name)
+        if asset is not None and self.auto_reload and asset.is_stale():
+            with self._lock:
+                asset = self.add(name, asset.path)
+        return asset
+
+    def manifest(self):
+        """URL path of every script, relative to the generated static directory."""
+        return {name: f"{name}/{asset.filename}" for name, asset in sorted(self.assets.items())}
+
+    def write(self, directory):
+        """Writes every script and its compressed variants, with a manifest, to the generated static directory."""
+        for name, asset in self.assets.items():
+            module_directory = os.path.join(directory, name)
+            os.makedirs(module_directory, exist_ok=True)
+
+            path = os.path.join(module_directory, asset.filename)
+            files = {path: asset.body}
+            files.update({path + ENCODING_SUFFIXES[encoding]: variant for encoding, variant in asset.variants.items()})
+            for file_path, content in files.items():
+                _write_atomically(file_path, content)
+
+            # Scripts of previous builds are no longer linked from any page
+            current = set(os.path.basename(file_path) for file_path in files)
+            for filename in os.listdir(module_directory):
+                if filename.startswith("scripts.") and filename not in current:
+                    os.remove(os.path.join(module_directory, filename))
+
+        _write_atomically(os.path.join(directory, MANIFEST_NAME), json.dumps(self.manifest(), indent=2).encode("utf-8"))
+
+
+def _write_atomically(path, content):
+    # Every worker writes the same files at startup: readers never see a partially written one
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+def send_asset(name, digest):
+    """Response with the script of the module, compressed for the client and cached for a year."""
+    pipeline = current_app.extensions["assets"]
+    asset = pipeline.get(name)
+    if asset is None:
+        return current_app.response_class(f"No script for module {name}", status=404, mimetype="text/plain")
+
+    encoding, body = asset.negotiate(request.accept_encodings)
+    response = current_app.response_class(body, mimetype="application/javascript")
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.content_encoding = encoding
+    response.set_etag(f"{asset.digest}-{encoding or 'identity'}")
+
+    if digest == asset.digest:
+        response.cache_control.public = True
+        response.cache_control.max_age = pipeline.max_age
+        response.cache_control.immutable = True
+    else:
+        # A page rendered before the script changed: serve the current one, but do not let it be cached
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+class AssetManager:
+    def __init__(self, app):
+        self.app = app
+
+    def setup_assets(self):
+        pipeline = AssetPipeline(
+            minify=self.app.config.get("ASSETS_MINIFY", True),
+            auto_reload=self.app.config.get("ASSETS_AUTO_RELOAD", False),
+            max_age=self.app.config.get("ASSETS_MAX_AGE", 31536000),
+        )
+        for blueprint in self.app.blueprints.values():
+            script_path = getattr(blueprint, "script_path", None)
+            if script_path and os.path.exists(script_path):
+                pipeline.add(blueprint.name, script_path)
+        self.app.extensions["assets"] = pipeline
+
+        output_dir = self.app.config.get("ASSETS_OUTPUT_DIR")
+        if output_dir:
+            try:
+                pipeline.write(output_dir)
+            except OSError as e:
+                logger.warning(f"Could not write the scripts to {output_dir}: {e}")
+        return pipeline
@@ -0,0 +1,536 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from cachelib import FileSystemCache, NullCache, SimpleCache
+from flask import current_app, has_app_context, make_response, request, session
+from flask_login import current_user
+from markupsafe import Markup
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from core.configuration.configuration import get_app_version
+from core.managers.database_manager import primary_reads
+
+logger = logging.getLogger(__name__)
+
+# Tables whose changes affect the public pages: datasets and their metadata, files, comments and profiles.
+# Download and view records are left out on purpose, since they are written on every visit.
+DEFAULT_WATCHED_TABLES = (
+    "data_set",
+    "ds_meta_data",
+    "author",
+    "feature_model",
+    "fm_meta_data",
+    "file",
+    "dataset_comment",
+    "user_profile",
+    "doi_mapping",
+)
+
+GENERATION_KEY = "page_cache:generation"
+
+# Paths from the rows shown in the dataset page fragments to the id of their dataset
+FRAGMENT_DATASET_PATHS = {
+    "data_set": ("id",),
+    "ds_meta_data": ("data_set.id",),
+    "author": ("ds_meta_data.data_set.id", "fm_metadata.feature_model.data_set_id"),
+    "feature_model": ("data_set_id",),
+    "fm_meta_data": ("feature_model.data_set_id",),
+    "file": ("feature_model.data_set_id",),
+    "dataset_comment": ("dataset_id",),
+}
+
+# Tables shown in the fragments of any dataset (e.g. the names of comment authors), whose changes
+# invalidate every fragment at once
+FRAGMENT_SHARED_TABLES = ("user_profile",)
+
+FRAGMENT_GENERATION_KEY = "fragment_cache:generation"
+
+# Tables cached for logged in users (account, role, 2FA settings and profile), with the attribute holding
+# the id of their user
+IDENTITY_USER_PATHS = {"user": "id", "user_profile": "user_id"}
+
+# Columns holding the DOIs resolved by the DOI cache
+DOI_COLUMNS = {"ds_meta_data": ("dataset_doi",), "doi_mapping": ("dataset_doi_old", "dataset_doi_new")}
+
+CONTROLS_PATTERN = re.compile(r"<!--controls:(\d+)-->(.*?)<!--/controls-->", re.DOTALL)
+
+
+def create_cache_backend(config):
+    cache_type = config.get("CACHE_TYPE", "simple")
+    timeout = config.get("CACHE_DEFAULT_TIMEOUT", 300)
+
+    if cache_type == "filesystem":
+        return FileSystemCache(config.get("CACHE_DIR", "cache"), default_timeout=timeout)
+    if cache_type == "redis":
+        # redis is only needed when the redis backend is selected
+        import redis
+        from cachelib import RedisCache
+
+        return RedisCache(
+            host=redis.from_url(config.get("CACHE_REDIS_URL")), default_timeout=timeout, key_prefix="uvlhub:"
+        )
+    if cache_type == "null":
+        return NullCache()
+    return SimpleCache(default_timeout=timeout)
+
+
+def compute_template_version(app) -> str:
+    """Hash of the application version and the name, size and mtime of every template."""
+    digest = hashlib.md5(get_app_version().encode())
+    loaders = [app.jinja_loader] + [blueprint.jinja_loader for blueprint in app.blueprints.values()]
+    for loader in loaders:
+        for folder in getattr(loader, "searchpath", []) if loader else []:
+            for root, dirs, files in os.walk(folder):
+                for name in sorted(files):
+                    stat = os.stat(os.path.join(root, name))
+                    digest.update(f"{os.path.join(root, name)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+
+class PageCache:
+    """
+    Caches the HTML of public pages served to anonymous users. Keys include the template version and a
+    generation token that is replaced whenever watched tables change, which invalidates every page at once.
+    """
+
+    def __init__(self, app, backend):
+        self.app = app
+        self.backend = backend
+        self.template_version = app.config.get("TEMPLATE_VERSION") or compute_template_version(app)
+        self.timeout = app.config.get("PAGE_CACHE_TIMEOUT", 300)
+        self.max_age = app.config.get("PAGE_CACHE_MAX_AGE", 60)
+        self.watched_tables = set(app.config.get("PAGE_CACHE_WATCHED_TABLES", DEFAULT_WATCHED_TABLES))
+
+    def generation(self):
+        generation = self.backend.get(GENERATION_KEY)
+        if generation is None:
+            generation = self.invalidate()
+        return generation
+
+    def invalidate(self):
+        # A fresh token instead of a counter, so an evicted generation can never match old keys again
+        generation = time.time_ns()
+        self.backend.set(GENERATION_KEY, generation, timeout=0)
+        return generation
+
+    def key(self):
+        return f"page:{self.template_version}:{self.generation()}:{request.full_path}"
+
+    def cacheable(self):
+        return (
+            self.app.config.get("PAGE_CACHE_ENABLED", True)
+            and request.method in ("GET", "HEAD")
+            and not current_user.is_authenticated
+            and "_flashes" not in session
+        )
+
+    def serve(self, view, cache_control=None):
+        """
+        Returns the cached page for the current request or renders it with `view` and stores it.
+        Cached responses get an ETag and answer conditional requests with 304.
+        """
+        if not self.cacheable():
+            return make_response(view())
+
+        key = self.key()
+        body = self.backend.get(key)
+        if body is not None:
+            response = current_app.response_class(body, mimetype="text/html")
+            response.headers["X-Page-Cache"] = "HIT"
+        else:
+            # Pages are cached for everyone right after the change that invalidated them, so they are read from
+            # the primary: the replica may not have that change yet
+            with primary_reads():
+                response = make_response(view())
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+            self.backend.set(key, response.get_data(), timeout=self.timeout)
+            response.headers["X-Page-Cache"] = "MISS"
+
+        response.headers["Cache-Control"] = cache_control or f"public, max-age={self.max_age}"
+        response.add_etag()
+        return response.make_conditional(request)
+
+
+class FragmentCache:
+    """
+    Caches rendered blocks of the dataset page. Keys include the template version, the dataset id and a
+    per-dataset version counter that is bumped whenever rows shown in the fragments change.
+
+    Cached HTML is shared by every user, so fragments must not depend on `current_user`. Controls only
+    some users may see are wrapped in `owner_controls` and filtered for the current user on every render.
+    """
+
+    def __init__(self, app, backend, template_version):
+        self.app = app
+        self.backend = backend
+        self.template_version = template_version
+        self.timeout = app.config.get("FRAGMENT_CACHE_TIMEOUT", 3600)
+
+    @staticmethod
+    def version_key(dataset_id):
+        return f"fragment:dataset:{dataset_id}:version"
+
+    def version(self, dataset_id):
+        return counter_version(self.backend, self.version_key(dataset_id))
+
+    def bump(self, dataset_id):
+        bump_counter(self.backend, self.version_key(dataset_id))
+
+    def generation(self):
+        generation = self.backend.get(FRAGMENT_GENERATION_KEY)
+        if generation is None:
+            generation = self.invalidate()
+        return generation
+
+    def invalidate(self):
+        generation = time.time_ns()
+        self.backend.set(FRAGMENT_GENERATION_KEY, generation, timeout=0)
+        return generation
+
+    def key(self, name, dataset_id, variant=()):
+        parts = ":".join(str(part) for part in variant)
+        return (
+            f"fragment:{self.template_version}:{self.generation()}:{name}:{dataset_id}:"
+            f"{self.version(dataset_id)}:{parts}"
+        )
+
+    def render(self, name, dataset_id, caller, variant=(), timeout=None):
+        """Returns the cached fragment or renders it with `caller` and stores it."""
+        if not self.app.config.get("FRAGMENT_CACHE_ENABLED", True):
+            return filter_controls(str(caller()))
+
+        key = self.key(name, dataset_id, variant)
+        html = self.backend.get(key)
+        if html is None:
+            # Like pages, fragments are stored for everyone and read from the primary
+            with primary_reads():
+                html = str(caller())
+            self.backend.set(key, html, timeout=timeout or self.timeout)
+        return filter_controls(html)
+
+
+class IdentityCache:
+    """
+    Caches the account and profile of logged in users, so authenticated requests do not query them. Keys
+    include the application version and a per-user version counter that is bumped whenever the user or
+    their profile change.
+
+    Invalidations only reach other processes through a shared backend (redis or filesystem), so the cache
+    is only enabled by default with one of them.
+    """
+
+    def __init__(self, app, backend):
+        self.app = app
+        self.backend = backend
+        self.app_version = get_app_version()
+        self.timeout = app.config.get("IDENTITY_CACHE_TIMEOUT", 600)
+
+    @property
+    def enabled(self):
+        return self.app.config.get("IDENTITY_CACHE_ENABLED", False)
+
+    @staticmethod
+    def version_key(user_id):
+        return f"identity:user:{user_id}:version"
+
+    def version(self, user_id):
+        return counter_version(self.backend, self.version_key(user_id))
+
+    def bump(self, user_id):
+        bump_counter(self.backend, self.version_key(user_id))
+
+    def key(self, user_id):
+        return f"identity:{self.app_version}:{user_id}:{self.version(user_id)}"
+
+    def load(self, user_id, loader, dump, restore):
+        """
+        Returns the user restored from the cache, or loads it with `loader` and stores `dump(user)`. The key
+        is computed before loading, so a change committed meanwhile makes the stored entry unreachable.
+        """
+        if not self.enabled:
+            return loader(user_id)
+
+        key = self.key(user_id)
+        identity = self.backend.get(key)
+        if identity is not None:
+            user = restore(identity)
+            if user is not None:
+                return user
+
+        user = loader(user_id)
+        if user is not None:
+            self.backend.set(key, dump(user), timeout=self.timeout)
+        return user
+
+
+class LocalLRUCache:
+    """
+    Bounded in-process cache, evicting the least recently used entries. Entries expire after `ttl` seconds;
+    missing values (None) are cached too, for `negative_ttl` seconds.
+
+    It lives in each worker, so an invalidation only reaches the process that made the change: the others see
+    it when their entry expires. A value loaded while an invalidation happened is not stored, so a concurrent
+    change can never be overwritten by the value read before it.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300, negative_ttl=30, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            epoch = self._epoch
+
+        value = loader(key)
+
+        with self._lock:
+            if epoch == self._epoch:
+                self._entries[key] = (value, self.clock() + (self.ttl if value is not None else self.negative_ttl))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._epoch += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+
+def counter_version(backend, key):
+    version = backend.get(key)
+    if version is None:
+        # Start from a fresh value, so an evicted counter can never match old keys again
+        version = time.time_ns()
+        backend.set(key, version, timeout=0)
+    return version
+
+
+def bump_counter(backend, key):
+    # A missing counter gets a fresh value on its next read
+    if backend.has(key):
+        backend.inc(key)
+
+
+def filter_controls(html):
+    """Keeps the `owner_controls` blocks the current user may see: their owner's and every admin's."""
+
+    def keep(match):
+        owner_id = int(match.group(1))
+        allowed = current_user.is_authenticated and (current_user.id == owner_id or current_user.is_admin)
+        return match.group(2) if allowed else ""
+
+    return Markup(CONTROLS_PATTERN.sub(keep, html))
+
+
+def cached_fragment(name, dataset_id, *variant, timeout=None, caller=None):
+    """
+    Template helper caching the body of a call block, e.g.
+    `{% call cached_fragment("comments", dataset.id) %}...{% endcall %}`. Extra positional arguments are
+    added to the key, for blocks that render differently depending on the view.
+    """
+    fragment_cache = current_app.extensions.get("fragment_cache")
+    if fragment_cache is None:
+        return filter_controls(str(caller()))
+    return fragment_cache.render(name, dataset_id, caller, variant, timeout)
+
+
+def owner_controls(owner_id, caller=None):
+    """
+    Template helper marking a block inside a cached fragment that is only shown to `owner_id` and admins,
+    e.g. `{% call owner_controls(comment.user_id) %}...{% endcall %}`.
+    """
+    return Markup(f"<!--controls:{int(owner_id)}-->{caller()}<!--/controls-->")
+
+
+def get_page_cache():
+    return current_app.extensions.get("page_cache")
+
+
+def serve_page(view, cache_control=None):
+    page_cache = get_page_cache()
+    if page_cache is None:
+        return make_response(view())
+    return page_cache.serve(view, cache_control)
+
+
+class CacheManager:
+    def __init__(self, app):
+        self.app = app
+
+    def setup_cache(self):
+        backend = create_cache_backend(self.app.config)
+        self.app.extensions["cache"] = backend
+        page_cache = PageCache(self.app, backend)
+        self.app.extensions["page_cache"] = page_cache
+        self.app.extensions["fragment_cache"] = FragmentCache(self.app, backend, page_cache.template_version)
+        self.app.extensions["identity_cache"] = IdentityCache(self.app, backend)
+        if self.app.config.get("DOI_CACHE_ENABLED", True):
+            self.app.extensions["doi_cache"] = LocalLRUCache(
+                maxsize=self.app.config.get("DOI_CACHE_SIZE", 10000),
+                ttl=self.app.config.get("DOI_CACHE_TTL", 300),
+                negative_ttl=self.app.config.get("DOI_CACHE_NEGATIVE_TTL", 30),
+            )
+        self.app.jinja_env.globals.update(cached_fragment=cached_fragment, owner_controls=owner_controls)
+        self.register_invalidation_events()
+
+    def register_invalidation_events(self):
+        if event.contains(Session, "after_flush", track_page_changes):
+            return
+        event.listen(Session, "after_flush", track_page_changes)
+        event.listen(Session, "after_flush", track_fragment_changes)
+        event.listen(Session, "after_flush", track_identity_changes)
+        event.listen(Session, "after_flush", track_doi_changes)
+        event.listen(Session, "after_commit", invalidate_pages_after_commit)
+        event.listen(Session, "after_commit", invalidate_fragments_after_commit)
+        event.listen(Session, "after_commit", invalidate_identities_after_commit)
+        event.listen(Session, "after_commit", invalidate_dois_after_commit)
+        event.listen(Session, "after_rollback", discard_page_changes)
+
+
+def track_page_changes(session, flush_context):
+    if not has_app_context() or "page_cache" not in current_app.extensions:
+        return
+    watched_tables = current_app.extensions["page_cache"].watched_tables
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if getattr(instance, "__tablename__", None) in watched_tables:
+            session.info["page_cache_changed"] = True
+            return
+
+
+def invalidate_pages_after_commit(session):
+    if session.info.pop("page_cache_changed", False) and has_app_context():
+        page_cache = current_app.extensions.get("page_cache")
+        if page_cache is not None:
+            try:
+                page_cache.invalidate()
+            except Exception as exc:
+                logger.warning(f"Could not invalidate the page cache: {exc}")
+
+
+def discard_page_changes(session):
+    session.info.pop("page_cache_changed", None)
+    session.info.pop("fragment_cache_changed", None)
+    session.info.pop("identity_cache_changed", None)
+    session.info.pop("doi_cache_changed", None)
+
+
+def resolve_path(instance, path):
+    for name in path.split("."):
+        instance = getattr(instance, name, None)
+        if instance is None:
+            return None
+    return instance
+
+
+def track_fragment_changes(session, flush_context):
+    """Collects the ids of the datasets whose fragments are affected by the flush (None for all of them)."""
+    if not has_app_context() or "fragment_cache" not in current_app.extensions:
+        return
+    changed = set()
+    with session.no_autoflush:
+        for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+            table = getattr(instance, "__tablename__", None)
+            if table in FRAGMENT_SHARED_TABLES:
+                changed.add(None)
+            for path in FRAGMENT_DATASET_PATHS.get(table, ()):
+                dataset_id = resolve_path(instance, path)
+                if dataset_id is not None:
+                    changed.add(dataset_id)
+    if changed:
+        session.info.setdefault("fragment_cache_changed", set()).update(changed)
+
+
+def invalidate_fragments_after_commit(session):
+    changed = session.info.pop("fragment_cache_changed", None)
+    if not changed or not has_app_context():
+        return
+    fragment_cache = current_app.extensions.get("fragment_cache")
+    if fragment_cache is None:
+        return
+    try:
+        if None in changed:
+            fragment_cache.invalidate()
+        for dataset_id in changed - {None}:
+            fragment_cache.bump(dataset_id)
+    except Exception as exc:
+        logger.warning(f"Could not invalidate the fragment cache: {exc}")
+
+
+def track_identity_changes(session, flush_context):
+    """Collects the ids of the users whose account or profile change in the flush."""
+    if not has_app_context() or "identity_cache" not in current_app.extensions:
+        return
+    changed = set()
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        attribute = IDENTITY_USER_PATHS.get(getattr(instance, "__tablename__", None))
+        user_id = getattr(instance, attribute, None) if attribute else None
+        if user_id is not None:
+            changed.add(user_id)
+    if changed:
+        session.info.setdefault("identity_cache_changed", set()).update(changed)
+
+
+def invalidate_identities_after_commit(session):
+    changed = session.info.pop("identity_cache_changed", None)
+    if not changed or not has_app_context():
+        return
+    identity_cache = current_app.extensions.get("identity_cache")
+    if identity_cache is None:
+        return
+    try:
+        for user_id in changed:
+            identity_cache.bump(user_id)
+    except Exception as exc:
+        logger.warning(f"Could not invalidate the identity cache: {exc}")
+
+
+def track_doi_changes(session, flush_context):
+    """Collects the DOIs, before and after the flush, of the rows that assign or remap them."""
+    if not has_app_context() or "doi_cache" not in current_app.extensions:
+        return
+    changed = set()
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        for column in DOI_COLUMNS.get(getattr(instance, "__tablename__", None), ()):
+            history = inspect(instance).attrs[column].history
+            changed.update(doi for doi in (*history.added, *history.unchanged, *history.deleted) if doi)
+    if changed:
+        session.info.setdefault("doi_cache_changed", set()).update(changed)
+
+
+def invalidate_dois_after_commit(session):
+    changed = session.info.pop("doi_cache_changed", None)
+    if not changed or not has_app_context():
+        return
+    doi_cache = current_app.extensions.get("doi_cache")
+    if doi_cache is not None:
+        doi_cache.invalidate(*changed)
@@ -2,6 +2,45 @@ import os
 import secrets
 
 
+def env_bool(name, default=False):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def database_uri(database, hostname=None, port=None):
+    return (
+        f"mysql+pymysql://{os.getenv('MARIADB_USER', 'default_user')}:"
+        f"{os.getenv('MARIADB_PASSWORD', 'default_password')}@"
+        f"{hostname or os.getenv('MARIADB_HOSTNAME', 'localhost')}:"
+        f"{port or os.getenv('MARIADB_PORT', '3306')}/"
+        f"{database}"
+    )
+
+
+def replica_binds(database):
+    """The `replica` bind when MARIADB_REPLICA_HOSTNAME is set, sharing the primary credentials."""
+    hostname = os.getenv("MARIADB_REPLICA_HOSTNAME")
+    if not hostname:
+        return {}
+    return {"replica": database_uri(database, hostname, os.getenv("MARIADB_REPLICA_PORT"))}
+
+
+def engine_options(pool_size, max_overflow, pool_timeout=10, pool_recycle=1800):
+    """
+    Connection pool options of the primary and replica engines. Connections are pinged before use and
+    recycled before MariaDB or a proxy drops them for being idle.
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", pool_size)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", max_overflow)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", pool_timeout)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", pool_recycle)),
+        "pool_pre_ping": env_bool("DB_POOL_PRE_PING", True),
+    }
+
+
 class ConfigManager:
     def __init__(self, app):
         self.app = app
@@ -22,34 +61,108 @@ class ConfigManager:
 
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_bytes())
-    SQLALCHEMY_DATABASE_URI = (
-        f"mysql+pymysql://{os.getenv('MARIADB_USER', 'default_user')}:"
-        f"{os.getenv('MARIADB_PASSWORD', 'default_password')}@"
-        f"{os.getenv('MARIADB_HOSTNAME', 'localhost')}:"
-        f"{os.getenv('MARIADB_PORT', '3306')}/"
-        f"{os.getenv('MARIADB_DATABASE', 'default_db')}"
-    )
+    SQLALCHEMY_DATABASE_URI = database_uri(os.getenv("MARIADB_DATABASE", "default_db"))
+    SQLALCHEMY_BINDS = replica_binds(os.getenv("MARIADB_DATABASE", "default_db"))
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(pool_size=10, max_overflow=20)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Seconds before MariaDB aborts a statement run by a request (max_statement_time), and before a connection
+    # attempt fails. A statement timeout of 0 disables it. Statements run outside requests are never timed out.
+    DB_STATEMENT_TIMEOUT = float(os.getenv("DB_STATEMENT_TIMEOUT", "0"))
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+
+    # Seconds a user keeps reading from the primary after a POST (or any other unsafe request), covering the
+    # replication lag so they read their own writes
+    DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "10"))
     TIMEZONE = "Europe/Madrid"
     TEMPLATES_AUTO_RELOAD = True
     UPLOAD_FOLDER = "uploads"
 
+    # Request instrumentation (SQL statements, template rendering and wall time per request)
+    INSTRUMENTATION_ENABLED = env_bool("INSTRUMENTATION_ENABLED", True)
+    METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    # Directory of the slow request log
+    LOG_DIR = os.getenv("LOG_DIR", os.path.join(os.getenv("WORKING_DIR", ""), "logs"))
+    SERVER_TIMING_HEADER = env_bool("SERVER_TIMING_HEADER", False)
+    SLOW_REQUEST_THRESHOLD_MS = int(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "500"))
+
+    # On-demand cProfile captures of admin requests flagged with the header or query parameter
+    PROFILING_ENABLED = env_bool("PROFILING_ENABLED", True)
+    PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+    PROFILING_QUERY_PARAM = os.getenv("PROFILING_QUERY_PARAM", "profile")
+    PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(os.getenv("WORKING_DIR", ""), "profiles"))
+    PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "50"))
+
+    # Cache backend (simple, filesystem, redis or null) shared by the page and fragment caches
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "simple")
+    CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.getenv("WORKING_DIR", ""), "cache"))
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", "300"))
+    # Whether every worker process sees the same cache, so an invalidation made by one reaches all of them
+    SHARED_CACHE = CACHE_TYPE in ("redis", "filesystem")
+
+    # Response cache for public pages requested by anonymous users. Only enabled by default with a shared
+    # backend: with the in-process one, the other workers would serve stale pages until they expire
+    PAGE_CACHE_ENABLED = env_bool("PAGE_CACHE_ENABLED", SHARED_CACHE)
+    PAGE_CACHE_TIMEOUT = int(os.getenv("PAGE_CACHE_TIMEOUT", "300"))
+    PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", "60"))
+
+    # Cache of rendered dataset page blocks (files, recommendations and comments), used for every user. Like
+    # the page cache, only enabled by default when its invalidations reach every worker
+    FRAGMENT_CACHE_ENABLED = env_bool("FRAGMENT_CACHE_ENABLED", SHARED_CACHE)
+    FRAGMENT_CACHE_TIMEOUT = int(os.getenv("FRAGMENT_CACHE_TIMEOUT", "3600"))
+
+    # Cache of the account and profile of logged in users. Invalidations must reach every process, so it is
+    # only enabled by default with a shared backend
+    IDENTITY_CACHE_ENABLED = env_bool("IDENTITY_CACHE_ENABLED", SHARED_CACHE)
+    IDENTITY_CACHE_TIMEOUT = int(os.getenv("IDENTITY_CACHE_TIMEOUT", "600"))
+
+    # In-process cache of the dataset each /doi/<doi>/ URL resolves to, including unknown DOIs for a shorter time
+    DOI_CACHE_ENABLED = env_bool("DOI_CACHE_ENABLED", True)
+    DOI_CACHE_SIZE = int(os.getenv("DOI_CACHE_SIZE", "10000"))
+    DOI_CACHE_TTL = int(os.getenv("DOI_CACHE_TTL", "300"))
+    DOI_CACHE_NEGATIVE_TTL = int(os.getenv("DOI_CACHE_NEGATIVE_TTL", "30"))
+
+    # Server-side sessions with Flask-Session ("redis" or "cachelib"); signed cookies when unset
+    SESSION_TYPE = os.getenv("SESSION_TYPE") or None
+    SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", CACHE_REDIS_URL)
+    SESSION_KEY_PREFIX = "uvlhub:session:"
+
+    # Module scripts are minified and precompressed at startup and served from URLs holding their content hash.
+    # With ASSETS_OUTPUT_DIR they are also written there for nginx
+    ASSETS_MINIFY = env_bool("ASSETS_MINIFY", True)
+    ASSETS_AUTO_RELOAD = env_bool("ASSETS_AUTO_RELOAD", False)
+    ASSETS_MAX_AGE = int(os.getenv("ASSETS_MAX_AGE", "31536000"))
+    ASSETS_OUTPUT_DIR = os.getenv("ASSETS_OUTPUT_DIR") or None
+
+    # Datasets published to Zenodo at the same time by `rosemary zenodo:sync` and POST /admin/zenodo/sync
+    ZENODO_SYNC_WORKERS = int(os.getenv("ZENODO_SYNC_WORKERS", "4"))
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(pool_size=5, max_overflow=10)
+    SERVER_TIMING_HEADER = env_bool("SERVER_TIMING_HEADER", True)
+    PAGE_CACHE_ENABLED = env_bool("PAGE_CACHE_ENABLED", False)
+    FRAGMENT_CACHE_ENABLED = env_bool("FRAGMENT_CACHE_ENABLED", False)
+    ASSETS_MINIFY = env_bool("ASSETS_MINIFY", False)
+    ASSETS_AUTO_RELOAD = env_bool("ASSETS_AUTO_RELOAD", True)
 
 
 class TestingConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = (
-        f"mysql+pymysql://{os.getenv('MARIADB_USER', 'default_user')}:"
-        f"{os.getenv('MARIADB_PASSWORD', 'default_password')}@"
-        f"{os.getenv('MARIADB_HOSTNAME', 'localhost')}:"
-        f"{os.getenv('MARIADB_PORT', '3306')}/"
-        f"{os.getenv('MARIADB_TEST_DATABASE', 'default_db')}"
-    )
+    SQLALCHEMY_DATABASE_URI = database_uri(os.getenv("MARIADB_TEST_DATABASE", "default_db"))
+    SQLALCHEMY_BINDS = replica_binds(os.getenv("MARIADB_TEST_DATABASE", "default_db"))
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(pool_size=5, max_overflow=5)
     WTF_CSRF_ENABLED = False
+    PAGE_CACHE_ENABLED = False
+    FRAGMENT_CACHE_ENABLED = False
+    IDENTITY_CACHE_ENABLED = False
 
 
 class ProductionConfig(Config):
     DEBUG = False
+    # /metrics is only served with a token, unless it is explicitly enabled
+    METRICS_ENABLED = env_bool("METRICS_ENABLED", bool(os.getenv("METRICS_TOKEN")))
+    DB_STATEMENT_TIMEOUT = float(os.getenv("DB_STATEMENT_TIMEOUT", "30"))
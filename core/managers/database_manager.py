@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Dialects whose sessions accept MariaDB's max_statement_time
+STATEMENT_TIMEOUT_DIALECTS = ("mysql", "mariadb")
+
+REPLICA_BIND = "replica"
+
+# Requests with these methods may read from the replica. Any other one sends its user to the primary for a while,
+# unless its view is marked `read_only`
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Flask session key holding the time until which the user's reads stay on the primary
+PRIMARY_UNTIL_KEY = "db_primary_until"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+_primary_reads = ContextVar("primary_reads", default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Lets the queries run inside the block read from the replica (see `RoutingSession`)."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Sends every query run inside the block to the primary, even from `read_only` methods. Used to render what
+    is about to be cached, which must not be built from a replica that lags behind a change just committed.
+    """
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+def is_read_only_request():
+    """Safe requests, and requests to views marked `read_only` (e.g. searches sent as POST)."""
+    view = current_app.view_functions.get(request.endpoint)
+    return request.method in SAFE_METHODS or getattr(view, "read_only", False)
+
+
+def replica_allowed():
+    """
+    Whether the current request may read from the replica: only read-only requests of users who have not
+    written anything recently, so they always read their own writes.
+    """
+    if not has_request_context():
+        return True
+    return is_read_only_request() and session.get(PRIMARY_UNTIL_KEY, 0) <= time.time()
+
+
+class RoutingSession(Session):
+    """
+    Session sending the reads made inside `replica_reads` to the replica bind. Writes, models with their
+    own bind and every read made after the session has flushed go to the primary, which is also used for
+    everything when no replica is configured.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is None and engine is self._db.engine and self.reads_from_replica(clause):
+            return self._db.engines.get(REPLICA_BIND, engine)
+        return engine
+
+    def reads_from_replica(self, clause):
+        if not _replica_reads.get() or _primary_reads.get() or self._flushing or self.info.get("wrote"):
+            return False
+        if clause is not None and getattr(clause, "is_dml", False):
+            return False
+        return replica_allowed()
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def stick_to_primary_after_flush(db_session, flush_context):
+    db_session.info["wrote"] = True
+
+
+class PoolMetrics:
+    """Connection pool gauges and counters of every engine, rendered in the Prometheus text format."""
+
+    def __init__(self, engines):
+        self._lock = threading.Lock()
+        self.engines = engines
+        self.connections = defaultdict(int)
+        self.invalidations = defaultdict(int)
+
+    def record_connection(self, bind):
+        with self._lock:
+            self.connections[bind] += 1
+
+    def record_invalidation(self, bind):
+        with self._lock:
+            self.invalidations[bind] += 1
+
+    def __call__(self):
+        gauges = (
+            ("db_pool_size", "Connections the pool keeps open.", "size"),
+            ("db_pool_checked_out", "Connections in use.", "checkedout"),
+            ("db_pool_checked_in", "Idle connections in the pool.", "checkedin"),
+            ("db_pool_overflow", "Connections open beyond the pool size.", "overflow"),
+        )
+        lines = []
+        for name, help_text, method in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for bind, engine in sorted(self.engines.items()):
+                # Only queue pools report their state (SQLite in memory, for instance, uses other pools)
+                if hasattr(engine.pool, method):
+                    lines.append(f'{name}{{bind="{bind}"}} {getattr(engine.pool, method)()}')
+
+        with self._lock:
+            for name, help_text, values in (
+                ("db_pool_connections_total", "Database connections opened.", self.connections),
+                ("db_pool_invalidations_total", "Connections discarded as stale or broken.", self.invalidations),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for bind in sorted(self.engines):
+                    lines.append(f'{name}{{bind="{bind}"}} {values[bind]}')
+        return lines
+
+
+class DatabaseManager:
+    def __init__(self, app):
+        self.app = app
+        self.engines = {}
+
+    def setup_database(self):
+        db = self.app.extensions["sqlalchemy"]
+        with self.app.app_context():
+            self.engines = {bind or "primary": engine for bind, engine in db.engines.items()}
+
+        metrics = PoolMetrics(self.engines)
+        for bind, engine in self.engines.items():
+            self.register_engine_events(bind, engine, metrics)
+
+        registry = self.app.extensions.get("instrumentation")
+        if registry is not None:
+            registry.add_collector(metrics)
+
+        if REPLICA_BIND in self.engines:
+            self.register_replica_stickiness()
+
+    def register_replica_stickiness(self):
+        sticky_seconds = self.app.config.get("DB_REPLICA_STICKY_SECONDS", 10)
+
+        @self.app.after_request
+        def stick_to_primary_after_writes(response):
+            # The replica may lag behind: after a write, the user keeps reading from the primary for a while
+            if not is_read_only_request():
+                session[PRIMARY_UNTIL_KEY] = time.time() + sticky_seconds
+            return response
+
+    def register_engine_events(self, bind, engine, metrics: PoolMetrics):
+        statement_timeout = self.app.config.get("DB_STATEMENT_TIMEOUT", 0)
+        connect_timeout = self.app.config.get("DB_CONNECT_TIMEOUT")
+
+        @event.listens_for(engine, "do_connect")
+        def set_connect_timeout(dialect, connection_record, cargs, cparams):
+            if connect_timeout and dialect.name in STATEMENT_TIMEOUT_DIALECTS:
+                cparams.setdefault("connect_timeout", connect_timeout)
+
+        @event.listens_for(engine, "connect")
+        def count_connection(dbapi_connection, connection_record):
+            metrics.record_connection(bind)
+
+        @event.listens_for(engine, "checkout")
+        def set_statement_timeout(dbapi_connection, connection_record, connection_proxy):
+            if not statement_timeout or engine.dialect.name not in STATEMENT_TIMEOUT_DIALECTS:
+                return
+            # Only requests are timed out: migrations, rosemary commands and background jobs such as the Zenodo
+            # sync run outside of them and take as long as they need. The timeout of each connection is
+            # remembered, so it is only set again when the connection moves between both.
+            timeout = statement_timeout if has_request_context() else 0
+            if connection_record.info.get("statement_timeout", 0) != timeout:
+                cursor = dbapi_connection.cursor()
+                cursor.execute("SET SESSION max_statement_time = %s", (timeout,))
+                cursor.close()
+                connection_record.info["statement_timeout"] = timeout
+
+        @event.listens_for(engine, "invalidate")
+        def count_invalidation(dbapi_connection, connection_record, exception):
+            metrics.record_invalidation(bind)
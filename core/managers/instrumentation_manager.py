@@ -0,0 +1,237 @@
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, abort, g, has_request_context, request, template_rendered
+from flask.signals import before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("instrumentation")
+
+# Upper bounds (in seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Max number of statements kept per request for the slow request log
+MAX_RECORDED_QUERIES = 200
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.queries = []
+        self.template_time = 0.0
+        self.template_starts = []
+
+    def record_query(self, statement, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        if len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append((statement, duration))
+
+
+class MetricsRegistry:
+    """
+    Process-local store of request metrics, rendered in the Prometheus text exposition format.
+    Other components can add their own metrics with `add_collector`. Every sample is labelled with the `pid`
+    of the worker process, since each Gunicorn worker keeps its own counters and a scrape reaches only one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.durations = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self.duration_sums = defaultdict(float)
+        self.sql_counts = defaultdict(int)
+        self.sql_times = defaultdict(float)
+        self.template_times = defaultdict(float)
+        self.collectors = []
+
+    def add_collector(self, collector):
+        """Registers a callable returning extra lines in Prometheus text format."""
+        self.collectors.append(collector)
+
+    def observe(self, endpoint, method, status, duration, metrics: RequestMetrics):
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            buckets = self.durations[endpoint]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[i] += 1
+                    break
+            else:
+                buckets[-1] += 1
+            self.duration_sums[endpoint] += duration
+            self.sql_counts[endpoint] += metrics.sql_count
+            self.sql_times[endpoint] += metrics.sql_time
+            self.template_times[endpoint] += metrics.template_time
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append("# HELP http_requests_total Total number of HTTP requests.")
+            lines.append("# TYPE http_requests_total counter")
+            for (endpoint, method, status), value in sorted(self.requests.items()):
+                lines.append(
+                    f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {value}'
+                )
+
+            lines.append("# HELP http_request_duration_seconds Request wall time.")
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for endpoint, buckets in sorted(self.durations.items()):
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    cumulative += count
+                    lines.append(
+                        f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}'
+                    )
+                cumulative += buckets[-1]
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {cumulative}')
+                lines.append(
+                    f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self.duration_sums[endpoint]}'
+                )
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {cumulative}')
+
+            for name, help_text, values in (
+                ("http_request_sql_queries_total", "SQL statements executed.", self.sql_counts),
+                ("http_request_sql_duration_seconds_total", "Time spent in SQL statements.", self.sql_times),
+                (
+                    "http_request_template_duration_seconds_total",
+                    "Time spent rendering templates.",
+                    self.template_times,
+                ),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+
+        for collector in self.collectors:
+            lines.extend(collector())
+
+        pid = os.getpid()
+        return "\n".join(with_pid_label(line, pid) for line in lines) + "\n"
+
+
+class InstrumentationManager:
+    def __init__(self, app):
+        self.app = app
+        self.registry = MetricsRegistry()
+
+    def setup_instrumentation(self):
+        if not self.app.config.get("INSTRUMENTATION_ENABLED", True):
+            return
+
+        self.app.extensions["instrumentation"] = self.registry
+
+        self.register_sql_events()
+        self.register_template_signals()
+        self.register_request_hooks()
+
+        if self.app.config.get("METRICS_ENABLED", True):
+            self.app.add_url_rule("/metrics", "metrics", self.metrics)
+
+    def register_sql_events(self):
+        # Listening on the Engine class covers every engine, including binds created later
+        if event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+            return
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+
+    def register_template_signals(self):
+        before_render_template.connect(on_before_render_template, self.app)
+        template_rendered.connect(on_template_rendered, self.app)
+
+    def register_request_hooks(self):
+        @self.app.before_request
+        def start_request_metrics():
+            g.request_metrics = RequestMetrics()
+
+        @self.app.after_request
+        def finish_request_metrics(response):
+            metrics = g.pop("request_metrics", None)
+            if metrics is None:
+                return response
+
+            duration = time.perf_counter() - metrics.start
+            endpoint = request.endpoint or "unknown"
+            self.registry.observe(endpoint, request.method, response.status_code, duration, metrics)
+
+            if self.app.config.get("SERVER_TIMING_HEADER", False):
+                response.headers["Server-Timing"] = (
+                    f'sql;dur={metrics.sql_time * 1000:.1f};desc="{metrics.sql_count} queries", '
+                    f"tpl;dur={metrics.template_time * 1000:.1f}, "
+                    f"total;dur={duration * 1000:.1f}"
+                )
+
+            threshold = self.app.config.get("SLOW_REQUEST_THRESHOLD_MS", 500)
+            if threshold is not None and duration * 1000 >= threshold:
+                log_slow_request(endpoint, duration, metrics)
+
+            return response
+
+    def metrics(self):
+        token = self.app.config.get("METRICS_TOKEN")
+        if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            abort(401)
+        return Response(self.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def with_pid_label(line, pid):
+    """Adds the `pid` label to a sample line, leaving comments untouched."""
+    if not line or line.startswith("#"):
+        return line
+    name, _, value = line.rpartition(" ")
+    if name.endswith("}"):
+        return f'{name[:-1]},pid="{pid}"}} {value}'
+    return f'{name}{{pid="{pid}"}} {value}'
+
+
+def current_request_metrics():
+    if not has_request_context():
+        return None
+    return g.get("request_metrics")
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+
+    metrics = current_request_metrics()
+    if metrics is not None:
+        metrics.record_query(statement, duration)
+
+
+def on_before_render_template(sender, template, context, **extra):
+    metrics = current_request_metrics()
+    if metrics is not None:
+        metrics.template_starts.append(time.perf_counter())
+
+
+def on_template_rendered(sender, template, context, **extra):
+    metrics = current_request_metrics()
+    if metrics is not None and metrics.template_starts:
+        metrics.template_time += time.perf_counter() - metrics.template_starts.pop()
+
+
+def log_slow_request(endpoint, duration, metrics: RequestMetrics):
+    queries = "\n".join(
+        f"  {query_duration * 1000:.1f} ms - {' '.join(statement.split())[:300]}"
+        for statement, query_duration in metrics.queries
+    )
+    logger.warning(
+        f"Slow request {request.method} {request.path} ({endpoint}): {duration * 1000:.1f} ms total, "
+        f"{metrics.sql_count} SQL statements in {metrics.sql_time * 1000:.1f} ms, "
+        f"templates {metrics.template_time * 1000:.1f} ms\n{queries}"
+    )
@@ -1,4 +1,5 @@
 import logging
+import os
 from logging.handlers import RotatingFileHandler
 
 
@@ -18,6 +19,18 @@ class LoggingManager:
         # Add handler to app logger
         self.app.logger.addHandler(file_handler)
 
+        # Slow requests reported by the instrumentation layer, with the SQL statements they ran
+        instrumentation_logger = logging.getLogger("instrumentation")
+        if not instrumentation_logger.handlers:
+            log_dir = self.app.config.get("LOG_DIR", "logs")
+            os.makedirs(log_dir, exist_ok=True)
+            slow_requests_handler = RotatingFileHandler(
+                os.path.join(log_dir, "slow_requests.log"), maxBytes=1048576, backupCount=5
+            )
+            slow_requests_handler.setLevel(logging.WARNING)
+            slow_requests_handler.setFormatter(formatter)
+            instrumentation_logger.addHandler(slow_requests_handler)
+
         # Configure console log if necessary
         if self.app.debug:
             stream_handler = logging.StreamHandler()
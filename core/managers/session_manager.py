@@ -0,0 +1,33 @@
+import os
+
+from cachelib import FileSystemCache
+
+
+class SessionManager:
+    """
+    Moves the Flask session to the server with Flask-Session when SESSION_TYPE is set: "redis" keeps the
+    sessions in SESSION_REDIS_URL and "cachelib" in files under CACHE_DIR. Otherwise sessions stay in the
+    signed cookie.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def setup_sessions(self):
+        session_type = self.app.config.get("SESSION_TYPE")
+        if not session_type:
+            return
+
+        if session_type == "redis" and not self.app.config.get("SESSION_REDIS"):
+            # redis is only needed when the redis backend is selected
+            import redis
+
+            self.app.config["SESSION_REDIS"] = redis.from_url(self.app.config.get("SESSION_REDIS_URL"))
+        elif session_type == "cachelib" and not self.app.config.get("SESSION_CACHELIB"):
+            self.app.config["SESSION_CACHELIB"] = FileSystemCache(
+                os.path.join(self.app.config.get("CACHE_DIR", "cache"), "sessions")
+            )
+
+        from flask_session import Session
+
+        Session(self.app)
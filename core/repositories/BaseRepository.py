@@ -1,6 +1,7 @@
 from typing import Generic, List, NoReturn, Optional, TypeVar, Union
 
 import app
+from core.decorators.decorators import read_only
 
 T = TypeVar("T")
 
@@ -57,5 +58,6 @@ class BaseRepository(Generic[T]):
         self.session.commit()
         return True
 
+    @read_only
     def count(self) -> int:
         return self.model.query.count()
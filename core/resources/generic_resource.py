@@ -1,9 +1,16 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from flask import request
 from flask_restful import Resource
 
 from app import db
+from core.serialisers.serializer import json_response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Query string arguments that are not column filters
+RESERVED_ARGS = ("fields", "limit", "offset", "after")
 
 
 def convert_value(value):
@@ -12,21 +19,128 @@ def convert_value(value):
     return value
 
 
+def indexed_columns(model):
+    """Columns of the model that can be filtered on without a full scan: keys and indexed columns."""
+    table = model.__table__
+    indexed = {index.columns[0].name for index in table.indexes if len(index.columns)}
+    return {
+        column.name: column
+        for column in table.columns
+        if column.primary_key or column.index or column.unique or column.foreign_keys or column.name in indexed
+    }
+
+
+def parse_column_value(column, value):
+    python_type = column.type.python_type
+    if python_type is bool:
+        if value.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(f"Invalid boolean: {value}")
+        return value.lower() in ("true", "1")
+    if python_type in (datetime, date):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
 class GenericResource(Resource):
-    def __init__(self, model, serializer):
+    def __init__(
+        self, model, serializer, filterable_fields=None, default_limit=DEFAULT_PAGE_SIZE, max_limit=MAX_PAGE_SIZE
+    ):
         self.model = model
         self.model_name = model.__name__
         self.serializer = serializer
+        self.primary_key = model.__mapper__.primary_key[0]
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+
+        columns = indexed_columns(model)
+        self.filterable_fields = (
+            {name: columns[name] for name in filterable_fields} if filterable_fields is not None else columns
+        )
 
     def get(self, id=None):
+        try:
+            fields = self.parse_fields()
+        except ValueError as exc:
+            return {"message": str(exc)}, 400
+
+        options = self.serializer.loader_options(self.model, fields)
+
         if id:
-            item = self.model.query.get(id)
+            item = db.session.get(self.model, id, options=options)
             if not item:
                 return {"message": f"{self.model_name} not found"}, 404
-            return self.serializer.serialize(item), 200
+            return json_response(self.serializer.serialize(item, fields))
+
+        try:
+            limit, offset, after = self.parse_pagination()
+            filters = self.parse_filters()
+        except ValueError as exc:
+            return {"message": str(exc)}, 400
+
+        query = self.model.query.filter(*filters).order_by(self.primary_key)
+        # Keyset pagination (?after=<last id>) stays fast on deep pages, unlike large offsets
+        if after is not None:
+            query = query.filter(self.primary_key > after)
+        elif offset:
+            query = query.offset(offset)
+
+        # When only plain columns are requested, rows are fetched without building ORM instances
+        columns = self.serializer.column_attributes(self.model, fields)
+        if columns is not None:
+            key = self.primary_key.key
+            query = query.with_entities(*(getattr(self.model, name) for name in dict.fromkeys(columns + [key])))
         else:
-            items = self.model.query.all()
-            return {"items": [self.serializer.serialize(i) for i in items]}, 200
+            query = query.options(*options)
+        items = query.limit(limit).all()
+
+        response = {
+            "items": self.serializer.serialize_many(items, fields),
+            "limit": limit,
+            "next_after": getattr(items[-1], self.primary_key.key) if len(items) == limit else None,
+        }
+        if after is None:
+            response["offset"] = offset
+        return json_response(response)
+
+    def parse_fields(self):
+        fields = request.args.get("fields")
+        if not fields:
+            return None
+
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in fields if field not in self.serializer.serialization_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return fields
+
+    def parse_pagination(self):
+        try:
+            limit = int(request.args.get("limit", self.default_limit))
+            offset = int(request.args.get("offset", 0))
+            after = request.args.get("after")
+            after = int(after) if after is not None else None
+        except ValueError:
+            raise ValueError("limit, offset and after must be integers")
+
+        if limit < 1 or offset < 0:
+            raise ValueError("limit must be positive and offset can't be negative")
+        return min(limit, self.max_limit), offset, after
+
+    def parse_filters(self):
+        filters = []
+        for name, value in request.args.items():
+            if name in RESERVED_ARGS:
+                continue
+            column = self.filterable_fields.get(name)
+            if column is None:
+                raise ValueError(
+                    f"Can't filter by {name}. Available filters: {', '.join(sorted(self.filterable_fields))}"
+                )
+            try:
+                filters.append(column == parse_column_value(column, value))
+            except ValueError:
+                raise ValueError(f"Invalid value for {name}: {value}")
+        return filters
 
     def post(self):
         data = request.get_json()
@@ -63,9 +177,9 @@ class GenericResource(Resource):
         return {"message": f"{self.model_name} deleted successfully"}, 204
 
 
-def create_resource(model, serialization_fields=None):
+def create_resource(model, serialization_fields=None, **options):
     class Resource(GenericResource):
         def __init__(self):
-            super().__init__(model, serialization_fields)
+            super().__init__(model, serialization_fields, **options)
 
     return Resource
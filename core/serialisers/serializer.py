@@ -1,4 +1,14 @@
+import inspect as pyinspect
+import threading
 from datetime import datetime
+from operator import attrgetter
+
+import msgspec
+from flask import Response
+from sqlalchemy import Row, inspect
+from sqlalchemy.orm import ColumnProperty, joinedload, selectinload
+
+json_encoder = msgspec.json.Encoder()
 
 
 def convert_value(value):
@@ -7,25 +17,185 @@ def convert_value(value):
     return value
 
 
+def encode_json(data) -> bytes:
+    return json_encoder.encode(data)
+
+
+def json_response(data, status=200) -> Response:
+    """Response with `data` encoded straight to JSON bytes, skipping Flask's JSON provider."""
+    return Response(encode_json(data), status=status, mimetype="application/json")
+
+
+def eager_load(model, path):
+    """
+    Builds the loader option for a dotted relationship path, e.g. "feature_models.files". Collections are
+    loaded with a separate SELECT ... IN query and many-to-one relationships with a join.
+    """
+    option = None
+    for name in path.split("."):
+        attribute = getattr(model, name)
+        loader = selectinload if attribute.property.uselist else joinedload
+        option = loader(attribute) if option is None else getattr(option, loader.__name__)(attribute)
+        model = attribute.property.mapper.class_
+    return option
+
+
+def isoformat_getter(getter):
+    def get(instance):
+        value = getter(instance)
+        return value.isoformat() if value is not None else None
+
+    return get
+
+
+def call_getter(function):
+    def get(instance):
+        return convert_value(function(instance))
+
+    return get
+
+
+def dynamic_getter(attr_name):
+    def get(instance):
+        attr = getattr(instance, attr_name, None)
+        if callable(attr):
+            attr = attr()
+        return convert_value(attr)
+
+    return get
+
+
 class Serializer:
-    def __init__(self, serialization_fields, related_serializers=None):
+    def __init__(self, serialization_fields, related_serializers=None, load_hints=None):
         self.serialization_fields = serialization_fields
         self.related_serializers = related_serializers or {}
+        # Relationship paths needed by fields that are methods, e.g. {"files": ["feature_models.files"]}
+        self.load_hints = load_hints or {}
+        self._plans = {}
+        self._plans_lock = threading.Lock()
+
+    def serialize(self, instance, fields=None):
+        return {key: get(instance) for key, get in self.get_plan(type(instance), fields)}
 
-    def serialize(self, instance):
-        serialized_data = {}
+    def serialize_many(self, instances, fields=None):
+        """
+        Serializes a list of model instances or of rows from column-only queries, resolving the access
+        plan once instead of once per instance.
+        """
+        if not instances:
+            return []
+        if isinstance(instances[0], Row):
+            return self.serialize_rows(instances, fields)
+
+        plan = self.get_plan(type(instances[0]), fields)
+        return [{key: get(instance) for key, get in plan} for instance in instances]
+
+    def serialize_rows(self, rows, fields=None):
+        """
+        Serializes rows of a column-only query, e.g. `query.with_entities(DataSet.id, DataSet.created_at)`.
+        Fields whose attribute is not one of the selected columns are left out.
+        """
+        if not rows:
+            return []
+
+        positions = {name: position for position, name in enumerate(rows[0]._fields)}
+        plan = [
+            (key, positions[attr_name])
+            for key, attr_name in self.serialization_fields.items()
+            if (fields is None or key in fields) and attr_name in positions
+        ]
+        return [{key: convert_value(row[position]) for key, position in plan} for row in rows]
+
+    def get_plan(self, model, fields=None):
+        """
+        Returns the field access plan for `model`: a list of (key, getter) pairs, compiled on first use.
+        Columns are read with `attrgetter`, methods are called through the class, and related fields are
+        delegated to their serializer. Anything else falls back to a dynamic lookup.
+        """
+        cache_key = (model, tuple(fields) if fields is not None else None)
+        plan = self._plans.get(cache_key)
+        if plan is None:
+            plan = self.compile_plan(model, fields)
+            with self._plans_lock:
+                self._plans[cache_key] = plan
+        return plan
+
+    def compile_plan(self, model, fields=None):
+        mapper = inspect(model, raiseerr=False)
+        column_properties = {
+            prop.key: prop for prop in (mapper.attrs if mapper else []) if isinstance(prop, ColumnProperty)
+        }
+
+        plan = []
         for key, attr_name in self.serialization_fields.items():
+            if fields is not None and key not in fields:
+                continue
+
+            class_attr = getattr(model, attr_name, None)
             if key in self.related_serializers:
-                related_data = getattr(instance, attr_name)()
-                if isinstance(related_data, list):
-                    serialized_data[key] = [
-                        self.related_serializers[key].serialize(sub_instance) for sub_instance in related_data
-                    ]
-                else:
-                    serialized_data[key] = self.related_serializers[key].serialize(related_data)
+                plan.append((key, self.related_getter(self.related_serializers[key], attr_name, class_attr)))
+            elif attr_name in column_properties:
+                getter = attrgetter(attr_name)
+                column = column_properties[attr_name].columns[0]
+                if getattr(column.type, "python_type", None) is datetime:
+                    getter = isoformat_getter(getter)
+                plan.append((key, getter))
+            elif pyinspect.isfunction(class_attr):
+                plan.append((key, call_getter(class_attr)))
             else:
-                attr = getattr(instance, attr_name, None)
-                if callable(attr):
-                    attr = attr()
-                serialized_data[key] = convert_value(attr)
-        return serialized_data
+                plan.append((key, dynamic_getter(attr_name)))
+        return plan
+
+    @staticmethod
+    def related_getter(serializer, attr_name, class_attr):
+        fetch = class_attr if pyinspect.isfunction(class_attr) else attrgetter(attr_name)
+
+        def get(instance):
+            related_data = fetch(instance)
+            if isinstance(related_data, list):
+                return serializer.serialize_many(related_data)
+            return serializer.serialize(related_data) if related_data is not None else None
+
+        return get
+
+    def column_attributes(self, model, fields=None):
+        """
+        Names of the columns holding the given fields, or None when any of them is not a plain column
+        (a method or a relationship), in which case whole instances must be loaded.
+        """
+        mapper = inspect(model)
+        attributes = []
+        for key, attr_name in self.serialization_fields.items():
+            if fields is not None and key not in fields:
+                continue
+            if key in self.related_serializers or not isinstance(mapper.attrs.get(attr_name), ColumnProperty):
+                return None
+            attributes.append(attr_name)
+        return attributes
+
+    def relationship_paths(self, model, fields=None):
+        """
+        Relationship paths of `model` read when serializing the given fields: the load hints of the fields,
+        plus every related serializer field backed by a relationship, followed by the paths its own
+        serializer needs on the related model.
+        """
+        relationships = inspect(model).relationships
+        paths = []
+        for key, attr_name in self.serialization_fields.items():
+            if fields is not None and key not in fields:
+                continue
+            hints = self.load_hints.get(key, [])
+            paths.extend([hints] if isinstance(hints, str) else hints)
+
+            if key in self.related_serializers and attr_name in relationships:
+                related_model = relationships[attr_name].mapper.class_
+                paths.append(attr_name)
+                paths.extend(
+                    f"{attr_name}.{path}" for path in self.related_serializers[key].relationship_paths(related_model)
+                )
+
+        # Paths covered by a longer one are loaded with it
+        return [path for path in dict.fromkeys(paths) if not any(other.startswith(f"{path}.") for other in paths)]
+
+    def loader_options(self, model, fields=None):
+        return [eager_load(model, path) for path in self.relationship_paths(model, fields)]
@@ -0,0 +1,2 @@
+# The application fixtures are shared with the module tests
+from app.modules.conftest import clean_database, test_app, test_client  # noqa: F401
@@ -0,0 +1,80 @@
+import gzip
+import json
+
+import brotli
+from flask import url_for
+
+from core.managers.asset_manager import MANIFEST_NAME, minify_js
+
+
+def test_minify_js_keeps_strings_templates_and_regular_expressions():
+    """
+    Test that the minifier drops comments and indentation without touching literals or breaking operators.
+    """
+    source = (
+        "// header\n"
+        "function f(a) {\n"
+        "    /* block */\n"
+        "    let re = /a\\/[/]b/g; // trailing\n"
+        "    let s = 'x // not a comment', t = `  ${a ? `${a}` : ''} /* kept */`;\n"
+        "    return a / 2 + +a - -1;\n"
+        "}\n"
+    )
+    assert minify_js(source) == (
+        "function f(a){\n"
+        "let re=/a\\/[/]b/g;\n"
+        "let s='x // not a comment',t=`  ${a ? `${a}` : ''} /* kept */`;\n"
+        "return a/2+ +a- -1;\n"
+        "}\n"
+    )
+
+
+def test_module_scripts_are_fingerprinted_and_precompressed(test_client):
+    """
+    Test that module scripts are linked by content hash and served compressed and cached for a year.
+    """
+    pipeline = test_client.application.extensions["assets"]
+    asset = pipeline.get("public")
+
+    with test_client.application.test_request_context():
+        url = url_for("public.scripts")
+    assert url == f"/public/{asset.filename}"
+    assert url.encode() in test_client.get("/").data
+
+    response = test_client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    dataset_url = f"/dataset/{pipeline.get('dataset').filename}"
+    compressed = test_client.get(dataset_url, headers={"Accept-Encoding": "gzip, br"})
+    assert compressed.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(compressed.data) == pipeline.get("dataset").body
+
+    plain = test_client.get(dataset_url)
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data == pipeline.get("dataset").body
+
+    revalidated = test_client.get(dataset_url, headers={"If-None-Match": plain.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    # Pages rendered before a deploy still get the script, but not for a year
+    stale = test_client.get("/public/scripts.000000000000.js")
+    assert stale.status_code == 200
+    assert "no-cache" in stale.headers["Cache-Control"]
+
+
+def test_module_scripts_are_written_for_nginx(test_client, tmp_path):
+    """
+    Test that the generated static directory holds every script, its compressed variants and a manifest.
+    """
+    pipeline = test_client.application.extensions["assets"]
+    pipeline.write(str(tmp_path))
+
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert manifest["dataset"] == f"dataset/{pipeline.get('dataset').filename}"
+
+    script = tmp_path / manifest["dataset"]
+    assert script.read_bytes() == pipeline.get("dataset").body
+    assert gzip.decompress((tmp_path / f"{manifest['dataset']}.gz").read_bytes()) == script.read_bytes()
+    assert (tmp_path / f"{manifest['dataset']}.br").exists()
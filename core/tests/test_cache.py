@@ -0,0 +1,130 @@
+import pytest
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.conftest import login, logout
+from app.modules.dataset.models import Author, DataSet, DSDownloadRecord, DSMetaData, PublicationType
+
+
+@pytest.fixture(scope="module")
+def test_client(test_client):
+    """
+    Extends the test_client fixture with two synchronized datasets shown on the homepage.
+    """
+    with test_client.application.app_context():
+        user = User(email="author1@example.com")
+        user.set_password("test1234")
+        db.session.add(user)
+        db.session.commit()
+
+        for i in range(1, 3):
+            ds_meta = DSMetaData(
+                title=f"Test Dataset {i}",
+                description=f"Description for dataset {i}",
+                publication_type=PublicationType.SOFTWARE_DOCUMENTATION,
+                dataset_doi=f"10.1234/dataset{i}",
+                tags="test,dataset",
+            )
+            ds_meta.authors.append(Author(name=f"Test Author {i}", affiliation=f"University {i}"))
+            db.session.add(DataSet(user_id=user.id, ds_meta_data=ds_meta))
+        db.session.commit()
+
+    yield test_client
+
+
+@pytest.fixture
+def page_cache(test_client):
+    app = test_client.application
+    cache = app.extensions["page_cache"]
+    app.config["PAGE_CACHE_ENABLED"] = True
+    cache.backend.clear()
+    yield cache
+    app.config["PAGE_CACHE_ENABLED"] = False
+    cache.backend.clear()
+
+
+def test_homepage_is_cached_for_anonymous_users(test_client, page_cache):
+    """
+    Test that anonymous homepage requests are served from the page cache with ETag and Cache-Control.
+    """
+    first = test_client.get("/")
+    second = test_client.get("/")
+
+    assert first.headers["X-Page-Cache"] == "MISS"
+    assert second.headers["X-Page-Cache"] == "HIT"
+    assert first.data == second.data
+    assert second.headers["Cache-Control"] == f"public, max-age={page_cache.max_age}"
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+    revalidated = test_client.get("/", headers={"If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+
+def test_page_cache_keys_include_template_version(test_client, page_cache):
+    """
+    Test that a new template version does not reuse pages cached by the previous one.
+    """
+    test_client.get("/")
+    original = page_cache.template_version
+    try:
+        page_cache.template_version = "new-version"
+        assert test_client.get("/").headers["X-Page-Cache"] == "MISS"
+    finally:
+        page_cache.template_version = original
+
+
+def test_page_cache_skips_authenticated_users(test_client, page_cache):
+    """
+    Test that pages rendered for logged in users are neither cached nor served from the cache.
+    """
+    test_client.get("/")
+    login(test_client, "author1@example.com", "test1234")
+    response = test_client.get("/")
+    logout(test_client)
+
+    assert response.status_code == 200
+    assert "X-Page-Cache" not in response.headers
+
+
+def test_page_cache_is_invalidated_when_datasets_change(test_client, page_cache):
+    """
+    Test that committing changes to datasets or comments invalidates the cached pages.
+    """
+    assert test_client.get("/").headers["X-Page-Cache"] == "MISS"
+    assert test_client.get("/").headers["X-Page-Cache"] == "HIT"
+
+    with test_client.application.app_context():
+        ds_meta = DSMetaData.query.filter_by(dataset_doi="10.1234/dataset1").first()
+        original_title = ds_meta.title
+        ds_meta.title = "Renamed Dataset 1"
+        db.session.commit()
+
+    response = test_client.get("/")
+    assert response.headers["X-Page-Cache"] == "MISS"
+    assert b"Renamed Dataset 1" in response.data
+
+    with test_client.application.app_context():
+        ds_meta = DSMetaData.query.filter_by(dataset_doi="10.1234/dataset1").first()
+        ds_meta.title = original_title
+        db.session.commit()
+
+    # Download records are written on every visit and do not invalidate the cache
+    test_client.get("/")
+    with test_client.application.app_context():
+        dataset = DataSet.query.first()
+        db.session.add(DSDownloadRecord(dataset_id=dataset.id, download_cookie="page-cache-test"))
+        db.session.commit()
+    assert test_client.get("/").headers["X-Page-Cache"] == "HIT"
+
+
+def test_dataset_page_is_cached_but_still_records_views(test_client, page_cache):
+    """
+    Test that the DOI page is cached for anonymous users while views keep being recorded.
+    """
+    test_client.get("/doi/10.1234/dataset2/")
+    response = test_client.get("/doi/10.1234/dataset2/")
+
+    assert response.status_code == 200
+    assert response.headers["X-Page-Cache"] == "HIT"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert "view_cookie" in response.headers.get("Set-Cookie", "")
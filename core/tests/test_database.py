@@ -0,0 +1,37 @@
+import os
+
+from core.managers.config_manager import engine_options
+
+
+def test_metrics_endpoint_reports_connection_pool(test_client):
+    """
+    Test that the connection pool state of the primary engine is exposed on /metrics.
+    """
+    test_client.get("/")
+
+    body = test_client.get("/metrics").data.decode("utf-8")
+    pid = os.getpid()
+    assert f'db_pool_checked_out{{bind="primary",pid="{pid}"}}' in body
+    assert f'db_pool_size{{bind="primary",pid="{pid}"}}' in body
+
+    connections_prefix = f'db_pool_connections_total{{bind="primary",pid="{pid}"}}'
+    connections_line = next(line for line in body.splitlines() if line.startswith(connections_prefix))
+    assert int(connections_line.split()[-1]) >= 0
+
+
+def test_engine_options_can_be_overridden_from_the_environment(monkeypatch):
+    """
+    Test that the pool options of a config default to its own values and can be set through the environment.
+    """
+    options = engine_options(pool_size=5, max_overflow=10)
+    assert options["pool_size"] == 5
+    assert options["max_overflow"] == 10
+    assert options["pool_pre_ping"] is True
+
+    monkeypatch.setenv("DB_POOL_SIZE", "30")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "600")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    options = engine_options(pool_size=5, max_overflow=10)
+    assert options["pool_size"] == 30
+    assert options["pool_recycle"] == 600
+    assert options["pool_pre_ping"] is False
@@ -0,0 +1,56 @@
+import os
+
+
+def test_metrics_endpoint_reports_homepage_queries(test_client):
+    """
+    Test that requests are instrumented and exposed in Prometheus format on /metrics.
+    """
+    test_client.get("/")
+
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+
+    body = response.data.decode("utf-8")
+    pid = os.getpid()
+    assert f'http_requests_total{{endpoint="public.index",method="GET",status="200",pid="{pid}"}}' in body
+    assert f'http_request_duration_seconds_count{{endpoint="public.index",pid="{pid}"}}' in body
+
+    sql_prefix = f'http_request_sql_queries_total{{endpoint="public.index",pid="{pid}"}}'
+    sql_line = next(line for line in body.splitlines() if line.startswith(sql_prefix))
+    assert float(sql_line.split()[-1]) > 0, "Homepage SQL statements were not counted."
+
+
+def test_server_timing_header(test_client):
+    """
+    Test that the Server-Timing header is only sent when enabled.
+    """
+    app = test_client.application
+    original = app.config.get("SERVER_TIMING_HEADER")
+    try:
+        app.config["SERVER_TIMING_HEADER"] = True
+        response = test_client.get("/")
+        assert "sql;dur=" in response.headers.get("Server-Timing", "")
+        assert "total;dur=" in response.headers.get("Server-Timing", "")
+
+        app.config["SERVER_TIMING_HEADER"] = False
+        response = test_client.get("/")
+        assert "Server-Timing" not in response.headers
+    finally:
+        app.config["SERVER_TIMING_HEADER"] = original
+
+
+def test_slow_requests_are_logged_with_queries(test_client, caplog):
+    """
+    Test that requests over the threshold are logged together with the SQL statements they ran.
+    """
+    app = test_client.application
+    original = app.config.get("SLOW_REQUEST_THRESHOLD_MS")
+    try:
+        app.config["SLOW_REQUEST_THRESHOLD_MS"] = 0
+        with caplog.at_level("WARNING", logger="instrumentation"):
+            test_client.get("/")
+    finally:
+        app.config["SLOW_REQUEST_THRESHOLD_MS"] = original
+
+    assert any("Slow request GET /" in record.message and "SELECT" in record.message for record in caplog.records)
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+from rosemary.commands.startup_profile import parse_import_times
+
+
+def run_python(code):
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+
+
+def test_cold_start_stays_within_budget():
+    """
+    Test that importing the package and building the application in a new interpreter stays under
+    STARTUP_BUDGET_SECONDS, and that importing the package does not build an application.
+    """
+    budget = float(os.getenv("STARTUP_BUDGET_SECONDS", "5"))
+    result = run_python(
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "import app\n"
+        "assert 'app' not in vars(app), 'Importing the package built the application.'\n"
+        "app.create_app('testing')\n"
+        "print(f'startup={time.perf_counter() - start}')\n"
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    startup = float(next(line for line in result.stdout.splitlines() if line.startswith("startup="))[8:])
+    assert startup < budget, f"Cold start took {startup:.2f}s, over the {budget:.2f}s budget."
+
+    imported = {name.strip() for _, _, name in parse_import_times(result.stderr)}
+    for module in ("docker", "flamapy", "antlr4", "numpy", "qrcode"):
+        assert module not in imported, f"{module} is imported at startup."
+
+
+def test_application_starts_without_docker():
+    """
+    Test that the application is built on hosts without Docker: the webhook client connects on first use.
+    """
+    result = run_python("import sys\nsys.modules['docker'] = None\nimport app\napp.create_app('testing')\n")
+    assert result.returncode == 0, result.stderr[-2000:]
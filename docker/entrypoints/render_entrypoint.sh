@@ -52,5 +52,5 @@ else
 fi
 
 # Start the application using Gunicorn, binding it to port 80
-# Set the logging level to info and the timeout to 3600 seconds
-exec gunicorn --bind 0.0.0.0:80 app:app --log-level info --timeout 3600
+# Worker class, worker count and timeout are read from gunicorn.conf.py (gevent workers by default)
+exec gunicorn --config gunicorn.conf.py --bind 0.0.0.0:80 app:app
@@ -0,0 +1,69 @@
+"""
+Runs fakenodo. By default it is served by Gunicorn with threaded workers; `--dev` uses Flask's debug server.
+
+    python -m fakenodo                       # 0.0.0.0:$PORT (5001 by default)
+    python -m fakenodo --workers 4 --threads 16
+    python -m fakenodo --dev
+"""
+
+import argparse
+import os
+
+from fakenodo.app import create_app, data_directory
+from fakenodo.storage import create_storage
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m fakenodo", description="Fake Zenodo deposition API")
+    parser.add_argument("--host", default=os.getenv("FAKENODO_HOST", "0.0.0.0"))
+    # PORT is the variable set by Render/Heroku-like platforms
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "5001")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("FAKENODO_WORKERS", "2")),
+        help="Server processes. Only the sqlite storage can be shared, other storages use a single one.",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=int(os.getenv("FAKENODO_THREADS", "8")), help="Threads per worker."
+    )
+    parser.add_argument("--dev", action="store_true", help="Run Flask's debug server instead of Gunicorn.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.dev:
+        create_app().run(host=args.host, port=args.port, debug=True, threaded=True)
+        return
+
+    from gunicorn.app.base import BaseApplication
+
+    backend = os.getenv("FAKENODO_STORAGE", "sqlite")
+    workers = args.workers
+    if backend == "sqlite":
+        # Create the database and switch it to WAL once, before the workers race to do it
+        create_storage(backend, data_directory()).close()
+    elif workers > 1:
+        print(f"fakenodo: the {backend} storage cannot be shared between processes, using a single worker")
+        workers = 1
+
+    class FakenodoServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("threads", args.threads)
+            # Injected latencies can be long, and uploads are written to disk before they are answered
+            self.cfg.set("timeout", 120)
+
+        def load(self):
+            # Each worker opens its own storage after forking
+            return create_app()
+
+    FakenodoServer().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,264 @@
-from flask import Flask, request, jsonify
+"""
+Fake Zenodo deposition API used by the application instead of the real one.
+
+Every setting is read from the environment:
+
+    FAKENODO_STORAGE        sqlite (default), jsonlog or memory, see fakenodo.storage
+    FAKENODO_DATA_DIR       directory of the database, the log and the uploaded files (default fakenodo/data)
+    FAKENODO_LATENCY_MS     delay added to every request: a number of milliseconds or a range such as 50-500
+    FAKENODO_ERROR_RATE     ratio of requests answered with an injected error (default 0)
+    FAKENODO_ERROR_STATUSES comma-separated statuses of the injected errors (default 503)
+    FAKENODO_ERROR_PHASE    before: the request is not processed; after: it is, but the client gets the error
+    FAKENODO_FAULT_SEED     seed of the injected latencies and errors, to repeat a run
+"""
+
 import os
+import random
+import time
 import uuid
-import copy
 
-app = Flask(__name__)
+from flask import Flask, current_app, jsonify, request, send_file
+
+from fakenodo.storage import BlobStore, DepositionNotFound, DepositionPublished, create_storage
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
 
-DATASETS = {}
-VERSIONS = {}
 
 def generate_doi():
     return f"10.1234/fakezenodo.{uuid.uuid4().hex[:8]}"
 
-@app.route("/deposit/depositions", methods=["POST"])
-def create_deposition():
-    data = request.get_json()
-    record_id = str(uuid.uuid4())
-    DATASETS[record_id] = {
-        "id": record_id,
-        "metadata": data.get("metadata", {}),
-        "files": [],
-        "doi": None,
-        "published_versions": []
-    }
-    return jsonify(DATASETS[record_id]), 201
-
-@app.route("/deposit/depositions/<record_id>", methods=["PUT"])
-def edit_metadata(record_id):
-    if record_id not in DATASETS:
-        return jsonify({"error": "Deposition not found"}), 404
-    data = request.get_json()
-    DATASETS[record_id]["metadata"].update(data.get("metadata", {}))
-    return jsonify(DATASETS[record_id]), 200
 
-@app.route("/deposit/depositions/<record_id>/files", methods=["POST"])
-def upload_file(record_id):
-    if record_id not in DATASETS:
-        return jsonify({"error": "Deposition not found"}), 404
-    file_info = request.form.to_dict()
-    DATASETS[record_id]["files"].append(file_info.get("name", "unnamed_file"))
-    return jsonify({"message": "File added", "files": DATASETS[record_id]["files"]}), 201
+def parse_latency(value):
+    """(lowest, highest) delay in seconds of a FAKENODO_LATENCY_MS value such as "200" or "50-500"."""
+    if not value:
+        return 0.0, 0.0
+    low, _, high = value.partition("-")
+    low = float(low) / 1000
+    return low, float(high) / 1000 if high else low
 
-@app.route("/deposit/depositions/<record_id>/actions/publish", methods=["POST"])
-def publish_deposition(record_id):
-    if record_id not in DATASETS:
-        return jsonify({"error": "Deposition not found"}), 404
-    version_id = str(uuid.uuid4())
-    new_doi = generate_doi()
-    version_data = copy.deepcopy(DATASETS[record_id])
-    version_data["doi"] = new_doi
-    VERSIONS[version_id] = version_data
-    DATASETS[record_id]["published_versions"].append(version_data)
-    return jsonify(version_data), 202
-
-@app.route("/deposit/depositions/<record_id>/versions", methods=["GET"])
-def list_versions(record_id):
-    if record_id not in DATASETS:
-        return jsonify({"error": "Deposition not found"}), 404
-    return jsonify(DATASETS[record_id]["published_versions"]), 200
 
-@app.route("/deposit/depositions/<record_id>", methods=["GET"])
-def get_deposition(record_id):
-    if record_id not in DATASETS:
+class FaultInjector:
+    """Delays requests and answers some of them with errors, so clients can be tested against a flaky Zenodo."""
+
+    def __init__(self, latency=(0.0, 0.0), error_rate=0.0, error_statuses=(503,), phase="before", seed=None):
+        if phase not in ("before", "after"):
+            raise ValueError(f"Unknown fault phase '{phase}': use before or after")
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.phase = phase
+        self.random = random.Random(seed)
+
+    @classmethod
+    def from_environment(cls):
+        return cls(
+            latency=parse_latency(os.getenv("FAKENODO_LATENCY_MS", "")),
+            error_rate=float(os.getenv("FAKENODO_ERROR_RATE", "0")),
+            error_statuses=[int(status) for status in os.getenv("FAKENODO_ERROR_STATUSES", "503").split(",")],
+            phase=os.getenv("FAKENODO_ERROR_PHASE", "before"),
+            seed=os.getenv("FAKENODO_FAULT_SEED"),
+        )
+
+    @property
+    def enabled(self):
+        return self.latency[1] > 0 or self.error_rate > 0
+
+    def delay(self):
+        low, high = self.latency
+        if high > 0:
+            time.sleep(self.random.uniform(low, high))
+
+    def error(self):
+        """Injected error response for this request, if it draws one."""
+        if self.error_rate <= 0 or self.random.random() >= self.error_rate:
+            return None
+        status = self.random.choice(self.error_statuses)
+        response = jsonify({"status": status, "message": "Error injected by fakenodo"})
+        response.status_code = status
+        if status in (429, 503):
+            response.headers["Retry-After"] = "1"
+        return response
+
+    def init_app(self, app):
+        @app.before_request
+        def inject_before():
+            self.delay()
+            if self.phase == "before":
+                return self.error()
+
+        @app.after_request
+        def inject_after(response):
+            if self.phase == "after" and response.status_code < 400:
+                return self.error() or response
+            return response
+
+
+def _pagination():
+    try:
+        page = int(request.args.get("page", 1))
+        size = int(request.args.get("size", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return None
+    if page < 1 or not 1 <= size <= MAX_PAGE_SIZE:
+        return None
+    return page, size
+
+
+def _file_response(deposition_id, record):
+    file = {key: value for key, value in record.items() if key != "sha256"}
+    base = f"{request.host_url.rstrip('/')}/deposit/depositions/{deposition_id}/files/{record['id']}"
+    file["links"] = {"self": base, "download": f"{base}/content"}
+    return file
+
+
+def _deposition_response(deposition):
+    deposition["files"] = [_file_response(deposition["id"], file) for file in deposition["files"]]
+    for version in deposition.get("published_versions", []):
+        version["files"] = [_file_response(deposition["id"], file) for file in version["files"]]
+    return deposition
+
+
+def data_directory():
+    return os.getenv("FAKENODO_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+
+def create_app(storage=None, blobs=None, faults=None):
+    app = Flask(__name__)
+
+    data_dir = data_directory()
+    app.extensions["fakenodo"] = (
+        storage if storage is not None else create_storage(os.getenv("FAKENODO_STORAGE", "sqlite"), data_dir)
+    )
+    app.extensions["fakenodo_blobs"] = blobs if blobs is not None else BlobStore(os.path.join(data_dir, "files"))
+
+    faults = faults if faults is not None else FaultInjector.from_environment()
+    if faults.enabled:
+        faults.init_app(app)
+
+    def get_storage():
+        return current_app.extensions["fakenodo"]
+
+    @app.errorhandler(DepositionNotFound)
+    def deposition_not_found(e):
         return jsonify({"error": "Deposition not found"}), 404
-    return jsonify(DATASETS[record_id]), 200
 
-if __name__ == "__main__":
-    # Use PORT provided by Render/Heroku-like platforms, fallback to 5001 locally
-    port = int(os.getenv("PORT", "5001"))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    @app.errorhandler(DepositionPublished)
+    def deposition_published(e):
+        return jsonify({"error": "Published depositions cannot be deleted"}), 403
+
+    @app.route("/deposit/depositions", methods=["POST"])
+    def create_deposition():
+        data = request.get_json(silent=True) or {}
+        return jsonify(_deposition_response(get_storage().create_deposition(data.get("metadata", {})))), 201
+
+    @app.route("/deposit/depositions", methods=["GET"])
+    def list_depositions():
+        pagination = _pagination()
+        if pagination is None:
+            return jsonify({"error": f"page must be positive and size between 1 and {MAX_PAGE_SIZE}"}), 400
+        page, size = pagination
+
+        depositions, total = get_storage().list_depositions((page - 1) * size, size)
+        response = jsonify([_deposition_response(deposition) for deposition in depositions])
+        response.headers["X-Total-Count"] = str(total)
+
+        links = []
+        if page * size < total:
+            links.append(f'<{request.base_url}?page={page + 1}&size={size}>; rel="next"')
+        if page > 1:
+            links.append(f'<{request.base_url}?page={page - 1}&size={size}>; rel="prev"')
+        if links:
+            response.headers["Link"] = ", ".join(links)
+        return response, 200
+
+    @app.route("/deposit/depositions/<int:deposition_id>", methods=["GET"])
+    def get_deposition(deposition_id):
+        return jsonify(_deposition_response(get_storage().get_deposition(deposition_id))), 200
+
+    @app.route("/deposit/depositions/<int:deposition_id>", methods=["PUT"])
+    def edit_metadata(deposition_id):
+        data = request.get_json(silent=True) or {}
+        return (
+            jsonify(_deposition_response(get_storage().update_metadata(deposition_id, data.get("metadata", {})))),
+            200,
+        )
+
+    @app.route("/deposit/depositions/<int:deposition_id>", methods=["DELETE"])
+    def delete_deposition(deposition_id):
+        get_storage().delete_deposition(deposition_id)
+        return "", 204
+
+    @app.route("/deposit/depositions/<int:deposition_id>/files", methods=["POST"])
+    def upload_file(deposition_id):
+        # Fail before storing the content of a file that will not be recorded
+        get_storage().get_deposition(deposition_id)
+
+        file = request.files.get("file")
+        if file is None:
+            return jsonify({"error": "The request has no file"}), 400
+        filename = request.form.get("name") or file.filename or "unnamed_file"
+
+        sha256, md5, size = current_app.extensions["fakenodo_blobs"].put(file.stream)
+        expected = request.form.get("checksum", "").removeprefix("md5:")
+        if expected and expected != md5:
+            return jsonify({"error": f"Checksum mismatch: expected {expected}, received {md5}"}), 400
+
+        # A file with the same name is replaced, so retried uploads do not duplicate it
+        record = get_storage().put_file(deposition_id, filename, sha256, md5, size)
+        return jsonify(_file_response(deposition_id, record)), 201
+
+    @app.route("/deposit/depositions/<int:deposition_id>/files", methods=["GET"])
+    def list_files(deposition_id):
+        deposition = get_storage().get_deposition(deposition_id)
+        return jsonify([_file_response(deposition_id, file) for file in deposition["files"]]), 200
+
+    def find_file(deposition_id, file_id):
+        for file in get_storage().get_deposition(deposition_id)["files"]:
+            if file["id"] == file_id:
+                return file
+        return None
+
+    @app.route("/deposit/depositions/<int:deposition_id>/files/<file_id>", methods=["GET"])
+    def get_file(deposition_id, file_id):
+        file = find_file(deposition_id, file_id)
+        if file is None:
+            return jsonify({"error": "File not found"}), 404
+        return jsonify(_file_response(deposition_id, file)), 200
+
+    @app.route("/deposit/depositions/<int:deposition_id>/files/<file_id>/content", methods=["GET"])
+    def download_file(deposition_id, file_id):
+        file = find_file(deposition_id, file_id)
+        if file is None:
+            return jsonify({"error": "File not found"}), 404
+        response = send_file(
+            current_app.extensions["fakenodo_blobs"].path(file["sha256"]),
+            as_attachment=True,
+            download_name=file["filename"],
+            etag=file["checksum"],
+        )
+        response.headers["Content-MD5"] = file["checksum"]
+        return response
+
+    @app.route("/deposit/depositions/<int:deposition_id>/actions/publish", methods=["POST"])
+    def publish_deposition(deposition_id):
+        version = get_storage().publish(deposition_id, generate_doi())
+        version["files"] = [_file_response(deposition_id, file) for file in version["files"]]
+        return jsonify(version), 202
+
+    @app.route("/deposit/depositions/<int:deposition_id>/versions", methods=["GET"])
+    def list_versions(deposition_id):
+        versions = get_storage().list_versions(deposition_id)
+        for version in versions:
+            version["files"] = [_file_response(deposition_id, file) for file in version["files"]]
+        return jsonify(versions), 200
+
+    return app
+
+
+def __getattr__(name):
+    # `gunicorn fakenodo.app:app` still works, but importing the module does not open the storage
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
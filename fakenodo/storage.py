@@ -0,0 +1,455 @@
+"""
+Storage backends of fakenodo. Depositions, their files and their published versions are kept by one of:
+
+    sqlite    SQLite database in WAL mode. Safe to share between the threads and processes of the server.
+    jsonlog   Append-only log of JSON events, replayed at startup. Safe between threads of a single process.
+    memory    Nothing is persisted, as the original fakenodo.
+
+The content of the uploaded files is kept apart, in a BlobStore, addressed by its SHA-256 so the same file
+uploaded to many depositions is only stored once. Contents are never removed: a load test uploading the same
+files over and over only stores them once, and no upload can race with the removal of its content.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+BLOB_CHUNK_SIZE = 1024 * 1024
+
+
+class DepositionNotFound(Exception):
+    pass
+
+
+class DepositionPublished(Exception):
+    pass
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class BlobStore:
+    """File contents addressed by their SHA-256, written atomically under `directory`."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, sha256):
+        return os.path.join(self.directory, sha256[:2], sha256)
+
+    def put(self, stream):
+        """Stores the content of `stream`, returning its (sha256, md5, size)."""
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                while chunk := stream.read(BLOB_CHUNK_SIZE):
+                    sha256.update(chunk)
+                    md5.update(chunk)
+                    size += len(chunk)
+                    file.write(chunk)
+            path = self.path(sha256.hexdigest())
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Two uploads of the same content write the same bytes: the last rename wins harmlessly
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return sha256.hexdigest(), md5.hexdigest(), size
+
+
+class Storage(ABC):
+    """
+    Interface of the backends. Depositions are returned as the dictionaries sent to the clients; their
+    `files` hold the file records, whose `sha256` locates the content in the BlobStore.
+    """
+
+    # Whether several server processes can share the backend
+    multiprocess = False
+
+    @abstractmethod
+    def create_deposition(self, metadata):
+        """Creates an unpublished deposition with `metadata` and returns it."""
+
+    @abstractmethod
+    def get_deposition(self, deposition_id):
+        """The deposition with that id; raises DepositionNotFound when there is none."""
+
+    @abstractmethod
+    def list_depositions(self, offset, limit):
+        """The depositions in the page, most recent first, and the total number of depositions."""
+
+    @abstractmethod
+    def update_metadata(self, deposition_id, metadata):
+        """Replaces the metadata of the deposition and returns it."""
+
+    @abstractmethod
+    def delete_deposition(self, deposition_id):
+        """Deletes an unpublished deposition."""
+
+    @abstractmethod
+    def put_file(self, deposition_id, filename, sha256, md5, size):
+        """Adds a file to the deposition, replacing the one with the same name, and returns its record."""
+
+    @abstractmethod
+    def publish(self, deposition_id, doi):
+        """Records a published version of the deposition with `doi`, and returns it."""
+
+    @abstractmethod
+    def list_versions(self, deposition_id):
+        """The records of the published versions of the deposition."""
+
+    def close(self):
+        pass
+
+
+def _file_record(filename, sha256, md5, size):
+    return {
+        "id": uuid.uuid4().hex,
+        "filename": filename,
+        "filesize": size,
+        "checksum": md5,
+        "sha256": sha256,
+        "created": _now(),
+    }
+
+
+def _version_record(deposition, version_id, doi):
+    version = copy.deepcopy(deposition)
+    version.pop("published_versions", None)
+    version.update({"version_id": version_id, "doi": doi, "state": "done", "submitted": True, "published": _now()})
+    return version
+
+
+class MemoryStorage(Storage):
+    """
+    Keeps the depositions in a dictionary guarded by a lock. Subclasses persist each change by overriding
+    `_record`.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._depositions = {}
+        self._next_id = 1
+        self._next_version_id = 1
+
+    def _record(self, event):
+        pass
+
+    def _apply(self, event):
+        kind = event["event"]
+        if kind == "create":
+            deposition = event["deposition"]
+            self._depositions[deposition["id"]] = deposition
+            self._next_id = max(self._next_id, deposition["id"] + 1)
+            return deposition
+
+        deposition = self._depositions.get(event["id"])
+        if deposition is None:
+            raise DepositionNotFound(event["id"])
+        if kind == "metadata":
+            deposition["metadata"].update(event["metadata"])
+            deposition["modified"] = event["modified"]
+        elif kind == "delete":
+            del self._depositions[event["id"]]
+        elif kind == "file":
+            record = event["file"]
+            deposition["files"] = [file for file in deposition["files"] if file["filename"] != record["filename"]]
+            deposition["files"].append(record)
+            deposition["modified"] = record["created"]
+            return record
+        elif kind == "publish":
+            version = event["version"]
+            deposition["published_versions"].append(version)
+            deposition.update({"doi": version["doi"], "state": "done", "submitted": True})
+            self._next_version_id = max(self._next_version_id, version["version_id"] + 1)
+            return version
+        return deposition
+
+    def _change(self, event):
+        with self._lock:
+            result = self._apply(event)
+            self._record(event)
+            return copy.deepcopy(result)
+
+    def create_deposition(self, metadata):
+        with self._lock:
+            now = _now()
+            deposition = {
+                "id": self._next_id,
+                "created": now,
+                "modified": now,
+                "metadata": metadata,
+                "files": [],
+                "doi": None,
+                "state": "unsubmitted",
+                "submitted": False,
+                "published_versions": [],
+            }
+            return self._change({"event": "create", "deposition": deposition})
+
+    def get_deposition(self, deposition_id):
+        with self._lock:
+            deposition = self._depositions.get(deposition_id)
+            if deposition is None:
+                raise DepositionNotFound(deposition_id)
+            return copy.deepcopy(deposition)
+
+    def list_depositions(self, offset, limit):
+        with self._lock:
+            ids = sorted(self._depositions, reverse=True)
+            return [copy.deepcopy(self._depositions[i]) for i in ids[offset : offset + limit]], len(ids)
+
+    def update_metadata(self, deposition_id, metadata):
+        return self._change({"event": "metadata", "id": deposition_id, "metadata": metadata, "modified": _now()})
+
+    def delete_deposition(self, deposition_id):
+        with self._lock:
+            deposition = self.get_deposition(deposition_id)
+            if deposition["submitted"]:
+                raise DepositionPublished(deposition_id)
+            self._change({"event": "delete", "id": deposition_id})
+
+    def put_file(self, deposition_id, filename, sha256, md5, size):
+        return self._change({"event": "file", "id": deposition_id, "file": _file_record(filename, sha256, md5, size)})
+
+    def publish(self, deposition_id, doi):
+        with self._lock:
+            version = _version_record(self.get_deposition(deposition_id), self._next_version_id, doi)
+            return self._change({"event": "publish", "id": deposition_id, "version": version})
+
+    def list_versions(self, deposition_id):
+        return self.get_deposition(deposition_id)["published_versions"]
+
+
+class JSONLogStorage(MemoryStorage):
+    """
+    MemoryStorage that appends every change to a JSON lines file and replays it at startup. A change is
+    flushed to the operating system before it is acknowledged; with `fsync` it is also on disk.
+    """
+
+    def __init__(self, path, fsync=False):
+        super().__init__()
+        self.path = path
+        self.fsync = fsync
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if os.path.exists(path):
+            valid_length = 0
+            with open(path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break
+                    self._apply(event)
+                    valid_length += len(line)
+            # Drop the change that was being written when the server stopped, so new ones follow the last valid
+            if valid_length != os.path.getsize(path):
+                os.truncate(path, valid_length)
+        self._log = open(path, "a", encoding="utf-8")
+
+    def _record(self, event):
+        self._log.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+
+    def close(self):
+        self._log.close()
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deposition (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created TEXT NOT NULL,
+    modified TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    doi TEXT,
+    submitted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS deposition_file (
+    id TEXT PRIMARY KEY,
+    deposition_id INTEGER NOT NULL REFERENCES deposition (id) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    filesize INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    created TEXT NOT NULL,
+    UNIQUE (deposition_id, filename)
+);
+CREATE INDEX IF NOT EXISTS ix_deposition_file_sha256 ON deposition_file (sha256);
+CREATE TABLE IF NOT EXISTS deposition_version (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deposition_id INTEGER NOT NULL REFERENCES deposition (id) ON DELETE CASCADE,
+    doi TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_deposition_version_deposition_id ON deposition_version (deposition_id);
+"""
+
+
+class SQLiteStorage(Storage):
+    """
+    Depositions in a SQLite database in WAL mode, so readers never wait for a writer. Every thread has its own
+    connection, and every change runs in an immediate transaction: concurrent writers, in this process or in
+    another worker, queue on the database lock for up to `busy_timeout` seconds instead of failing.
+    """
+
+    multiprocess = True
+
+    def __init__(self, path, busy_timeout=30):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Every statement of the schema is idempotent and runs in its own transaction
+        self._connection().executescript(SQLITE_SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _deposition(self, connection, row):
+        files = connection.execute(
+            "SELECT id, filename, filesize, checksum, sha256, created FROM deposition_file "
+            "WHERE deposition_id = ? ORDER BY created, rowid",
+            (row["id"],),
+        ).fetchall()
+        versions = connection.execute(
+            "SELECT data FROM deposition_version WHERE deposition_id = ? ORDER BY id", (row["id"],)
+        ).fetchall()
+        return {
+            "id": row["id"],
+            "created": row["created"],
+            "modified": row["modified"],
+            "metadata": json.loads(row["metadata"]),
+            "files": [dict(file) for file in files],
+            "doi": row["doi"],
+            "state": "done" if row["submitted"] else "unsubmitted",
+            "submitted": bool(row["submitted"]),
+            "published_versions": [json.loads(version["data"]) for version in versions],
+        }
+
+    def _get(self, connection, deposition_id):
+        row = connection.execute("SELECT * FROM deposition WHERE id = ?", (deposition_id,)).fetchone()
+        if row is None:
+            raise DepositionNotFound(deposition_id)
+        return self._deposition(connection, row)
+
+    def create_deposition(self, metadata):
+        now = _now()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "INSERT INTO deposition (created, modified, metadata) VALUES (?, ?, ?)",
+                (now, now, json.dumps(metadata)),
+            )
+            return self._get(connection, cursor.lastrowid)
+
+    def get_deposition(self, deposition_id):
+        return self._get(self._connection(), deposition_id)
+
+    def list_depositions(self, offset, limit):
+        connection = self._connection()
+        rows = connection.execute(
+            "SELECT * FROM deposition ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall()
+        total = connection.execute("SELECT COUNT(*) FROM deposition").fetchone()[0]
+        return [self._deposition(connection, row) for row in rows], total
+
+    def update_metadata(self, deposition_id, metadata):
+        with self._transaction() as connection:
+            current = self._get(connection, deposition_id)["metadata"]
+            current.update(metadata)
+            connection.execute(
+                "UPDATE deposition SET metadata = ?, modified = ? WHERE id = ?",
+                (json.dumps(current), _now(), deposition_id),
+            )
+            return self._get(connection, deposition_id)
+
+    def delete_deposition(self, deposition_id):
+        with self._transaction() as connection:
+            deposition = self._get(connection, deposition_id)
+            if deposition["submitted"]:
+                raise DepositionPublished(deposition_id)
+            connection.execute("DELETE FROM deposition WHERE id = ?", (deposition_id,))
+
+    def put_file(self, deposition_id, filename, sha256, md5, size):
+        record = _file_record(filename, sha256, md5, size)
+        with self._transaction() as connection:
+            self._get(connection, deposition_id)
+            connection.execute(
+                "DELETE FROM deposition_file WHERE deposition_id = ? AND filename = ?", (deposition_id, filename)
+            )
+            connection.execute(
+                "INSERT INTO deposition_file (id, deposition_id, filename, filesize, checksum, sha256, created) "
+                "VALUES (:id, :deposition_id, :filename, :filesize, :checksum, :sha256, :created)",
+                {**record, "deposition_id": deposition_id},
+            )
+            connection.execute("UPDATE deposition SET modified = ? WHERE id = ?", (record["created"], deposition_id))
+        return record
+
+    def publish(self, deposition_id, doi):
+        with self._transaction() as connection:
+            deposition = self._get(connection, deposition_id)
+            cursor = connection.execute(
+                "INSERT INTO deposition_version (deposition_id, doi, data) VALUES (?, ?, '{}')", (deposition_id, doi)
+            )
+            version = _version_record(deposition, cursor.lastrowid, doi)
+            connection.execute(
+                "UPDATE deposition_version SET data = ? WHERE id = ?", (json.dumps(version), version["version_id"])
+            )
+            connection.execute("UPDATE deposition SET doi = ?, submitted = 1 WHERE id = ?", (doi, deposition_id))
+            return version
+
+    def list_versions(self, deposition_id):
+        return self.get_deposition(deposition_id)["published_versions"]
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def create_storage(backend, data_dir):
+    if backend == "sqlite":
+        return SQLiteStorage(os.path.join(data_dir, "fakenodo.db"))
+    if backend == "jsonlog":
+        return JSONLogStorage(os.path.join(data_dir, "fakenodo.jsonl"))
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Unknown fakenodo storage '{backend}': use sqlite, jsonlog or memory")
@@ -0,0 +1,59 @@
+"""
+Gunicorn settings for the production and Render entrypoints.
+
+By default the application is served by gevent workers: every worker runs many requests as greenlets, so a
+request waiting on fakenodo, the database or a file download no longer blocks the others. Every setting can
+be overridden through the environment:
+
+    GUNICORN_WORKER_CLASS         gevent (default) or sync
+    GUNICORN_WORKERS              worker processes, CPU cores (gevent) or 2 x CPU cores + 1 (sync) by default
+    GUNICORN_WORKER_CONNECTIONS   concurrent requests per gevent worker (default 1000)
+    GUNICORN_TIMEOUT              seconds before a silent worker is restarted
+    GUNICORN_BIND                 address to listen on (default 0.0.0.0:5000)
+    GUNICORN_LOG_LEVEL            log level (default info)
+    DB_MAX_CONNECTIONS            connections MariaDB accepts (max_connections, 151 by default)
+    DB_RESERVED_CONNECTIONS       connections left for migrations, rosemary and admin sessions (default 16)
+"""
+
+import multiprocessing
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+
+if worker_class == "gevent":
+    # Patch before anything else imports socket or ssl. The workers patch again after forking, which is a
+    # no-op, but patching the arbiter too avoids the "monkey-patching ssl after ssl has been imported"
+    # warnings. PyMySQL is pure Python, so its connections become cooperative once socket is patched.
+    from gevent import monkey
+
+    monkey.patch_all()
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+# A gevent worker already serves many requests at once, so one per core is enough. Sync workers serve a single
+# request each and keep the usual 2 x cores + 1.
+default_workers = multiprocessing.cpu_count() if worker_class == "gevent" else multiprocessing.cpu_count() * 2 + 1
+workers = int(os.getenv("GUNICORN_WORKERS", default_workers))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 1000))
+
+# Every worker has its own connection pool, and under load a gevent worker fills it. Unless DB_POOL_SIZE and
+# DB_MAX_OVERFLOW are set, split the connections MariaDB accepts between the workers, so that
+# workers x (pool_size + max_overflow) stays under max_connections. Each worker gets at most the 10 + 20
+# connections of the config defaults. The workers import the app after this file runs, so they inherit these
+# variables.
+db_max_connections = int(os.getenv("DB_MAX_CONNECTIONS", 151))
+db_reserved_connections = int(os.getenv("DB_RESERVED_CONNECTIONS", 16))
+connections_per_worker = max(min((db_max_connections - db_reserved_connections) // workers, 30), 2)
+os.environ.setdefault("DB_POOL_SIZE", str(max(connections_per_worker // 3, 1)))
+os.environ.setdefault("DB_MAX_OVERFLOW", str(max(connections_per_worker - int(os.environ["DB_POOL_SIZE"]), 0)))
+
+# A sync worker is busy for the whole length of a request, so slow uploads to fakenodo need a long timeout.
+# A gevent worker keeps notifying the arbiter while its requests wait, so the timeout only catches a
+# worker whose event loop is stuck.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 3600 if worker_class == "sync" else 120))
+graceful_timeout = 30
+keepalive = 5
+
+# The application must be imported by each worker after gevent has patched it, never by the arbiter
+preload_app = False
+
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
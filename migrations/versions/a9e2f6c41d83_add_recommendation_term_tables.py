@@ -0,0 +1,43 @@
+"""Add recommendation term weight and frequency tables
+
+Revision ID: a9e2f6c41d83
+Revises: f3b9d27e6c15
+Create Date: 2026-02-02 10:18:44.205617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9e2f6c41d83'
+down_revision = 'f3b9d27e6c15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recommendation_term_weight',
+    sa.Column('term', sa.String(length=255, collation='utf8mb4_bin'), nullable=False),
+    sa.Column('dataset_id', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ),
+    sa.PrimaryKeyConstraint('term', 'dataset_id')
+    )
+    with op.batch_alter_table('recommendation_term_weight', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_recommendation_term_weight_dataset_id'), ['dataset_id'], unique=False)
+
+    op.create_table('recommendation_term_frequency',
+    sa.Column('term', sa.String(length=255, collation='utf8mb4_bin'), nullable=False),
+    sa.Column('document_frequency', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('term')
+    )
+    # Existing datasets are indexed with `rosemary recommendations:rebuild --engine content`
+
+
+def downgrade():
+    op.drop_table('recommendation_term_frequency')
+    with op.batch_alter_table('recommendation_term_weight', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_recommendation_term_weight_dataset_id'))
+
+    op.drop_table('recommendation_term_weight')
@@ -0,0 +1,119 @@
+"""Add recommendation index tables
+
+Revision ID: b7c41e9d2f10
+Revises: a23c82207332
+Create Date: 2026-01-12 10:14:52.301446
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c41e9d2f10'
+down_revision = 'a23c82207332'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recommendation_author_index',
+    sa.Column('author_name', sa.String(length=120), nullable=False),
+    sa.Column('dataset_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ),
+    sa.PrimaryKeyConstraint('author_name', 'dataset_id')
+    )
+    with op.batch_alter_table('recommendation_author_index', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_recommendation_author_index_dataset_id'), ['dataset_id'], unique=False)
+
+    op.create_table('recommendation_download_count',
+    sa.Column('dataset_id', sa.Integer(), nullable=False),
+    sa.Column('download_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ),
+    sa.PrimaryKeyConstraint('dataset_id')
+    )
+    op.create_table('dataset_recommendation',
+    sa.Column('dataset_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('recommended_dataset_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ),
+    sa.ForeignKeyConstraint(['recommended_dataset_id'], ['data_set.id'], ),
+    sa.PrimaryKeyConstraint('dataset_id', 'rank')
+    )
+    backfill_recommendations()
+
+
+def backfill_recommendations(top_k=10):
+    """
+    Indexes the existing datasets, as `rosemary recommendations:rebuild --engine authors` does, so their pages
+    keep showing the datasets of the same authors after the upgrade.
+    """
+    author = sa.table('author', sa.column('name'), sa.column('ds_meta_data_id'))
+    data_set = sa.table('data_set', sa.column('id'), sa.column('ds_meta_data_id'))
+    download = sa.table('ds_download_record', sa.column('id'), sa.column('dataset_id'))
+    author_index = sa.table('recommendation_author_index', sa.column('author_name'), sa.column('dataset_id'))
+    download_count = sa.table('recommendation_download_count', sa.column('dataset_id'), sa.column('download_count'))
+    recommendation = sa.table(
+        'dataset_recommendation',
+        sa.column('dataset_id'),
+        sa.column('rank'),
+        sa.column('recommended_dataset_id'),
+        sa.column('score'),
+    )
+
+    op.execute(
+        author_index.insert().from_select(
+            ['author_name', 'dataset_id'],
+            sa.select(author.c.name, data_set.c.id)
+            .join(data_set, data_set.c.ds_meta_data_id == author.c.ds_meta_data_id)
+            .where(author.c.name != '')
+            .distinct(),
+        )
+    )
+    op.execute(
+        download_count.insert().from_select(
+            ['dataset_id', 'download_count'],
+            sa.select(download.c.dataset_id, sa.func.count(download.c.id))
+            .where(download.c.dataset_id.isnot(None))
+            .group_by(download.c.dataset_id),
+        )
+    )
+
+    source, other = author_index.alias('source'), author_index.alias('other')
+    pairs = (
+        sa.select(source.c.dataset_id.label('dataset_id'), other.c.dataset_id.label('recommended_dataset_id'))
+        .join(other, sa.and_(other.c.author_name == source.c.author_name, other.c.dataset_id != source.c.dataset_id))
+        .distinct()
+        .subquery()
+    )
+    score = sa.func.coalesce(download_count.c.download_count, 0)
+    ranked = (
+        sa.select(
+            pairs.c.dataset_id,
+            pairs.c.recommended_dataset_id,
+            score.label('score'),
+            sa.func.row_number()
+            .over(partition_by=pairs.c.dataset_id, order_by=(score.desc(), pairs.c.recommended_dataset_id))
+            .label('rank'),
+        )
+        .outerjoin(download_count, download_count.c.dataset_id == pairs.c.recommended_dataset_id)
+        .subquery()
+    )
+    op.execute(
+        recommendation.insert().from_select(
+            ['dataset_id', 'rank', 'recommended_dataset_id', 'score'],
+            sa.select(ranked.c.dataset_id, ranked.c.rank, ranked.c.recommended_dataset_id, ranked.c.score).where(
+                ranked.c.rank <= top_k
+            ),
+        )
+    )
+
+
+def downgrade():
+    op.drop_table('dataset_recommendation')
+    op.drop_table('recommendation_download_count')
+    with op.batch_alter_table('recommendation_author_index', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_recommendation_author_index_dataset_id'))
+
+    op.drop_table('recommendation_author_index')
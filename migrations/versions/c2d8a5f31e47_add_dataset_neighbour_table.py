@@ -0,0 +1,33 @@
+"""Add dataset_neighbour table
+
+Revision ID: c2d8a5f31e47
+Revises: b7c41e9d2f10
+Create Date: 2026-01-19 16:42:07.518903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d8a5f31e47'
+down_revision = 'b7c41e9d2f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dataset_neighbour',
+    sa.Column('dataset_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('recommended_dataset_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ),
+    sa.ForeignKeyConstraint(['recommended_dataset_id'], ['data_set.id'], ),
+    sa.PrimaryKeyConstraint('dataset_id', 'rank')
+    )
+    # Existing datasets are indexed with `rosemary recommendations:rebuild --engine content`
+
+
+def downgrade():
+    op.drop_table('dataset_neighbour')
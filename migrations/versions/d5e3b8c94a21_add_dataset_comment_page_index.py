@@ -0,0 +1,27 @@
+"""Add index for paginated dataset comments
+
+Revision ID: d5e3b8c94a21
+Revises: c2d8a5f31e47
+Create Date: 2026-01-26 11:08:33.274615
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e3b8c94a21'
+down_revision = 'c2d8a5f31e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('dataset_comment', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_dataset_comment_dataset_visible_created', ['dataset_id', 'is_visible', 'created_at'], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('dataset_comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_dataset_comment_dataset_visible_created')
@@ -0,0 +1,40 @@
+"""Add zenodo_sync_record table
+
+Revision ID: e7a4c1d9b352
+Revises: d5e3b8c94a21
+Create Date: 2026-02-02 10:21:46.830117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a4c1d9b352'
+down_revision = 'd5e3b8c94a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('zenodo_sync_record',
+    sa.Column('dataset_id', sa.Integer(), nullable=False),
+    sa.Column('step', sa.String(length=32), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('deposition_id', sa.Integer(), nullable=True),
+    sa.Column('uploaded_files', sa.Text(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('dataset_id')
+    )
+    with op.batch_alter_table('zenodo_sync_record', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_zenodo_sync_record_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('zenodo_sync_record', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_zenodo_sync_record_status'))
+
+    op.drop_table('zenodo_sync_record')
@@ -0,0 +1,33 @@
+"""Add indexes on dataset and mapped DOIs
+
+Revision ID: f3b9d27e6c15
+Revises: e7a4c1d9b352
+Create Date: 2026-02-09 10:41:17.508362
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9d27e6c15'
+down_revision = 'e7a4c1d9b352'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ds_meta_data', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ds_meta_data_dataset_doi'), ['dataset_doi'], unique=False)
+
+    with op.batch_alter_table('doi_mapping', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_doi_mapping_dataset_doi_old'), ['dataset_doi_old'], unique=False)
+        batch_op.create_index(batch_op.f('ix_doi_mapping_dataset_doi_new'), ['dataset_doi_new'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('doi_mapping', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_doi_mapping_dataset_doi_new'))
+        batch_op.drop_index(batch_op.f('ix_doi_mapping_dataset_doi_old'))
+
+    with op.batch_alter_table('ds_meta_data', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ds_meta_data_dataset_doi'))
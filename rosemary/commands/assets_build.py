@@ -0,0 +1,28 @@
+import os
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command("assets:build", help="Writes the minified, fingerprinted and compressed module scripts for nginx.")
+@click.option(
+    "--output",
+    type=click.Path(file_okay=False),
+    help="Generated static directory. Defaults to ASSETS_OUTPUT_DIR, or build/assets.",
+)
+@with_appcontext
+def assets_build(output):
+    pipeline = current_app.extensions["assets"]
+    output = (
+        output
+        or current_app.config.get("ASSETS_OUTPUT_DIR")
+        or os.path.join(os.getenv("WORKING_DIR", ""), "build", "assets")
+    )
+
+    pipeline.write(output)
+    for name, path in pipeline.manifest().items():
+        asset = pipeline.assets[name]
+        sizes = ", ".join(f"{encoding} {len(variant)} B" for encoding, variant in asset.variants.items())
+        click.echo(f"{path}: {len(asset.body)} B ({sizes})")
+    click.echo(click.style(f"Wrote {len(pipeline.assets)} scripts to {output}.", fg="green"))
@@ -0,0 +1,59 @@
+import os
+import subprocess
+
+import click
+
+
+@click.command("benchmark", help="Runs the benchmarks on a synthetic catalogue and checks them against the baselines.")
+@click.argument("module_name", required=False)
+@click.option("--scale", type=int, default=10000, show_default=True, help="Number of synthetic datasets.")
+@click.option("--rounds", type=int, default=5, show_default=True, help="Timed rounds per benchmark.")
+@click.option(
+    "--threshold",
+    type=float,
+    default=0.25,
+    show_default=True,
+    help="Allowed slowdown over the baseline median (0.25 = 25%).",
+)
+@click.option("--save", is_flag=True, help="Store the results as the new baselines for this scale.")
+@click.option("-k", "keyword", help="Only run benchmarks that match the given substring expression.")
+def benchmark(module_name, scale, rounds, threshold, save, keyword):
+    base_path = os.path.join(os.getenv("WORKING_DIR", ""), "app/modules")
+    benchmark_path = base_path
+
+    if module_name:
+        benchmark_path = os.path.join(base_path, module_name)
+        if not os.path.exists(benchmark_path):
+            click.echo(click.style(f"Module '{module_name}' does not exist.", fg="red"))
+            return
+        click.echo(f"Running benchmarks for the '{module_name}' module with {scale} datasets...")
+    else:
+        click.echo(f"Running benchmarks for all modules with {scale} datasets...")
+
+    pytest_cmd = [
+        "pytest",
+        "-v",
+        "-p",
+        "core.benchmarks.plugin",
+        "-o",
+        "python_files=benchmark_*.py",
+        f"--benchmark-scale={scale}",
+        f"--benchmark-rounds={rounds}",
+        f"--benchmark-threshold={threshold}",
+        benchmark_path,
+    ]
+
+    if save:
+        pytest_cmd.append("--benchmark-save")
+
+    if keyword:
+        pytest_cmd.extend(["-k", keyword])
+
+    try:
+        subprocess.run(pytest_cmd, check=True)
+    except subprocess.CalledProcessError as e:
+        click.echo(click.style(f"Error running benchmarks: {e}", fg="red"))
+
+
+if __name__ == "__main__":
+    benchmark()
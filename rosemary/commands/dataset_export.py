@@ -0,0 +1,24 @@
+import sys
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("dataset:export", help="Exports every dataset with its authors and files as NDJSON or CSV.")
+@click.option("--format", "export_format", type=click.Choice(["ndjson", "csv"]), default="ndjson", show_default=True)
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), help="File to write (default: stdout).")
+@click.option("--batch-size", type=int, default=1000, show_default=True, help="Rows read from the database at a time.")
+@with_appcontext
+def dataset_export(export_format, output, batch_size):
+    from app.modules.dataset.export_service import CatalogueExportService
+
+    chunks = CatalogueExportService(batch_size=batch_size).export(export_format)
+    binary = export_format == "ndjson"
+    if output:
+        with open(output, "wb" if binary else "w", newline=None if binary else "") as file:
+            file.writelines(chunks)
+        click.echo(click.style(f"Catalogue exported to {output}", fg="green"), err=True)
+    else:
+        stream = sys.stdout.buffer if binary else sys.stdout
+        stream.writelines(chunks)
+        stream.flush()
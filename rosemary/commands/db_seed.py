@@ -1,12 +1,14 @@
 import importlib
 import inspect
 import os
+import time
 
 import click
 from flask.cli import with_appcontext
 
 from core.seeders.BaseSeeder import BaseSeeder
 from rosemary.commands.db_reset import db_reset
+from rosemary.commands.recommendations import recommendations_rebuild
 
 
 def get_module_seeders(module_path, specific_module=None):
@@ -39,12 +41,68 @@ def get_module_seeders(module_path, specific_module=None):
     return seeders
 
 
+def parse_factors(ctx, param, values):
+    factors = {}
+    for value in values:
+        name, separator, number = value.partition("=")
+        if not separator:
+            raise click.BadParameter(f"'{value}' is not NAME=VALUE.")
+        factors[name.strip().replace("-", "_")] = number.strip()
+    return factors
+
+
+def seed_synthetic_catalogue(scale, seed, factors, files):
+    """Bulk inserts a synthetic catalogue of `scale` datasets into an empty database."""
+    from app import db
+    from app.modules.auth.models import User
+    from app.modules.dataset.models import DataSet
+    from core.benchmarks.data_generator import SyntheticDataGenerator
+
+    if db.session.query(User.id).first() or db.session.query(DataSet.id).first():
+        raise click.ClickException("Bulk seeding needs an empty database. Run it with --reset.")
+
+    uploads_dir = os.path.join(os.getenv("WORKING_DIR", ""), "uploads") if files else None
+    try:
+        generator = SyntheticDataGenerator(scale, seed=seed, uploads_dir=uploads_dir, **factors)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--factor")
+
+    click.echo(click.style(f"Bulk seeding {scale} synthetic datasets (seed {seed})...", fg="green"))
+    start = time.perf_counter()
+    summary = generator.generate()
+    counts = ", ".join(
+        f"{value} {name}"
+        for name, value in summary.items()
+        if isinstance(value, int) and name not in ("scale", "heavy_user_id")
+    )
+    click.echo(click.style(f"Inserted {counts} in {time.perf_counter() - start:.1f}s.", fg="blue"))
+
+
 @click.command("db:seed", help="Populates the database with the seeders defined in each module.")
 @click.option("--reset", is_flag=True, help="Reset the database before seeding.")
 @click.option("-y", "--yes", is_flag=True, help="Confirm the operation without prompting.")
+@click.option(
+    "--scale",
+    type=click.IntRange(min=1),
+    help="Bulk insert a synthetic catalogue of this many datasets (with users, files and records) first.",
+)
+@click.option("--seed", type=int, default=42, show_default=True, help="Random seed of the synthetic catalogue.")
+@click.option(
+    "--factor",
+    "factors",
+    multiple=True,
+    callback=parse_factors,
+    help="Override a scale factor of the synthetic catalogue, e.g. --factor downloads_per_dataset=50.",
+)
+@click.option(
+    "--files/--no-files",
+    default=True,
+    show_default=True,
+    help="Create the synthetic files under uploads/ as hard links to the example UVL and CSV files.",
+)
 @click.argument("module", required=False)
 @with_appcontext
-def db_seed(reset, yes, module):
+def db_seed(reset, yes, scale, seed, factors, files, module):
 
     if reset:
         if yes or click.confirm(
@@ -58,6 +116,10 @@ def db_seed(reset, yes, module):
             click.echo(click.style("Database reset cancelled.", fg="yellow"))
             return
 
+    if scale:
+        # The module seeders run afterwards, so the usual accounts exist on top of the synthetic data
+        seed_synthetic_catalogue(scale, seed, factors, files)
+
     blueprints_module_path = os.path.join(os.getenv("WORKING_DIR", ""), "app/modules")
     seeders = get_module_seeders(blueprints_module_path, specific_module=module)
     success = True  # Flag to control the successful flow of the operation
@@ -85,3 +147,5 @@ def db_seed(reset, yes, module):
 
     if success:
         click.echo(click.style("Database populated with test data.", fg="green"))
+        # Recommendations are read from precomputed tables, which bulk inserts and seeders don't update
+        click.get_current_context().invoke(recommendations_rebuild, engine="all")
@@ -5,12 +5,22 @@ import subprocess
 import click
 import psutil
 
-import docker
+from core.environment.host import get_host_for_locust_testing
 
 
 @click.command("locust", help="Launches Locust for load testing based on the environment.")
 @click.argument("module", required=False)
-def locust(module):
+@click.option(
+    "--headless",
+    is_flag=True,
+    help="Run the load test suite in this console, without the web UI or Docker, and fail on SLO breaches.",
+)
+@click.option("-u", "--users", type=int, default=20, show_default=True, help="Concurrent users (headless).")
+@click.option("-r", "--spawn-rate", type=float, default=5, show_default=True, help="Users started per second.")
+@click.option("-t", "--run-time", default="2m", show_default=True, help="Duration of the run, e.g. 30s, 5m.")
+@click.option("--host", help="Server under test. Defaults to the one of the environment (http://localhost:5000).")
+@click.option("--slo-file", type=click.Path(exists=True, dir_okay=False), help="JSON file with the SLO thresholds.")
+def locust(module, headless, users, spawn_rate, run_time, host, slo_file):
 
     # Absolute paths
     working_dir = os.getenv("WORKING_DIR", "")
@@ -30,8 +40,37 @@ def locust(module):
                     f"Locustfile for module '{module}' does not exist at path " f"'{locustfile_path}'."
                 )
 
+    def run_headless_locust(module):
+        """Run Locust in this console until the run time is over, returning its exit code."""
+        locustfile_path = os.path.join(core_dir, "bootstraps/locustfile_scenarios.py")
+        if module:
+            locustfile_path = os.path.join(modules_dir, module, "tests", "locustfile.py")
+
+        locust_command = [
+            "locust",
+            "-f",
+            locustfile_path,
+            "--headless",
+            "--users",
+            str(users),
+            "--spawn-rate",
+            str(spawn_rate),
+            "--run-time",
+            run_time,
+            "--host",
+            host or get_host_for_locust_testing(),
+            "--only-summary",
+        ]
+        # Module locustfiles do not load the SLO checks
+        if slo_file and not module:
+            locust_command.extend(["--slo-file", slo_file])
+
+        click.echo(f"Locust command: {' '.join(locust_command)}")
+        return subprocess.run(locust_command).returncode
+
     def run_docker_locust(volume_name, module):
         """Build and run the Locust container with the specified volume."""
+        import docker
 
         try:
             # Check if the container already exists
@@ -123,7 +162,18 @@ def locust(module):
     if module:
         validate_module(module)
 
+    if headless:
+        returncode = run_headless_locust(module)
+        if returncode != 0:
+            click.echo(click.style("The load test failed: see the errors and SLO breaches above.", fg="red"))
+            raise SystemExit(returncode)
+        click.echo(click.style("The load test passed.", fg="green"))
+        return
+
     if working_dir == "/app/":
+        # Docker is only needed to run Locust in its own container
+        import docker
+
         client = docker.from_env()
 
         try:
@@ -0,0 +1,36 @@
+import time
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command(
+    "recommendations:rebuild",
+    help="Recomputes the stored author and content recommendations of every dataset.",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["all", "authors", "content"]),
+    default="all",
+    show_default=True,
+    help="Recommendations to rebuild.",
+)
+@with_appcontext
+def recommendations_rebuild(engine):
+    from app.modules.recommendations.service import author_overlap_engine, content_similarity_engine
+
+    engines = {"authors": author_overlap_engine, "content": content_similarity_engine}
+    for name, recommendation_engine in engines.items():
+        if engine not in ("all", name):
+            continue
+
+        click.echo(f"Rebuilding the {name} recommendations...")
+        start = time.perf_counter()
+        try:
+            stored = recommendation_engine.rebuild()
+        except Exception as e:
+            click.echo(click.style(f"Error rebuilding the {name} recommendations: {e}", fg="red"))
+            continue
+        click.echo(
+            click.style(f"Stored {stored} {name} recommendations in {time.perf_counter() - start:.1f}s.", fg="green")
+        )
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+
+import click
+
+# Imports the package and builds an application, timing the factory on its own
+PROFILED_STARTUP = (
+    "import time\n"
+    "import app\n"
+    "start = time.perf_counter()\n"
+    "app.create_app({config_name!r})\n"
+    "print(f'create_app: {{(time.perf_counter() - start) * 1000:.0f}} ms')\n"
+)
+
+
+def parse_import_times(output):
+    """(self µs, cumulative µs, module) of every line printed by `python -X importtime`."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, cumulative, name = line[len("import time:") :].split("|", 2)
+        if not self_time.strip().isdigit():
+            continue  # header
+        # Nested imports are indented by two spaces per level
+        modules.append((int(self_time), int(cumulative), name[1:].rstrip()))
+    return modules
+
+
+@click.command("startup:profile", help="Reports the slowest imports and the time to build the application.")
+@click.option("--config", "config_name", default="development", show_default=True, help="Configuration to build.")
+@click.option("--top", type=int, default=20, show_default=True, help="Number of modules to list.")
+@click.option(
+    "--sort",
+    type=click.Choice(["cumulative", "self"]),
+    default="cumulative",
+    show_default=True,
+    help="Order by the time including the module's own imports, or by its own time only.",
+)
+def startup_profile(config_name, top, sort):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILED_STARTUP.format(config_name=config_name)],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        click.echo(click.style(f"Error building the application:\n{result.stderr[-2000:]}", fg="red"))
+        return
+
+    modules = parse_import_times(result.stderr)
+    # Top-level imports are the ones whose cumulative times add up to the total import time
+    total = sum(cumulative for _, cumulative, name in modules if not name.startswith(" "))
+    key = 1 if sort == "cumulative" else 0
+
+    click.echo(f"{'self (ms)':>10} {'cumul. (ms)':>12}  module")
+    for self_time, cumulative, name in sorted(modules, key=lambda module: module[key], reverse=True)[:top]:
+        click.echo(f"{self_time / 1000:>10.1f} {cumulative / 1000:>12.1f}  {name.strip()}")
+
+    click.echo(f"\nimports: {total / 1000:.0f} ms")
+    # The application prints its own messages while registering the modules
+    for line in result.stdout.splitlines():
+        if line.startswith("create_app:"):
+            click.echo(line)
@@ -0,0 +1,49 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command("zenodo:sync", help="Publishes to Zenodo the datasets without a DOI, resuming where they failed.")
+@click.option("--workers", type=int, help="Datasets published at the same time (default: ZENODO_SYNC_WORKERS).")
+@click.option("--limit", type=int, help="Publish at most this many datasets.")
+@click.option("--dataset", "dataset_ids", type=int, multiple=True, help="Only publish this dataset (repeatable).")
+@click.option("--status", is_flag=True, help="Only show the progress recorded by previous runs.")
+@with_appcontext
+def zenodo_sync(workers, limit, dataset_ids, status):
+    from app.modules.zenodo.services import ZenodoSyncService
+
+    service = ZenodoSyncService()
+
+    if status:
+        click.echo(f"Datasets without DOI: {service.pending_count()}")
+        for record_status, count in sorted(service.summary().items()):
+            click.echo(f"  {record_status}: {count}")
+        for record in service.latest(20):
+            if record.status == record.FAILED:
+                click.echo(
+                    f"  dataset {record.dataset_id} ({record.step}, {record.attempts} attempts): {record.last_error}"
+                )
+        return
+
+    pending = list(dataset_ids) or service.pending_dataset_ids(limit)
+    if not pending:
+        click.echo(click.style("Every dataset has a DOI.", fg="green"))
+        return
+
+    workers = workers or current_app.config.get("ZENODO_SYNC_WORKERS", 4)
+    click.echo(f"Publishing {len(pending)} datasets, {workers} at a time...")
+
+    def show_progress(result, done, total):
+        color = {"done": "green", "failed": "red"}.get(result["status"], "yellow")
+        detail = f": {result['last_error']}" if result.get("last_error") else ""
+        click.echo(click.style(f"[{done}/{total}] dataset {result['dataset_id']} {result['status']}{detail}", fg=color))
+
+    results = service.sync_all(current_app._get_current_object(), pending, workers=workers, on_progress=show_progress)
+    failed = sum(1 for result in results if result["status"] == "failed")
+    published = sum(1 for result in results if result["status"] == "done")
+    click.echo(
+        click.style(
+            f"Published {published} datasets, {failed} failed, {len(results) - published - failed} skipped.",
+            fg="red" if failed else "green",
+        )
+    )
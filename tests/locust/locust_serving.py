@@ -0,0 +1,33 @@
+"""
+Compares the sync and gevent worker classes. Run it once against each serving mode, e.g.
+
+    GUNICORN_WORKER_CLASS=sync gunicorn --config gunicorn.conf.py app:app
+    locust -f tests/locust/locust_serving.py --headless -u 50 -r 10 -t 2m --host http://localhost:5000
+
+and compare the requests per second and the percentiles of the fast pages. With sync workers the fast pages
+queue behind the fakenodo calls and dataset downloads. With gevent workers they do not.
+"""
+
+import os
+
+from locust import HttpUser, between, task
+
+DATASET_ID = os.getenv("TEST_DATASET_ID", "1")
+
+
+class ServingModeUser(HttpUser):
+    wait_time = between(0.5, 1.5)
+
+    @task(1)
+    def fakenodo_round_trip(self):
+        # Creates, publishes and deletes a deposition in fakenodo: several outbound requests
+        self.client.get("/zenodo/test", name="/zenodo/test (outbound)")
+
+    @task(1)
+    def download_dataset(self):
+        # Builds and streams the zip of the dataset files
+        self.client.get(f"/dataset/download/{DATASET_ID}", name="/dataset/download/<id> (streaming)")
+
+    @task(8)
+    def homepage(self):
+        self.client.get("/", name="/ (fast)")